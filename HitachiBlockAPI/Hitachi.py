@@ -5,39 +5,149 @@ This library provides an easy way to script tasks for the Hitachi Storage Arrays
 import http.client
 import socket
 import json
-import ssl
 from base64 import b64encode
 import logging
 import time
 import uuid
 import sys
+import threading
+import concurrent.futures
+import reprlib
+
+#use the faster json parser if it is installed
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+from .transport import ConnectionPool
+from .transport import TLSContext
+from .transport import RetryPolicy
+from .transport import CircuitBreaker
+from .transport import CircuitOpenError
+from .transport import governor_get
+from .metrics import Metrics
+from .cassette import Cassette
+from .cache import TTLCache
+from .cache import DiskCache
+from .cache import resource_type
+from .inventory import Inventory
+from .topology import TopologyIndex
+from .records import records_from
+from .records import Ldev, Lun, Wwn, HostGroup
+from . import columnar
+from .jobs import Job
+from .jobs import jobs_wait
 
 # create logger
+#the application configures the handlers and the level (e.g. logging.basicConfig), see README
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 
-# create console handler and set level to debug
-ch = logging.StreamHandler()
-ch.setLevel(logging.DEBUG)
+#longest response or body (characters) in a log message, None: no limit
+LOG_PAYLOAD_MAX = 2000
 
-# create formatter
-#2020-10-27 08:24:01,160 - DEBUG - Hitachi.py - line+522 - luns_one_port_get - Message
-#formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(name)s - line+%(lineno)d - %(funcName)s - %(message)s')
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(name)s - line+%(lineno)d - %(funcName)s - %(message)s')
+#bounded repr of big responses (only the first elements of long lists and dictionaries)
+_payload_repr = reprlib.Repr()
+_payload_repr.maxlevel = 4
+_payload_repr.maxdict = 20
+_payload_repr.maxlist = 20
+_payload_repr.maxstring = 200
+_payload_repr.maxother = 200
 
-# add formatter to ch
-ch.setFormatter(formatter)
 
-# add ch to logger
-logger.addHandler(ch)
+class _LogPayload:
+    '''Response or body in a log message. It is only formatted if the record is emitted and shortened to LOG_PAYLOAD_MAX characters'''
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        if LOG_PAYLOAD_MAX is None:
+            return(str(self.value))
+        if isinstance(self.value, (dict, list, tuple)):
+            text = _payload_repr.repr(self.value)
+        else:
+            text = str(self.value)
+        if len(text) > LOG_PAYLOAD_MAX:
+            text = text[:LOG_PAYLOAD_MAX]+'...'
+        return(text)
+
+
+class PageError(Exception):
+    '''A page of a paged request (e.g. ldevs_iter) could not be read, the elements returned so far are not complete'''
+
 
 # The current version of this library.
 VERSION = "0.9.2"
 
+#decode the response body with one json parse. '' if it is empty and the text if it is not json
+def _response_decode(response_data:bytes):
+    if len(response_data) == 0:
+        return('')
+    try:
+        return(_json_loads(response_data))
+    except ValueError:
+        response_string = str(response_data, encoding='utf8', errors='replace')
+        if response_string.strip() == '':
+            return('')
+        return(response_string)
+
+#check the response of a webrequest [0|-1, status, decoded response]
+def _check_response(return_response:list, key:str='data'):
+    '''Return the value of key of the json response (or the whole response if key is 'all'), None if empty, -1 on errors'''
+    if len(return_response) == 3:
+        if return_response[0] == 0:
+            return_response_json = return_response[2]
+            #json string that is not decoded yet
+            if isinstance(return_response_json, (str, bytes)) and not len(return_response_json) == 0:
+                return_response_json = _response_decode(return_response_json if isinstance(return_response_json, bytes) else return_response_json.encode('utf8'))
+            if isinstance(return_response_json, (dict, list)):
+                logger.debug('output is of type json')
+                #if you specify 'all' then the whole dictionary is sent back
+                if key == 'all':
+                    logger.debug('key "all" selected')
+                    #return dict
+                    return(return_response_json)
+                else:
+                    #check if the key exists
+                    if key in return_response_json:
+                        if len(return_response_json[key]) == 0:
+                            logger.warning('the key "%s" is empty.', key)
+                            return(None)
+                        else:
+                            logger.debug('key "%s" selected', key)
+                            #list or dict
+                            return(return_response_json[key])
+                    else:
+                        logger.error('the key you looked for "%s" does not exist in the dictionary.', key)
+                        return(-1)
+            else:
+                if return_response_json == '':
+                    logger.debug('empty response')
+                    return(None)
+                else:
+                    logger.error('ERROR: response:%s', _LogPayload(return_response))
+                    return(-1)
+        else:
+            logger.warning('WARNING: response status:%s, response reason:%s', return_response[1], _LogPayload(return_response[2]))
+            return(None)
+    else:
+        logger.error('ERROR: response:%s', _LogPayload(return_response))
+        return(-1)
+
 class RestAPI:
     '''This Class can be used to : '''
     
-    def __init__(self, protocol:str='https://', fqdn_ip:str='127.0.0.1', port:int=443, username:str='maintenance', password:str='raid-maintenance'):
+    def __init__(self, protocol:str='https://', fqdn_ip:str='127.0.0.1', port:int=443, username:str='maintenance', password:str='raid-maintenance',
+                 max_connections:int=8, connection_idle_timeout:float=30, ca_bundle:str=None, pinned_certificate:str=None, check_hostname:bool=True,
+                 session_alive_time:int=300, session_renew_margin:float=30,
+                 max_parallel_get:int=6, cache:bool=False, cache_ttls:dict=None, cache_maxsize:int=256,
+                 storage_cache_file:str=None, storage_cache_max_age:float=86400,
+                 retries:int=3, retry_backoff:float=0.5, retry_max_backoff:float=8, circuit_failure_threshold:int=5, circuit_reset_timeout:float=30,
+                 max_requests_in_flight:int=None, max_requests_per_second:float=None,
+                 cassette_file:str=None, cassette_mode:str='replay', cassette_latency:float=0.0):
         self._ip_fqdn = fqdn_ip
         self._port = str(port)
         self._username = username
@@ -47,6 +157,11 @@ class RestAPI:
         self._storage_device_id = None
         self._token = None
         self._session_id = None
+        #one session is opened when needed and used for all requests
+        self.__session_alive_time = session_alive_time
+        self.__session_renew_margin = session_renew_margin
+        self.__session_last_used = None
+        self.__session_lock = threading.RLock()
         self.__url_base = '/ConfigurationManager/v1/objects'
         self.__url_base_ConfigurationManager = '/ConfigurationManager'
         self.__url_base_v1 = '/v1'
@@ -73,70 +188,136 @@ class RestAPI:
         self.__json_snapshotGroupName = 'snapshotGroupName'
         self.__json_snapshotId = 'snapshotId' #if you specify an ldev in the request url
         self.__json_snapshotReplicationId = 'snapshotReplicationId' #if you do not specify an ldev
-        
-        #self.__maxConnectionsParallelTotal = 8
-        #self.__maxConnectionsParallelGet = 6
-    
-    #check if string is of json format
-    def __is_json(self, myjson:str):
-        try:
-            json_object = json.loads(myjson)
-        except ValueError as e:
-            return False
-        return True
+ 
+        #keep-alive connection pools per host:port
+        self.__maxConnectionsParallelTotal = max_connections
+        self.__connection_idle_timeout = connection_idle_timeout
+        self.__pools = {}
+        self.__pools_lock = threading.Lock()
+        #one ssl context for all connections, TLS sessions are resumed per host:port
+        self.__tls = TLSContext(ca_bundle=ca_bundle, pinned_certificate=pinned_certificate, check_hostname=check_hostname)
+        #GET requests are sent again after a connection error or 502/503/504
+        self.__retry = RetryPolicy(retries=retries, backoff=retry_backoff, max_backoff=retry_max_backoff)
+        #requests to a host:port fail at once after circuit_failure_threshold failures in a row (for circuit_reset_timeout seconds)
+        self.__circuit_failure_threshold = circuit_failure_threshold
+        self.__circuit_reset_timeout = circuit_reset_timeout
+        #limits of the requests to a host:port of all instances in the process (no limit if both are None)
+        self.__max_requests_in_flight = max_requests_in_flight
+        self.__max_requests_per_second = max_requests_per_second
+        #number of GET requests the *_all_ports_get functions send in parallel
+        self.__maxConnectionsParallelGet = max_parallel_get
+        #set to False if the storage does not return the host groups of all ports with one request
+        self.__host_groups_bulk = True
+        #optional cache of GET responses (ports, pools, host groups, ...), see cache.DEFAULT_TTLS
+        self.__cache = None
+        if cache == True:
+            self.__cache = TTLCache(ttls=cache_ttls, maxsize=cache_maxsize)
+        #optional file with the storage device ids and details of earlier runs (no request needed at startup)
+        self.__disk_cache = None
+        if storage_cache_file is not None:
+            self.__disk_cache = DiskCache(path=storage_cache_file, max_age=storage_cache_max_age)
+        self.__disk_cache_refreshing = set()
+        self.__disk_cache_lock = threading.Lock()
+        #counts, bytes, status codes and latencies of the requests per endpoint
+        self.__metrics = Metrics()
+        #optional cassette: record the requests and responses or replay them without the storage
+        self.__cassette = None
+        if cassette_file is not None:
+            self.__cassette = Cassette(path=cassette_file, mode=cassette_mode, latency=cassette_latency)
+
+    def __enter__(self):
+        return(self)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    #delete the session and close all kept alive connections (the recorded cassette is saved)
+    def close(self):
+        self._session_delete()
+        with self.__pools_lock:
+            for pool in self.__pools.values():
+                pool.close()
+            self.__pools = {}
+        self.cassette_save()
+        return(None)
 
+    #write the recorded requests to the cassette file (record mode)
+    def cassette_save(self):
+        if self.__cassette is not None:
+            self.__cassette.save()
+        return(None)
+
+    #mode, path, requests, replayed and misses of the cassette. None if no cassette is used
+    def cassette_stats(self):
+        if self.__cassette is None:
+            return(None)
+        return(self.__cassette.stats())
+
+    #statistics of the response cache (hits, misses, ...). None if the cache is not enabled
+    def cache_stats(self):
+        if self.__cache is None:
+            return(None)
+        return(self.__cache.stats())
+
+    #remove all cached responses
+    def cache_clear(self):
+        if self.__cache is not None:
+            self.__cache.clear()
+        return(None)
+
+    #limits, requests in flight and wait times of the governors ({'host:port': stats}) of the hosts this instance used
+    def governor_stats(self):
+        with self.__pools_lock:
+            pools = list(self.__pools.values())
+        return({str(pool.host)+':'+str(pool.port): pool.governor.stats() for pool in pools if pool.governor is not None})
+
+    #request metrics per endpoint template ({'endpoints': {'GET /ldevs': {...}}, 'requests', 'session_creations'})
+    def metrics_get(self):
+        return(self.__metrics.get())
+
+    #request metrics in the Prometheus text format. labels are added to every sample (e.g. {'storage': '58068'})
+    def metrics_prometheus(self, prefix:str='hitachi_rest', labels:dict=None):
+        return(self.__metrics.prometheus(prefix=prefix, labels=labels))
+
+    def metrics_reset(self):
+        self.__metrics.reset()
+        return(None)
+
+    #run the function for every element in parallel. the results are in the order of the elements.
+    def _parallel_map(self, function, elements, parallel:int=None):
+        if parallel == None:
+            parallel = self.__maxConnectionsParallelGet
+        elements = list(elements)
+        if parallel <= 1 or len(elements) <= 1:
+            return([function(element) for element in elements])
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(parallel, len(elements))) as executor:
+            return(list(executor.map(function, elements)))
+
+    #get the connection pool of a host:port
+    def _pool_get(self, fqdn_ip:str, port:str):
+        key = (str(fqdn_ip), str(port))
+        with self.__pools_lock:
+            pool = self.__pools.get(key)
+            if pool is None:
+                logger.debug('create connection pool for: %s:%s', fqdn_ip, port)
+                governor = None
+                if self.__max_requests_in_flight is not None or self.__max_requests_per_second is not None:
+                    governor = governor_get(fqdn_ip, port, max_in_flight=self.__max_requests_in_flight, rate=self.__max_requests_per_second)
+                pool = ConnectionPool(host=fqdn_ip, port=port, maxsize=self.__maxConnectionsParallelTotal, idle_timeout=self.__connection_idle_timeout, tls=self.__tls,
+                                      breaker=CircuitBreaker(failure_threshold=self.__circuit_failure_threshold, reset_timeout=self.__circuit_reset_timeout),
+                                      governor=governor)
+                self.__pools[key] = pool
+        return(pool)
+    
     #check the response
     def __check_response(self, return_response:list, element_number:int=0, key:str=None):
         if key == None:
             key = self.__json_data
-        
-        return_value = None
-
-        if len(return_response) == 3:
-            if return_response[0] == 0:
-                #maybe json string
-                if self.__is_json(str(return_response[2])):
-                    logger.debug('output is of type json string')
-                    return_response_json = json.loads(return_response[2])
-                    #if you specify 'all' then the whole dictionary is sent back
-                    if key == 'all':
-                        logger.debug('key "all" selected')
-                        #return dict
-                        return(return_response_json)
-                    else:
-                        #check if the key exists
-                        if key in return_response_json:
-                            if len(return_response_json[key]) == 0:
-                                logger.warning('the key "'+str(key)+'" is empty.')
-                                return(None)
-                            else:
-                                logger.debug('key "'+str(key)+'" selected')
-                                #is it a list then keep the list type
-                                if isinstance(return_response_json[key], list):
-                                    return(return_response_json[key])
-                                else:
-                                    #return dict
-                                    return(return_response_json[key])
-                        else:
-                            logger.error('the key you looked for "'+str(key)+'" does not exist in the dictionary.')
-                            return(-1)
-                else:
-                    if str(return_response[2]) == '':
-                        logger.debug('empty response')
-                        return(None)
-                    else:
-                        logger.error('ERROR: response:'+str(return_response))
-                        return(-1)
-            else:
-                logger.warning('WARNING: response status:'+str(return_response[1])+', response reason:'+str(return_response[2]))
-                return(None)
-        else:
-            logger.error('ERROR: response:'+str(return_response))
-            return(-1)
+        return(_check_response(return_response=return_response, key=key))
 
     #extecutes the web request
-    def _webrequest(self, fqdn_ip:str=None, port:str=None, username:str=None, password:str=None, request_type:str='GET', url_suffix:str=None, body:str=None, timeout:int=60):
-        '''Return the json response of the webrequest'''
+    def _webrequest(self, fqdn_ip:str=None, port:str=None, username:str=None, password:str=None, request_type:str='GET', url_suffix:str=None, body:str=None, timeout:int=60, token:str=None):
+        '''Return [0, status, json response (dict/list), '' or text] or [-1, status or error, response or exception]. If a session token is specified it is used instead of user and password'''
         start = time.time()
 
         #set internal values if nothing is specified
@@ -156,97 +337,174 @@ class RestAPI:
             #use the url suffix that was set in the function call
             url = self._protocol+fqdn_ip+':'+str(port)+url_suffix    
 
-        #if already a token is set then use it otherwise use the user and password
-        if self._token is None:
-            logger.debug('No token found. Use user ('+str(self._username)+') and password used')
+        #if a token is specified then use it otherwise use the user and password
+        if token is None:
+            logger.debug('No token specified. Use user (%s) and password used', self._username)
             #user and password
             headers = {'Accept':'application/json', 'Content-Type':'application/json', 'Authorization' : 'Basic %s' %  userAndPass}
         else:
             #token
-            logger.debug('token ('+str(self._token)+') is used')
-            headers = {'Accept':'application/json', 'Content-Type':'application/json', 'Authorization' : 'Session '+str(self._token)}
+            logger.debug('token (%s) is used', token)
+            headers = {'Accept':'application/json', 'Content-Type':'application/json', 'Authorization' : 'Session '+str(token)}
 
         #convert the body to json format string if it is a dictionary
-        if not body == None:
-            if type(body) == str:
-                if not self.__is_json:
-                    body = json.dumps(body)
-
-        #create https connection, unverified connection
-        connection = http.client.HTTPSConnection(fqdn_ip+':'+port, context=ssl._create_unverified_context(), timeout=timeout)
-
-        try:
-            # Send request
-            logger.debug('request type: '+ str(request_type))
-            logger.debug('headers: '+ str(headers))
-            logger.debug('body: '+ str(body))
-            logger.debug('URL: '+ str(url))
-            if body == None:
-                connection.request(method=request_type, url=url, headers=headers)
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body)
+
+        #kept alive https connection of the pool
+        pool = self._pool_get(fqdn_ip=fqdn_ip, port=port)
+
+        # Send request
+        logger.debug('request type: %s', request_type)
+        logger.debug('headers: %s', headers)
+        logger.debug('body: %s', _LogPayload(body))
+        logger.debug('URL: %s', url)
+        bytes_sent = 0 if body is None else len(body.encode('utf-8') if isinstance(body, str) else body)
+        attempt = 0
+        while True:
+            #fail fast while the host:port is unhealthy
+            if not pool.breaker.allow():
+                self.__metrics.request(request_type, url_suffix, 'circuit_open', 0.0)
+                logger.error('ERROR: circuit breaker of %s:%s is open. request not sent. retry after %.1fsec.', fqdn_ip, port, pool.breaker.retry_after())
+                return([-1, 'ERROR: circuit breaker open', CircuitOpenError(str(fqdn_ip)+':'+str(port)+' is not healthy')])
+            #wait for a free slot of the governor (shared by all instances of the process)
+            if pool.governor is not None and not pool.governor.acquire(timeout=timeout):
+                pool.breaker.cancel()
+                self.__metrics.request(request_type, url_suffix, 'timeout', 0.0)
+                logger.error('ERROR: no free request slot of the governor of %s:%s within %ssec.', fqdn_ip, port, timeout)
+                return([-1, 'ERROR: http(s) timeout received after '+str(timeout)+'sec.', socket.timeout('no free request slot of the governor')])
+            request_start = time.monotonic()
+            try:
+                if self.__cassette is None:
+                    response_status, response_reason, response_data = pool.request(method=request_type, url=url, headers=headers, body=body, timeout=timeout)
+                else:
+                    response_status, response_reason, response_data = self.__cassette.request(pool.request, method=request_type, url=url, headers=headers, body=body, timeout=timeout)
+            except socket.timeout as st:
+                #not retried, the request already waited the whole timeout
+                pool.breaker.failure()
+                self.__metrics.request(request_type, url_suffix, 'timeout', time.monotonic()-request_start, bytes_sent=bytes_sent)
+                logger.error('ERROR: http(s) timeout received after %ssec. : %s', timeout, st)
+                return([-1, 'ERROR: http(s) timeout received after '+str(timeout)+'sec.', st])
+            except (http.client.HTTPException, OSError) as e:
+                # other kind of error occured during request
+                pool.breaker.failure()
+                self.__metrics.request(request_type, url_suffix, 'error', time.monotonic()-request_start, bytes_sent=bytes_sent)
+                if self.__retry.retryable(request_type, attempt):
+                    attempt += 1
+                    self.__metrics.retry(request_type, url_suffix)
+                    delay = self.__retry.delay(attempt)
+                    logger.warning('WARNING: HTTPException: %s. retry %s of %s in %.1fsec.', e, attempt, self.__retry.retries, delay)
+                    time.sleep(delay)
+                    continue
+                logger.error('ERROR: HTTPException: %s', e)
+                return([-1, 'ERROR: HTTPException', e])
+            finally:
+                if pool.governor is not None:
+                    pool.governor.release()
+            self.__metrics.request(request_type, url_suffix, response_status, time.monotonic()-request_start, bytes_sent=bytes_sent, bytes_received=len(response_data))
+            if response_status in self.__retry.statuses:
+                pool.breaker.failure()
+                if self.__retry.retryable(request_type, attempt, status=response_status):
+                    attempt += 1
+                    self.__metrics.retry(request_type, url_suffix)
+                    delay = self.__retry.delay(attempt)
+                    logger.warning('WARNING: status %s received. retry %s of %s in %.1fsec.', response_status, attempt, self.__retry.retries, delay)
+                    time.sleep(delay)
+                    continue
             else:
-                connection.request(method=request_type, url=url, headers=headers, body=body)
-            # Get the response
-            response = connection.getresponse()
-        except socket.timeout as st:
-            logger.error('ERROR: http(s) timeout received after '+str(timeout)+'sec. : '+str(st))
-            return([-1, 'ERROR: http(s) timeout received after '+str(timeout)+'sec.', st])
-        except http.client.HTTPException as e:
-            # other kind of error occured during request
-            logger.error('ERROR: HTTPException: '+str(e))
-            return([-1, 'ERROR: HTTPException', st])
-        
+                pool.breaker.success()
+            break
+
         # Display the response status
-        #print()
-        #print ("Status = ", response.status)
         # 200 Ok
         # 202 Accepted The request has been accepted for processing, but the processing has not been completed.
-        logger.debug('request response status: '+ str(response.status))
-        response_string = str(response.read(), encoding='utf8').replace('\r', '').replace('\n','')
-        if response.status == http.client.OK or response.status == http.client.ACCEPTED:
-            if not len(response_string) == 0:
-                return_response = [0, response.status, response_string]
-            else:
-                return_response = [0, response.status, '']
+        logger.debug('request response status: %s', response_status)
+        #the body is parsed once here and the parsed json (dict or list) is handed to the callers
+        response_decoded = _response_decode(response_data)
+        if response_status == http.client.OK or response_status == http.client.ACCEPTED:
+            return_response = [0, response_status, response_decoded]
         else:
-            logger.error('Got error back. status: '+ str(response.status)+' - reason: '+str(response.reason))
-            return_response = [-1, response.status, response_string]
+            logger.error('Got error back. status: %s - reason: %s', response_status, response_reason)
+            return_response = [-1, response_status, response_decoded]
             
-        #close connection
-        connection.close()
         end = time.time()
-        logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+        logger.debug('total time used: %05.1fsec', end-start)
         return(return_response)
     
-    #general webrequest that creates/deletes sessions
-    def _general_webrequest(self, fqdn_ip:str=None, port:str=None, username:str=None, password:str=None, request_type:str='GET', url_suffix:str=None, body:str=None, timeout:int=60):
-        start = time.time()
+    #get the token of the session, (re)create the session if needed
+    def _session_token_get(self):
+        with self.__session_lock:
+            if self._token is not None:
+                #renew the session before the array drops it (aliveTime is counted from the last request)
+                if time.monotonic() - self.__session_last_used < self.__session_alive_time - self.__session_renew_margin:
+                    return(self._token)
+                logger.debug('session (%s) is about to time out. renew it.', self._session_id)
+                self._session_delete()
+            self._session_create()
+            return(self._token)
 
-        return_value = None
+    #forget the session token (e.g. if the array does not know it anymore)
+    def _session_invalidate(self, token:str):
+        with self.__session_lock:
+            if self._token == token:
+                self._token = None
+                self._session_id = None
 
-         #set internal values if nothing is specified
-        if fqdn_ip == None:
-            fqdn_ip = self._ip_fqdn
-        if port == None:
-            port = self._port
-        if username == None and password == None:
-            userAndPass = self.__userAndPass
-        else:
-            userAndPass = b64encode((username+':'+password).encode('utf-8')).decode("ascii")
+    #webrequest that uses the session token of the storage. GET responses are cached if the cache is enabled, all other requests invalidate it
+    def _session_webrequest(self, fqdn_ip:str=None, port:str=None, username:str=None, password:str=None, request_type:str='GET', url_suffix:str=None, body:str=None, timeout:int=60):
+        if self.__cache is None or url_suffix == None:
+            return(self._session_webrequest_send(fqdn_ip=fqdn_ip, port=port, username=username, password=password, request_type=request_type, url_suffix=url_suffix, body=body, timeout=timeout))
 
-        #create session token if not a GET request
+        resource = resource_type(url_suffix)
         if not request_type == 'GET':
-            self._session_create()
-        
+            return_response = self._session_webrequest_send(fqdn_ip=fqdn_ip, port=port, username=username, password=password, request_type=request_type, url_suffix=url_suffix, body=body, timeout=timeout)
+            self.__cache.invalidate(resource)
+            return(return_response)
+        if not self.__cache.cacheable(resource):
+            return(self._session_webrequest_send(fqdn_ip=fqdn_ip, port=port, username=username, password=password, request_type=request_type, url_suffix=url_suffix, body=body, timeout=timeout))
+
+        cache_key = (str(fqdn_ip or self._ip_fqdn), str(port or self._port), str(username or self._username), url_suffix)
+        return_response = self.__cache.get(cache_key)
+        self.__metrics.cache(url_suffix, hit=return_response is not None)
+        if return_response is not None:
+            logger.debug('cached response used: %s', url_suffix)
+            return(return_response)
+        return_response = self._session_webrequest_send(fqdn_ip=fqdn_ip, port=port, username=username, password=password, request_type=request_type, url_suffix=url_suffix, body=body, timeout=timeout)
+        #only successful responses are cached
+        if return_response[0] == 0:
+            self.__cache.put(cache_key, resource, return_response)
+        return(return_response)
+
+    #send the webrequest with the session token of the storage
+    def _session_webrequest_send(self, fqdn_ip:str=None, port:str=None, username:str=None, password:str=None, request_type:str='GET', url_suffix:str=None, body:str=None, timeout:int=60):
+        #the session only exists for the storage of this instance
+        if (fqdn_ip == None or fqdn_ip == self._ip_fqdn) and (port == None or str(port) == self._port) and (username == None or username == self._username) and self._storage_device_id is not None:
+            token = self._session_token_get()
+        else:
+            token = None
+
         #send request
-        return_response = self._webrequest(fqdn_ip=fqdn_ip, port=port, username=username, password=password, request_type=request_type, url_suffix=url_suffix, body=body, timeout=timeout)
-        return_response = self.__check_response(return_response=return_response)
-        end = time.time()
+        return_response = self._webrequest(fqdn_ip=fqdn_ip, port=port, username=username, password=password, request_type=request_type, url_suffix=url_suffix, body=body, timeout=timeout, token=token)
+        if token is not None:
+            if return_response[0] == -1 and return_response[1] == http.client.UNAUTHORIZED:
+                #session timed out or was deleted on the array. try once with a new session.
+                logger.warning('WARNING: session token not accepted anymore. create a new session and retry.')
+                self._session_invalidate(token=token)
+                token = self._session_token_get()
+                return_response = self._webrequest(fqdn_ip=fqdn_ip, port=port, username=username, password=password, request_type=request_type, url_suffix=url_suffix, body=body, timeout=timeout, token=token)
+            self.__session_last_used = time.monotonic()
+        return(return_response)
 
-        #create session token if not a GET request
-        if not request_type == 'GET':
-            self._session_delete()
+    #general webrequest that uses the session of the storage
+    def _general_webrequest(self, fqdn_ip:str=None, port:str=None, username:str=None, password:str=None, request_type:str='GET', url_suffix:str=None, body:str=None, timeout:int=60, key:str=None):
+        start = time.time()
 
-        logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+        #send request
+        return_response = self._session_webrequest(fqdn_ip=fqdn_ip, port=port, username=username, password=password, request_type=request_type, url_suffix=url_suffix, body=body, timeout=timeout)
+        return_response = self.__check_response(return_response=return_response, key=key)
+        end = time.time()
+
+        logger.debug('total time used: %05.1fsec', end-start)
         return(return_response)
 
     #execute in all functions
@@ -257,7 +515,7 @@ class RestAPI:
             self.storage_device_id_set()
         
         end = time.time()
-        logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+        logger.debug('total time used: %05.1fsec', end-start)
 
         return(None)
 
@@ -266,8 +524,6 @@ class RestAPI:
         start = time.time()
         request_type = 'GET'
 
-        #set token to None so user and password is used
-        self._token = None
         #set internal values if nothing is specified
         if username == None:
             username = self._username
@@ -278,9 +534,9 @@ class RestAPI:
         if port == None:
             port = self._port
 
-        logger.debug('Request string: '+str(request_type)+' - '+str(self.__url_base+self.__url_storages))
+        logger.debug('Request string: %s - %s', request_type, self.__url_base+self.__url_storages)
         return_response=self._webrequest(request_type=request_type, fqdn_ip=fqdn_ip, port=port, username=username, password=password, url_suffix=self.__url_base+self.__url_storages)
-        logger.debug('Request response: ' + str(return_response))
+        logger.debug('Request response: %s', _LogPayload(return_response))
         return_response = self.__check_response(return_response=return_response)
         #[{'storageDeviceId': '800000058068',  'model': 'VSP G1000',  'serialNumber': 58068,  'svpIp': '10.70.4.145'}]
         
@@ -290,7 +546,7 @@ class RestAPI:
             storages[storage[self.__json_serial_number]] = storage
         
         end = time.time()
-        logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+        logger.debug('total time used: %05.1fsec', end-start)
         return(storages)
 
     #gets the storge details ucode, ip
@@ -302,8 +558,6 @@ class RestAPI:
             #execute general procedures
             self._general_execute()
         
-        #set token to None so user and password is used
-        self._token = None
         #set internal values if nothing is specified
         if fqdn_ip == None:
             fqdn_ip = self._ip_fqdn
@@ -314,15 +568,32 @@ class RestAPI:
         if password == None:
             password = self.__password
 
-        logger.debug('Request string: '+str(request_type)+' - '+str(self.__url_base_ConfigurationManager)+str(self.__url_base_v1)+self.__url_base_objects+self.__url_storages+'/'+str(self._storage_device_id))
-        return_response=self._webrequest(request_type=request_type, fqdn_ip=fqdn_ip, port=port, username=username, password=password, url_suffix=str(self.__url_base_ConfigurationManager)+str(self.__url_base_v1)+self.__url_base_objects+self.__url_storages+'/'+str(self._storage_device_id))
-        logger.debug('Request response: ' + str(return_response))
-
-        return_response = self.__check_response(return_response=return_response, key='all')
+        #storage details of an earlier run
+        if self.__disk_cache is not None:
+            entry = self.__disk_cache.find(fqdn_ip, port, self._storage_device_id)
+            if entry is not None:
+                logger.debug('storage details of the storage cache file used')
+                if not self.__disk_cache.is_fresh(entry):
+                    self._disk_cache_refresh(fqdn_ip=fqdn_ip, port=port, username=username, password=password, serial_number=entry['details'].get(self.__json_serial_number))
+                return(entry['details'])
+
+        return_response = self._storage_details_request(fqdn_ip=fqdn_ip, port=port, username=username, password=password)
+        if self.__disk_cache is not None and type(return_response) == dict:
+            self.__disk_cache.put(fqdn_ip, port, return_response.get(self.__json_serial_number), storage_device_id=self._storage_device_id, details=return_response)
         end = time.time()
-        logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+        logger.debug('total time used: %05.1fsec', end-start)
         return(return_response)
 
+    #request the storge details of the storage that is set
+    def _storage_details_request(self, fqdn_ip:str=None, port:str=None, username:str=None, password:str=None, storage_device_id:str=None):
+        request_type = 'GET'
+        if storage_device_id == None:
+            storage_device_id = self._storage_device_id
+        logger.debug('Request string: %s - %s%s%s%s/%s', request_type, self.__url_base_ConfigurationManager, self.__url_base_v1, self.__url_base_objects, self.__url_storages, storage_device_id)
+        return_response=self._session_webrequest(request_type=request_type, fqdn_ip=fqdn_ip, port=port, username=username, password=password, url_suffix=str(self.__url_base_ConfigurationManager)+str(self.__url_base_v1)+self.__url_base_objects+self.__url_storages+'/'+str(storage_device_id))
+        logger.debug('Request response: %s', _LogPayload(return_response))
+        return(self.__check_response(return_response=return_response, key='all'))
+
     #gets the summaries of a storage
     def storage_summaries_get(self, fqdn_ip:str=None, port:str=None, username:str=None, password:str=None, timeout:int=90):
         #self.__url_storage_summaries
@@ -332,8 +603,6 @@ class RestAPI:
         #execute general procedures
         self._general_execute()
         
-        #set token to None so user and password is used
-        self._token = None
         #set internal values if nothing is specified
         if fqdn_ip == None:
             fqdn_ip = self._ip_fqdn
@@ -344,13 +613,13 @@ class RestAPI:
         if password == None:
             password = self.__password
 
-        logger.debug('Request string: '+str(request_type)+' - '+str(self.__url_base_ConfigurationManager)+str(self.__url_base_v1)+self.__url_base_objects+self.__url_storages+'/'+str(self._storage_device_id)+str(self.__url_storage_summaries))
+        logger.debug('Request string: %s - %s%s%s%s/%s%s', request_type, self.__url_base_ConfigurationManager, self.__url_base_v1, self.__url_base_objects, self.__url_storages, self._storage_device_id, self.__url_storage_summaries)
         return_response=self._webrequest(request_type=request_type, fqdn_ip=fqdn_ip, port=port, username=username, password=password, url_suffix=str(self.__url_base_ConfigurationManager)+str(self.__url_base_v1)+self.__url_base_objects+self.__url_storages+'/'+str(self._storage_device_id)+str(self.__url_storage_summaries), timeout=timeout)
-        logger.debug('Request response: ' + str(return_response))
+        logger.debug('Request response: %s', _LogPayload(return_response))
 
         return_response = self.__check_response(return_response=return_response, key='all')
         end = time.time()
-        logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+        logger.debug('total time used: %05.1fsec', end-start)
         return(return_response)
 
     #register a storage in the Configuration Manager API
@@ -359,22 +628,20 @@ class RestAPI:
         start = time.time()
         request_type = 'GET'
 
-        #set token to None so user and password is used
-        self._token = None
         #set internal values if nothing is specified
         #CM REST API
         if cmrest_username == None:
-            logger.debug('cm rest username set to: '+str(self._username))
+            logger.debug('cm rest username set to: %s', self._username)
             cmrest_username = self._username
         if cmrest_password == None:
             logger.debug('cmrest password set to the value you set as you instanciated it.')
             cmrest_password = self.__password
         if cmrestapi_fqdn_ip == None:
-            logger.debug('cmrestapi_fqdn_ip set to: '+str(self._ip_fqdn))
+            logger.debug('cmrestapi_fqdn_ip set to: %s', self._ip_fqdn)
             cmrestapi_fqdn_ip = self._ip_fqdn
         #Storage
         if storage_username == None:
-            logger.debug('storage username set to: '+str(self._username))
+            logger.debug('storage username set to: %s', self._username)
             storage_username = self._username
         if storage_password == None:
             logger.debug('storage password set to the value you set as you instanciated it.')
@@ -382,7 +649,7 @@ class RestAPI:
 
         #get storage device id
         storageDeviceId=self.storage_device_id_set(fqdn_ip=storage_fqdn_ip, port=storage_port, username=storage_username, password=storage_password)
-        logger.debug('storageDeviceId set to'+str(storageDeviceId))
+        logger.debug('storageDeviceId set to%s', storageDeviceId)
         return_response=self.storage_details_get(fqdn_ip=storage_fqdn_ip, port=storage_port, username=storage_username, password=storage_password)
 
         '''
@@ -398,14 +665,14 @@ class RestAPI:
         if type(return_response) == dict:
             storage_details = return_response
         else:
-            logger.error('Request response is not of type dictionary ('+str(type(return_response))+')')
+            logger.error('Request response is not of type dictionary (%s)', type(return_response))
             sys.exit()
 
         #create new body to register the storage
         body = {}
         if str(storage_details['model']) in ['VSP E990', 'VSP G350', 'VSP G370', 'VSP G700', 'VSP G900', 'VSP F350', 'VSP F370', 'VSP F700', 'VSP F900']:
             #"ctl1Ip",  "ctl2Ip", "model", "serialNumber"
-            logger.debug('Storage model: '+str(storage_details['model']))
+            logger.debug('Storage model: %s', storage_details['model'])
             body['model'] = storage_details['model']
             body['serialNumber'] = storage_details['serialNumber']
             body['ctl1Ip'] = storage_details['ctl1Ip']
@@ -413,23 +680,23 @@ class RestAPI:
         
         if str(storage_details['model']) in ['VSP 5100', 'VSP 5500', 'VSP 5100H', 'VSP 5500H', 'VSP G200', 'VSP G400', 'VSP G600', 'VSP G800', 'VSP G1000', 'VSP G1500', 'VSP F400', 'VSP F600', 'VSP F800', 'VSP F1500', 'VSP N400', 'VSP N600', 'VSP N800', 'HUS VM', 'VSP']:
             #model, serialNumber, svpIp, isSecure used
-            logger.debug('Storage model: '+str(storage_details['model']))
+            logger.debug('Storage model: %s', storage_details['model'])
             body['model'] = storage_details['model']
             body['serialNumber'] = storage_details['serialNumber']
             body['svpIp'] = storage_details['svpIp']
             body['isSecure'] = storage_details['isSecure']
         else:
-            logger.error('storage model not supported ('+str(return_response['model'])+')')
+            logger.error('storage model not supported (%s)', return_response['model'])
             return(-1)
             sys.exit()
 
-        logger.debug('Body set to: '+ json.dumps(body))
+        logger.debug('Body set to: %s', _LogPayload(body))
 
         #register storage        
         request_type = 'POST'
-        logger.debug('Request string: '+str(request_type)+' - '+str(self.__url_base+self.__url_storages))
+        logger.debug('Request string: %s - %s', request_type, self.__url_base+self.__url_storages)
         return_response=self._general_webrequest(request_type=request_type, fqdn_ip=cmrestapi_fqdn_ip, port=cmrestapi_port, username=cmrest_username, password=cmrest_password, body=json.dumps(body), url_suffix=self.__url_base+self.__url_storages)
-        logger.debug('Request response: ' + str(return_response))
+        logger.debug('Request response: %s', _LogPayload(return_response))
 
         return(return_response)
 
@@ -440,8 +707,6 @@ class RestAPI:
 
         return_value = None
 
-        #set token to None so user and password is used
-        self._token = None
         
         #set internal values if nothing is specified
         if username == None:
@@ -453,13 +718,21 @@ class RestAPI:
         if port == None:
             port = self._port
 
+        if self._storage_device_id == None and self.__disk_cache is not None:
+            entry = self.__disk_cache.get(fqdn_ip, port, serial_number)
+            if entry is not None and entry.get(self.__json_storage_device_id) is not None:
+                logger.info('storageDeviceID of the storage cache file used: %s', entry[self.__json_storage_device_id])
+                if not self.__disk_cache.is_fresh(entry):
+                    self._disk_cache_refresh(fqdn_ip=fqdn_ip, port=port, username=username, password=password, serial_number=serial_number)
+                return(entry[self.__json_storage_device_id])
+
         if self._storage_device_id == None:
             logger.info('storageDeviceID not set. Send request to find out.')
-            logger.debug('Request string: '+str(request_type)+' - '+str(self.__url_base+self.__url_storages))
+            logger.debug('Request string: %s - %s', request_type, self.__url_base+self.__url_storages)
             return_response=self.storage_systems_get(fqdn_ip=fqdn_ip, username=username, password=password, port=port)
-            logger.debug('Request response: ' + str(return_response))
+            logger.debug('Request response: %s', _LogPayload(return_response))
         else:
-            logger.info('storageDeviceID already set to: '+str(self._storage_device_id))
+            logger.info('storageDeviceID already set to: %s', self._storage_device_id)
             return(self._storage_device_id)
         
         if type(return_response) == dict:
@@ -485,18 +758,56 @@ class RestAPI:
                         sys.exit()
         else:
             #totally wrong return type
-            logger.error('The response is not of type list ('+str(type(return_response))+')')
+            logger.error('The response is not of type list (%s)', type(return_response))
             sys.exit()
 
+        if self.__disk_cache is not None:
+            self.__disk_cache.put(fqdn_ip, port, serial_number, storage_device_id=return_value)
+
         end = time.time()
-        logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+        logger.debug('total time used: %05.1fsec', end-start)
         return(return_value)
           
+    #refresh the entry of the storage cache file in the background
+    def _disk_cache_refresh(self, fqdn_ip:str=None, port:str=None, username:str=None, password:str=None, serial_number:str=None):
+        key = (str(fqdn_ip), str(port), str(serial_number))
+        with self.__disk_cache_lock:
+            if key in self.__disk_cache_refreshing:
+                return(None)
+            self.__disk_cache_refreshing.add(key)
+
+        def refresh():
+            try:
+                storages = self.storage_systems_get(fqdn_ip=fqdn_ip, port=port, username=username, password=password)
+                if type(storages) == dict and len(storages) > 0:
+                    if serial_number == None:
+                        storage = list(storages.values())[0] if len(storages) == 1 else None
+                    else:
+                        storage = {str(key): value for key, value in storages.items()}.get(str(serial_number))
+                    if storage is not None:
+                        storage_device_id = storage[self.__json_storage_device_id]
+                        entry = self.__disk_cache.get(fqdn_ip, port, serial_number)
+                        if entry is not None and not entry.get(self.__json_storage_device_id) == storage_device_id:
+                            logger.warning('WARNING: storageDeviceId of the storage cache file (%s) changed to %s. It is used from the next storage_device_id_set on.', entry.get(self.__json_storage_device_id), storage_device_id)
+                        self.__disk_cache.put(fqdn_ip, port, serial_number, storage_device_id=storage_device_id)
+                        #the session of this instance belongs to the storage that is set
+                        if storage_device_id == self._storage_device_id and self.__disk_cache.find(fqdn_ip, port, storage_device_id) is not None:
+                            details = self._storage_details_request(fqdn_ip=fqdn_ip, port=port, username=username, password=password, storage_device_id=storage_device_id)
+                            if type(details) == dict:
+                                self.__disk_cache.put(fqdn_ip, port, details.get(self.__json_serial_number), storage_device_id=storage_device_id, details=details)
+                        logger.debug('storage cache file refreshed: %s:%s - %s', fqdn_ip, port, serial_number)
+            except Exception as e:
+                logger.warning('WARNING: refresh of the storage cache file failed: %s', e)
+            finally:
+                with self.__disk_cache_lock:
+                    self.__disk_cache_refreshing.discard(key)
+
+        threading.Thread(target=refresh, name='HitachiBlockAPI-storage-cache-refresh', daemon=True).start()
+        return(None)
+
     #set storage device id        
     def storage_device_id_set(self, fqdn_ip:str=None, port:str=None, username:str=None, password:str=None, serial_number:str=None):
 
-        #set token to None so user and password is used
-        self._token = None
         #set internal values if nothing is specified
         if username == None:
             username = self._username
@@ -507,13 +818,16 @@ class RestAPI:
         if port == None:
             port = self._port
 
+        #the session belongs to the storage that was set until now
+        self._session_delete()
+
         #Set back the storageDeviceId to None
         self._storage_device_id = None
 
         #get storage device id
         return_response=self.storage_device_id_get(fqdn_ip=fqdn_ip, port=port, username=username, password=password, serial_number=serial_number)
         #set variable
-        logger.debug('set class variable "_storage_device_id" to "' + str(return_response) + '"')
+        logger.debug('set class variable "_storage_device_id" to "%s"', _LogPayload(return_response))
         self._storage_device_id = return_response
         return(return_response)
     
@@ -549,11 +863,11 @@ class RestAPI:
         #execute general procedures
         self._general_execute()
 
-        logger.debug('Request string: '+str(self.__url_base+self.__url_storages+'/'+self._storage_device_id+self.__url_jobs))
+        logger.debug('Request string: %s', self.__url_base+self.__url_storages+'/'+self._storage_device_id+self.__url_jobs)
         return_response = self._general_webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+self._storage_device_id+self.__url_jobs)
         
         end = time.time()
-        logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+        logger.debug('total time used: %05.1fsec', end-start)
         return(return_response)
         
     #get last job
@@ -567,42 +881,49 @@ class RestAPI:
         if return_response == None:
             logger.warning('WARNING: no job found')
             end = time.time()
-            logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+            logger.debug('total time used: %05.1fsec', end-start)
             return(None)
         else:
             end = time.time()
-            logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+            logger.debug('total time used: %05.1fsec', end-start)
             return(return_response[0])
     
     #get job by id
-    def _jobs_by_id_get(self, jobId:str=None):
+    def _jobs_by_id_get(self, jobId:str=None, timeout:int=30):
         '''
+        {"jobId": 43, "self": "/ConfigurationManager/v1/objects/storages/800000058068/jobs/43", "status": "Completed", "state": "Succeeded", ...}
         '''
         start = time.time()
-        return_value = None
+        request_type='GET'
 
-        return_response = self._jobs_get()
-        logger.debug('Request response: ' + str(return_response))
+        #execute general procedures
+        self._general_execute()
 
-        if not jobId == None:
-            for job in return_response:
-                if str(job['jobId']) == str(jobId):
-                    return_value = job
-            
-            #if the job id was not found in the list
-            if return_value == None:
-                logger.error('ERROR: response: jobId: "'+str(jobId)+'" is not found. Please specify an existing jobId.')
-                return_value = -1
-        else:
+        if jobId == None:
             logger.error('ERROR: response: jobId is "None". Please specify a valid jobId.')
             logger.info('all jobs are sent back')
-            return_value = return_response
+            return(self._jobs_get())
+
+        logger.debug('Request string: %s', self.__url_base+self.__url_storages+'/'+self._storage_device_id+self.__url_jobs+'/'+str(jobId))
+        return_value = self._general_webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+self._storage_device_id+self.__url_jobs+'/'+str(jobId), timeout=timeout, key='all')
+        logger.debug('Request response: %s', _LogPayload(return_value))
+
+        if not isinstance(return_value, dict):
+            logger.error('ERROR: response: jobId: "%s" is not found. Please specify an existing jobId.', jobId)
+            return_value = -1
 
         end = time.time()
-        logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+        logger.debug('total time used: %05.1fsec', end-start)
         return(return_value)
-        #get host groups of one port
-    
+
+    #wait until the jobs (Job of the functions with return_job=True) are completed
+    def jobs_wait(self, jobs:list, timeout:float=600, interval:float=0.5, max_interval:float=10):
+        start = time.time()
+        return_value = jobs_wait(self, jobs, timeout=timeout, interval=interval, max_interval=max_interval)
+        end = time.time()
+        logger.debug('total time used: %05.1fsec', end-start)
+        return(return_value)
+
     #get session id
     def _session_get(self):
         start = time.time()
@@ -611,10 +932,10 @@ class RestAPI:
         #execute general procedures
         self._general_execute()
 
-        logger.debug('Request string: '+str(self.__url_base+self.__url_storages+'/'+self._storage_device_id+self.__url_sessions))
+        logger.debug('Request string: %s', self.__url_base+self.__url_storages+'/'+self._storage_device_id+self.__url_sessions)
         #these requests do not use the general webrequest this function is part of it.
-        return_response=self._webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+self._storage_device_id+self.__url_sessions)
-        logger.debug('Request response: ' + str(return_response))
+        return_response=self._webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+self._storage_device_id+self.__url_sessions, token=self._token)
+        logger.debug('Request response: %s', _LogPayload(return_response))
 
         '''
         {
@@ -630,7 +951,7 @@ class RestAPI:
         '''
         return_response = self.__check_response(return_response=return_response)
         end = time.time()
-        logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+        logger.debug('total time used: %05.1fsec', end-start)
         return(return_response)
    
     #create session
@@ -642,13 +963,13 @@ class RestAPI:
         start = time.time()
         request_type='POST'
 
-        #set token to None so user and password is used
-        self._token = None
+        #the session is deleted by the array if it is not used for aliveTime seconds
+        body = json.dumps({'aliveTime': self.__session_alive_time})
 
-        logger.debug('Request string: '+str(self.__url_base+self.__url_storages+'/'+self._storage_device_id+self.__url_sessions))
-        #these requests do not use the general webrequest this function is part of it.
-        return_response=self._webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+self._storage_device_id+self.__url_sessions)
-        logger.debug('Request response: ' + str(return_response))
+        logger.debug('Request string: %s', self.__url_base+self.__url_storages+'/'+self._storage_device_id+self.__url_sessions)
+        #these requests do not use the general webrequest this function is part of it. user and password are used.
+        return_response=self._webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+self._storage_device_id+self.__url_sessions, body=body)
+        logger.debug('Request response: %s', _LogPayload(return_response))
 
         '''
         {
@@ -660,17 +981,19 @@ class RestAPI:
 
         return_response = self.__check_response(return_response=return_response, key='all')
         if type(return_response) == dict:      
-            logger.debug('token: ' + str(return_response[self.__json_token]))
+            logger.debug('token: %s', return_response[self.__json_token])
             self._token = return_response[self.__json_token]
-            logger.debug('session id: ' + str(return_response[self.__json_sessionId]))
+            logger.debug('session id: %s', return_response[self.__json_sessionId])
             self._session_id = return_response[self.__json_sessionId]
+            self.__session_last_used = time.monotonic()
+            self.__metrics.session_created()
             return_value = None
         else:
             logger.error('the response was not in dictionary or json format.')
             return_value = -1
-        
+    
         end = time.time()
-        logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+        logger.debug('total time used: %05.1fsec', end-start)
         return(return_value)
         
     #delete session
@@ -682,21 +1005,22 @@ class RestAPI:
         start = time.time()
         request_type='DELETE'
 
-        if self._session_id == None:
-            return('WARNING: nothing done as no session was created')
-        else:
-            logger.debug('Request string: '+str(self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+self.__url_sessions+'/'+str(self._session_id)))
-            #these requests do not use the general webrequest this function is part of it.
-            return_response = self._webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+self.__url_sessions+'/'+str(self._session_id))
-            logger.debug('Request response: ' + str(return_response))
-
-            return_response = self.__check_response(return_response=return_response, key='all')
-            self._token = None
-            self._session_id = None
-            return_value = None
+        with self.__session_lock:
+            if self._session_id == None:
+                return('WARNING: nothing done as no session was created')
+            else:
+                logger.debug('Request string: %s', self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+self.__url_sessions+'/'+str(self._session_id))
+                #these requests do not use the general webrequest this function is part of it.
+                return_response = self._webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+self.__url_sessions+'/'+str(self._session_id), token=self._token)
+                logger.debug('Request response: %s', _LogPayload(return_response))
+
+                return_response = self.__check_response(return_response=return_response, key='all')
+                self._token = None
+                self._session_id = None
+                return_value = None
                     
         end = time.time()
-        logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+        logger.debug('total time used: %05.1fsec', end-start)
         return(return_value)
     
     #lock the resource
@@ -720,9 +1044,9 @@ class RestAPI:
         }
         '''
         #lock the resources
-        logger.debug('Request string: '+str(self.__url_base_ConfigurationManager)+str(self.__url_base_v1)+'/'+str(self._storage_device_id)+str(self.__url_resource_lock))
+        logger.debug('Request string: %s%s/%s%s', self.__url_base_ConfigurationManager, self.__url_base_v1, self._storage_device_id, self.__url_resource_lock)
         return_response = self._general_webrequest(request_type=request_type, url_suffix=str(self.__url_base_ConfigurationManager)+str(self.__url_base_v1)+'/'+str(self._storage_device_id)+str(self.__url_resource_lock), body=body)
-        logger.debug('Request response: ' + str(return_response))
+        logger.debug('Request response: %s', _LogPayload(return_response))
 
         return(return_response)
 
@@ -777,12 +1101,12 @@ class RestAPI:
         #execute general procedures
         self._general_execute()
 
-        logger.debug('Request string: '+str(self.__url_base+self.__url_storages + '/' + str(self._storage_device_id) + '/resource-groups'))
+        logger.debug('Request string: %s', self.__url_base+self.__url_storages + '/' + str(self._storage_device_id) + '/resource-groups')
         return_response = self._general_webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages + '/' + str(self._storage_device_id) + '/resource-groups', timeout=timeout)
-        logger.debug('Request response: ' + str(return_response))
+        logger.debug('Request response: %s', _LogPayload(return_response))
 
         end = time.time()
-        logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+        logger.debug('total time used: %05.1fsec', end-start)
         return(return_response[0])
 
     #get pools
@@ -796,9 +1120,9 @@ class RestAPI:
 
         if poolId == None:
             #get the information of all ports
-            logger.debug('Request string: '+str(self.__url_base)+self.__url_storages+'/'+str(self._storage_device_id)+str(self.__url_pools))
+            logger.debug('Request string: %s%s/%s%s', self.__url_base, self.__url_storages, self._storage_device_id, self.__url_pools)
             return_response = self._general_webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+str(self.__url_pools))
-            logger.debug('Request response: ' + str(return_response))
+            logger.debug('Request response: %s', _LogPayload(return_response))
             if isinstance(return_response, list):
                 #create dictionary out of the response
                 pools = {}
@@ -809,27 +1133,33 @@ class RestAPI:
                     pools[str(pool['poolId'])] = pool
                 return_value = pools
             else:
-                logger.error('Response is not a list. output: '+ str(return_response))
+                logger.error('Response is not a list. output: %s', _LogPayload(return_response))
                 return_value = -1
         else:
             if str(poolId).isnumeric():
-                logger.debug('Request string: '+str(self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+str(self.__url_pools)+'/'+str(poolId)))
-                return_response = self._webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+str(self.__url_pools)+'/'+str(poolId))
-                return_response = self.__check_response(return_response=return_response, key='all')
-                logger.debug('Request response: ' + str(return_response))
+                logger.debug('Request string: %s', self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+str(self.__url_pools)+'/'+str(poolId))
+                return_response = self._general_webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+str(self.__url_pools)+'/'+str(poolId), key='all')
+                logger.debug('Request response: %s', _LogPayload(return_response))
                 #create dictionary out of the response
                 pools = {}
                 pools[str(return_response['poolId'])] = {}
                 pools[str(return_response['poolId'])] = return_response
                 return_value = pools
             else:
-                logger.error('Pool Id is not a number ('+str(poolId)+'). Must be between 0 and 127')
+                logger.error('Pool Id is not a number (%s). Must be between 0 and 127', poolId)
                 return_value = -1     
         
         end = time.time()
-        logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+        logger.debug('total time used: %05.1fsec', end-start)
         return(return_value)
 
+    #columns (NumPy or array module arrays) of the pools
+    def pools_columns_get(self, fields:tuple=None, timeout:int=30):
+        pools = self.pools_get(timeout=timeout)
+        if not isinstance(pools, dict):
+            return(pools)
+        return(columnar.pool_columns(pools, fields=fields))
+
     #get ports
     def ports_get(self, portId=None, logins:bool=True, timeout:int=180):
         start = time.time()
@@ -855,13 +1185,13 @@ class RestAPI:
         if portId == None:
             #get the information of all ports
             if logins == True:
-                logger.debug('Request string: '+self.__url_base+self.__url_storages+'/'+self._storage_device_id+self.__url_ports+'?detailInfoType=logins')
+                logger.debug('Request string: %s%s/%s%s?detailInfoType=logins', self.__url_base, self.__url_storages, self._storage_device_id, self.__url_ports)
                 return_response = self._general_webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+self._storage_device_id+self.__url_ports+'?detailInfoType=logins', timeout=timeout)
             else:
-                logger.debug('Request string: '+str(self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+str(self.__url_ports)))
+                logger.debug('Request string: %s', self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+str(self.__url_ports))
                 return_response = self._general_webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+self._storage_device_id+self.__url_ports, timeout=timeout)
 
-            logger.debug('Request response: ' + str(return_response))
+            logger.debug('Request response: %s', _LogPayload(return_response))
             if isinstance(return_response, list):
                 ports = {}
                 i = 0
@@ -871,25 +1201,24 @@ class RestAPI:
                     ports[str(port['portId'])] = port
                 return_value = ports
             else:
-                logger.error('Response is not a list. output: '+ str(return_response))
+                logger.error('Response is not a list. output: %s', _LogPayload(return_response))
                 return_value = -1
         else:
             #just one specifig port, login info not available. but class info available
-            logger.debug('Request string: '+self.__url_base+self.__url_storages+'/'+self._storage_device_id+self.__url_ports+'/'+str(portId)+'?detailInfoType=class')
-            return_response = self._webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+str(self.__url_ports)+'/'+str(portId)+'?detailInfoType=class', timeout=timeout)
-            return_response = self.__check_response(return_response=return_response, key='all')
-            logger.debug('Request response: ' + str(return_response))
+            logger.debug('Request string: %s%s/%s%s/%s?detailInfoType=class', self.__url_base, self.__url_storages, self._storage_device_id, self.__url_ports, portId)
+            return_response = self._general_webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+str(self.__url_ports)+'/'+str(portId)+'?detailInfoType=class', timeout=timeout, key='all')
+            logger.debug('Request response: %s', _LogPayload(return_response))
             ports = {}
             ports[str(return_response['portId'])] = {}
             ports[str(return_response['portId'])] = return_response
             return_value = ports
         
         end = time.time()
-        logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+        logger.debug('total time used: %05.1fsec', end-start)
         return(return_value)
 
     #get all ldevs or a specifig ldev
-    def ldevs_get(self, ldevNumber=None, count=16384, timeout:int=1000):
+    def ldevs_get(self, ldevNumber=None, count=16384, timeout:int=1000, page_size:int=None, typed:bool=False):
         start = time.time()
         #max ldevs 16384
         request_type='GET'
@@ -897,22 +1226,37 @@ class RestAPI:
         #execute general procedures
         self._general_execute()
         
+        if ldevNumber == None and not page_size == None:
+            #page by page, the timeout is per page
+            ldevs = {}
+            try:
+                for ldev in self.ldevs_iter(page_size=page_size, count=count, timeout=timeout, typed=typed):
+                    ldevs[ldev[self.__json_ldevId]] = ldev
+            except PageError as e:
+                #a part of the ldevs is not a result
+                logger.error('ERROR: ldevs could not be read: %s', e)
+                end = time.time()
+                logger.debug('total time used: %05.1fsec', end-start)
+                return(-1)
+            end = time.time()
+            logger.debug('total time used: %05.1fsec', end-start)
+            return(ldevs)
+
         if ldevNumber == None:
             if timeout == 30:
                 timeout = 600
-            logger.debug('Request string: '+str(self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+'/ldevs?count='+str(count)))
+            logger.debug('Request string: %s', self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+'/ldevs?count='+str(count))
             return_response = self._general_webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+'/ldevs?count='+str(count), timeout=timeout)
-            logger.debug('Request response: ' + str(return_response))
+            logger.debug('Request response: %s', _LogPayload(return_response))
         else:
             if str(ldevNumber).isnumeric():
-                logger.debug('Request string: '+str(self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+'/ldevs/'+str(ldevNumber)))
-                return_response = self._webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+'/ldevs/'+str(ldevNumber), timeout=timeout)
-                return_response = self.__check_response(return_response=return_response, key='all')
-                logger.debug('Request response: ' + str(return_response))
+                logger.debug('Request string: %s', self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+'/ldevs/'+str(ldevNumber))
+                return_response = self._general_webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+'/ldevs/'+str(ldevNumber), timeout=timeout, key='all')
+                logger.debug('Request response: %s', _LogPayload(return_response))
             else:
-                logger.error('ERROR: response: ldevNumber[dec] "'+str(ldevNumber)+'" is not a decimal ldev number')
+                logger.error('ERROR: response: ldevNumber[dec] "%s" is not a decimal ldev number', ldevNumber)
                 end = time.time()
-                logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+                logger.debug('total time used: %05.1fsec', end-start)
                 return(-1)
 
         #if it is not a list then make it to one with one element
@@ -926,13 +1270,80 @@ class RestAPI:
         for ldev in return_response:
             i += 1
             ldevs[ldev[self.__json_ldevId]] = ldev
-        
+
+        #compact records instead of the dictionaries
+        if typed == True:
+            ldevs = records_from(Ldev, ldevs)
+
         end = time.time()
-        logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+        logger.debug('total time used: %05.1fsec', end-start)
         return(ldevs)
 
+    #columns (NumPy or array module arrays) of the ldevs, with hostgroups=True one row per ldev and host group
+    def ldevs_columns_get(self, count=16384, page_size:int=None, fields:tuple=None, hostgroups:bool=False, timeout:int=1000):
+        start = time.time()
+        ldevs = self.ldevs_get(count=count, page_size=page_size, timeout=timeout, typed=True)
+        if not isinstance(ldevs, dict):
+            return(ldevs)
+        if hostgroups == True:
+            columns = columnar.ldev_hostgroup_columns(ldevs) if fields == None else columnar.ldev_hostgroup_columns(ldevs, fields=fields)
+        else:
+            columns = columnar.ldev_columns(ldevs) if fields == None else columnar.ldev_columns(ldevs, fields=fields)
+        end = time.time()
+        logger.debug('total time used: %05.1fsec', end-start)
+        return(columns)
+
+    #get the ldevs page by page and yield every ldev as soon as its page arrived
+    def ldevs_iter(self, page_size:int=1000, headLdevId:int=0, count:int=None, timeout:int=120, retries:int=2, typed:bool=False):
+        '''Yield the ldevs (dict) starting at headLdevId in ldev id order.
+        Every page is requested with headLdevId/count and a failed page is requested again (max. retries times).
+        Raise PageError if a page still fails, the ldevs yielded until then are not complete.
+        '''
+        start = time.time()
+        request_type='GET'
+
+        #execute general procedures
+        self._general_execute()
+
+        returned = 0
+        while count == None or returned < count:
+            if count == None:
+                page_count = page_size
+            else:
+                page_count = min(page_size, count - returned)
+            url_suffix = self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+'/ldevs?headLdevId='+str(headLdevId)+'&count='+str(page_count)
+
+            for attempt in range(retries + 1):
+                logger.debug('Request string: %s', url_suffix)
+                return_response = self._session_webrequest(request_type=request_type, url_suffix=url_suffix, timeout=timeout)
+                if return_response[0] == 0:
+                    break
+                logger.warning('WARNING: ldev page starting at ldev %s failed (%s. try): %s', headLdevId, attempt+1, return_response[1])
+            else:
+                logger.error('ERROR: ldev page starting at ldev %s could not be read. %s ldevs returned.', headLdevId, returned)
+                raise PageError('ldev page starting at ldev '+str(headLdevId)+' could not be read: '+str(return_response[1]))
+
+            return_response = self.__check_response(return_response=return_response)
+            #empty page (the ldevs before were the last ones, e.g. a multiple of page_size)
+            if return_response == None:
+                logger.debug('ldev page starting at ldev %s: no more ldevs', headLdevId)
+                break
+            if not isinstance(return_response, list):
+                logger.error('ERROR: ldev page starting at ldev %s has no ldev list. %s ldevs returned.', headLdevId, returned)
+                raise PageError('ldev page starting at ldev '+str(headLdevId)+' has no ldev list: '+str(return_response))
+            logger.debug('ldev page starting at ldev %s: %s ldevs', headLdevId, len(return_response))
+            for ldev in return_response:
+                yield(Ldev.from_dict(ldev) if typed == True else ldev)
+            returned += len(return_response)
+            if len(return_response) < page_count:
+                break
+            headLdevId = return_response[-1][self.__json_ldevId] + 1
+
+        end = time.time()
+        logger.debug('total time used: %05.1fsec', end-start)
+
     #get hostgroups of one port
-    def host_groups_one_port_get(self, portId, timeout:int=600):
+    def host_groups_one_port_get(self, portId, timeout:int=600, typed:bool=False):
         start = time.time()
         request_type='GET'
 
@@ -948,9 +1359,18 @@ class RestAPI:
                  'resourceGroupId': 0, 
                        'isDefined': True}}
         '''
-        logger.debug('Request string: '+str(self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+'/host-groups?portId='+portId+'&isUndefined=false&detailInfoType=resourceGroup'))
-        return_response = self._general_webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+'/host-groups?portId='+portId+'&isUndefined=false&detailInfoType=resourceGroup', timeout=timeout)
-        logger.debug('Request response: ' + str(return_response))
+        logger.debug('Request string: %s', self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+'/host-groups?portId='+portId+'&isUndefined=false&detailInfoType=resourceGroup')
+        return_response = self._session_webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+'/host-groups?portId='+portId+'&isUndefined=false&detailInfoType=resourceGroup', timeout=timeout)
+        if not return_response[0] == 0:
+            logger.error('ERROR: host groups of port %s could not be read: %s', portId, return_response[1])
+            end = time.time()
+            logger.debug('total time used: %05.1fsec', end-start)
+            return(-1)
+        return_response = self.__check_response(return_response=return_response)
+        logger.debug('Request response: %s', _LogPayload(return_response))
+        if not isinstance(return_response, list):
+            #no host groups on this port
+            return_response = []
 
         hostGroups = {}
         #print('Number of storage hostgroups of port ('+ str(portId) +'):', len(return_response))
@@ -960,39 +1380,101 @@ class RestAPI:
             #print(str(hostGroup['hostGroupId']), ' hostgroup ' + str(i) + 'of' + str(len(return_response)))
             hostGroups[str(hostGroup['hostGroupId'])] = hostGroup
 
+        #compact records instead of the dictionaries
+        if typed == True:
+            hostGroups = records_from(HostGroup, hostGroups)
+
         end = time.time()
-        logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+        logger.debug('total time used: %05.1fsec', end-start)
         return(hostGroups)
 
     #get host group of all ports
-    def host_groups_all_ports_get(self, timeout:int=600):
+    def host_groups_all_ports_get(self, timeout:int=600, parallel:int=None, bulk:bool=True, typed:bool=False):
         start = time.time()
         request_type='GET'
 
         #execute general procedures
         self._general_execute()
 
-        #get all portIds
-        return_response = self.ports_get()
-        logger.debug('Request response: ' + str(return_response))
+        #host groups of all ports with one request
+        if bulk == True and self.__host_groups_bulk == True:
+            hostgroups, unsupported = self._host_groups_bulk_get(timeout=timeout)
+            if not hostgroups == None:
+                if typed == True:
+                    hostgroups = records_from(HostGroup, hostgroups)
+                end = time.time()
+                logger.debug('total time used: %05.1fsec', end-start)
+                return(hostgroups)
+            if unsupported == True:
+                logger.info('the host groups of all ports can not be requested at once. request them port by port.')
+                self.__host_groups_bulk = False
+            else:
+                #e.g. 503 or timeout, the next call tries it at once again
+                logger.warning('WARNING: the host groups of all ports could not be read at once. request them port by port.')
+
+        #get all portIds (the login details are not needed)
+        return_response = self.ports_get(logins=False)
+        logger.debug('Request response: %s', _LogPayload(return_response))
+        if not isinstance(return_response, dict):
+            logger.error('ERROR: ports could not be read. host groups not available.')
+            end = time.time()
+            logger.debug('total time used: %05.1fsec', end-start)
+            return(-1)
         
         hostgroups = {}
-        
-        i = 0
-        for port in return_response:               
-            #host group infos
-            logger.info(port)
-            return_response_hostgroup = self.host_groups_one_port_get(portId=port, timeout=timeout)
+
+        #host group infos of all ports, max. parallel requests at the same time
+        return_response_hostgroups = self._parallel_map(lambda port: self.host_groups_one_port_get(portId=port, timeout=timeout, typed=typed), return_response, parallel=parallel)
+
+        for port, return_response_hostgroup in zip(return_response, return_response_hostgroups):
+            logger.info('%s', port)
+            #the host groups of the other ports are not all host groups
+            if not isinstance(return_response_hostgroup, dict):
+                logger.error('ERROR: host groups of port %s could not be read. host groups not available.', port)
+                end = time.time()
+                logger.debug('total time used: %05.1fsec', end-start)
+                return(-1)
             for hostgroup in return_response_hostgroup:
-                logger.info(hostgroup)
+                logger.info('%s', hostgroup)
                 hostgroups[hostgroup] = return_response_hostgroup[hostgroup]
 
         end = time.time()
-        logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+        logger.debug('total time used: %05.1fsec', end-start)
         return(hostgroups)
 
+    #get host groups of all ports with one request. (host groups, False) or (None, True) if the storage does not support it, (None, False) if the request failed
+    def _host_groups_bulk_get(self, timeout:int=600):
+        request_type='GET'
+
+        logger.debug('Request string: %s', self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+'/host-groups?isUndefined=false&detailInfoType=resourceGroup')
+        return_response = self._session_webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+'/host-groups?isUndefined=false&detailInfoType=resourceGroup', timeout=timeout)
+        if not return_response[0] == 0:
+            logger.debug('Request response: %s', _LogPayload(return_response))
+            #the storage rejects the request without portId (4xx), other errors (5xx, timeout, circuit open) are transient
+            unsupported = isinstance(return_response[1], int) and 400 <= return_response[1] < 500 and return_response[1] not in (401, 408, 429)
+            return(None, unsupported)
+        return_response = self.__check_response(return_response=return_response)
+        if return_response == None:
+            #no host groups
+            return({}, False)
+        if not isinstance(return_response, list):
+            logger.debug('Request response: %s', _LogPayload(return_response))
+            return(None, False)
+
+        #group by port (in the order the ports are returned) like host_groups_one_port_get of every port
+        ports = {}
+        for hostGroup in return_response:
+            ports.setdefault(hostGroup['portId'], []).append(hostGroup)
+
+        hostgroups = {}
+        for port in ports:
+            logger.info('%s', port)
+            for hostGroup in ports[port]:
+                hostgroups[str(hostGroup['hostGroupId'])] = hostGroup
+        return(hostgroups, False)
+
     #get luns of one hostgroup
-    def luns_get(self, portId_hostGroupId, timeout:int=30):
+    def luns_get(self, portId_hostGroupId, timeout:int=30, typed:bool=False):
         start = time.time()
         request_type='GET'
 
@@ -1019,46 +1501,57 @@ class RestAPI:
 
         #'CL3-B,5' -> 'CL3-B' and '5'
         port, hostgroup = portId_hostGroupId.split(',')
-        logger.debug('Port:'+str(port)+' hostgroup: '+ str(hostgroup))
+        logger.debug('Port:%s hostgroup: %s', port, hostgroup)
 
-        logger.debug('Request string: '+str(self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+'/luns?portId='+str(port)+'&hostGroupNumber='+str(hostgroup)+'&isBasicLunInformation=false&lunOption=ALUA'))
-        return_response = self._general_webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+'/luns?portId='+str(port)+'&hostGroupNumber='+str(hostgroup)+'&isBasicLunInformation=false&lunOption=ALUA', timeout=timeout)
-        logger.debug('Request response: ' + str(return_response))
+        logger.debug('Request string: %s', self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+'/luns?portId='+str(port)+'&hostGroupNumber='+str(hostgroup)+'&isBasicLunInformation=false&lunOption=ALUA')
+        return_response = self._session_webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+'/luns?portId='+str(port)+'&hostGroupNumber='+str(hostgroup)+'&isBasicLunInformation=false&lunOption=ALUA', timeout=timeout)
+        #a failed request is -1, not the None of a host group without luns
+        if not return_response[0] == 0:
+            logger.error('ERROR: luns of host group %s could not be read: %s', portId_hostGroupId, return_response[1])
+            end = time.time()
+            logger.debug('total time used: %05.1fsec', end-start)
+            return(-1)
+        return_response = self.__check_response(return_response=return_response)
+        logger.debug('Request response: %s', _LogPayload(return_response))
 
         #No LUN found in hostgroup
         if return_response == None:
-            logger.warning('No LUN(s) found in Hostgroup: '+str(portId_hostGroupId))
+            logger.warning('No LUN(s) found in Hostgroup: %s', portId_hostGroupId)
             end = time.time()
-            logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+            logger.debug('total time used: %05.1fsec', end-start)
             return(None)
         
         #Internal Error (no hostgroup on port)
         if isinstance(return_response, (list,)):
             if isinstance(return_response[0], (int,)):
                 if return_response[0] == -1:
-                    logger.error('error message :'+str(return_response))
+                    logger.error('error message :%s', _LogPayload(return_response))
                     end = time.time()
-                    logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+                    logger.debug('total time used: %05.1fsec', end-start)
                     return(None)
                 else:
                     logger.error('Unknown error')
                     end = time.time()
-                    logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+                    logger.debug('total time used: %05.1fsec', end-start)
                     return(return_response)
 
         luns = {}
         i = 0
         for lun in return_response:
             i += 1
-            logger.debug('lun information: ' + str(lun))
+            logger.debug('lun information: %s', lun)
             luns[str(lun['lunId'])] = lun
 
+        #compact records instead of the dictionaries
+        if typed == True:
+            luns = records_from(Lun, luns)
+
         end = time.time()
-        logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+        logger.debug('total time used: %05.1fsec', end-start)
         return(luns)
     
     #get the luns of one hostgroups of one port
-    def luns_one_port_get(self, portId, timeout:int=60):
+    def luns_one_port_get(self, portId, timeout:int=60, parallel:int=None, typed:bool=False):
         start = time.time()
         request_type='GET'
 
@@ -1085,62 +1578,73 @@ class RestAPI:
 
         #get all hostgroups of a port
         return_response = self.host_groups_one_port_get(portId=portId, timeout=timeout)
-        logger.debug('Request response: ' + str(return_response))
+        logger.debug('Request response: %s', _LogPayload(return_response))
+        if not isinstance(return_response, dict):
+            end = time.time()
+            logger.debug('total time used: %05.1fsec', end-start)
+            return(-1)
+
+        #luns of all hostgroups, max. parallel requests at the same time
+        return_response_luns_all = self._parallel_map(lambda hostGroup: self.luns_get(portId_hostGroupId=hostGroup, typed=typed), return_response, parallel=parallel)
 
         luns = {}
-        logger.info('Number of storage hostgroups of port ('+ str(portId) +'): ' + str(len(return_response)))
+        logger.info('Number of storage hostgroups of port (%s): %s', portId, len(return_response))
         i = 0
-        for hostGroup in return_response:
+        for hostGroup, return_response_luns in zip(return_response, return_response_luns_all):
             i += 1
-            logger.info(str(hostGroup) + ' hostgroup ' + str(i) + 'of' + str(len(return_response)))
-            logger.debug('Hostgroup raw data:'+str(return_response[hostGroup]))
-
-            return_response_luns = self.luns_get(portId_hostGroupId=hostGroup)
-            logger.debug('Request response: ' + str(return_response_luns))
-            if return_response_luns == None:
-                #ignore hostgroup -> no luns in this hostgroup
-                #logger.warning('No LUN(s) configured in hostgroup:'+str(hostGroup))
+            logger.info('%s hostgroup %sof%s', hostGroup, i, len(return_response))
+            logger.debug('Hostgroup raw data:%s', _LogPayload(return_response[hostGroup]))
+            logger.debug('Request response: %s', _LogPayload(return_response_luns))
+            if not isinstance(return_response_luns, dict):
+                #ignore hostgroup -> no luns in this hostgroup (or not readable)
+                #logger.warning('No LUN(s) configured in hostgroup: %s', hostGroup)
                 pass
             else:
                 for lun in return_response_luns:
                     luns[lun] = return_response_luns[lun]
         
         end = time.time()
-        logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+        logger.debug('total time used: %05.1fsec', end-start)
         if len(luns) == 0:    
             return(None)
         else:
             return(luns)
 
     #get the luns of all hostgroups of one port
-    def luns_all_ports_get(self, timeout:int=60):
+    def luns_all_ports_get(self, timeout:int=60, parallel:int=None, typed:bool=False):
         start = time.time()
         request_type='GET'
 
         #execute general procedures
         self._general_execute()
 
-        #get all portIds
-        return_response = self.ports_get()
-        logger.debug('Request response: ' + str(return_response))
+        #get the hostgroups of all ports
+        return_response = self.host_groups_all_ports_get(timeout=timeout, parallel=parallel)
+        logger.debug('Request response: %s', _LogPayload(return_response))
+        if not isinstance(return_response, dict):
+            end = time.time()
+            logger.debug('total time used: %05.1fsec', end-start)
+            return(-1)
+
+        #luns of all hostgroups, max. parallel requests at the same time
+        return_response_luns_all = self._parallel_map(lambda hostGroup: self.luns_get(portId_hostGroupId=hostGroup, timeout=timeout, typed=typed), return_response, parallel=parallel)
 
         luns = {}
         i = 0
-        for port in return_response:               
+        for hostGroup, return_response_luns in zip(return_response, return_response_luns_all):
             #host group infos
-            logger.info(port)
-            return_response_luns = self.luns_one_port_get(portId=port, timeout=timeout)
-            logger.debug('Request response: ' + str(return_response_luns))
-            if not return_response_luns == None:
+            logger.info('%s', hostGroup)
+            logger.debug('Request response: %s', _LogPayload(return_response_luns))
+            if isinstance(return_response_luns, dict):
                 for lun in return_response_luns:
                     luns[lun] = return_response_luns[lun]
 
         end = time.time()
-        logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+        logger.debug('total time used: %05.1fsec', end-start)
         return(luns)      
 
     #get the wwns of one hostgroups of one port
-    def wwns_get(self, portId_hostGroupId, timeout:int=30):
+    def wwns_get(self, portId_hostGroupId, timeout:int=30, typed:bool=False):
         start = time.time()
         request_type='GET'
 
@@ -1150,9 +1654,16 @@ class RestAPI:
         #'CL3-B,5' -> 'CL3-B' and '5'
         port, hostgroup = portId_hostGroupId.split(',')
 
-        logger.debug('Request string: '+str(self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+'/host-wwns?portId='+str(port)+'&hostGroupNumber='+str(hostgroup)))
-        return_response = self._general_webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+'/host-wwns?portId='+str(port)+'&hostGroupNumber='+str(hostgroup), timeout=timeout)
-        logger.debug('Request response: ' + str(return_response))
+        logger.debug('Request string: %s', self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+'/host-wwns?portId='+str(port)+'&hostGroupNumber='+str(hostgroup))
+        return_response = self._session_webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+'/host-wwns?portId='+str(port)+'&hostGroupNumber='+str(hostgroup), timeout=timeout)
+        #a failed request is -1, not the None of a host group without wwns
+        if not return_response[0] == 0:
+            logger.error('ERROR: wwns of host group %s could not be read: %s', portId_hostGroupId, return_response[1])
+            end = time.time()
+            logger.debug('total time used: %05.1fsec', end-start)
+            return(-1)
+        return_response = self.__check_response(return_response=return_response)
+        logger.debug('Request response: %s', _LogPayload(return_response))
 
         '''
         [{'hostWwnId': 'CL1-B,6,2400000087805858', 'portId': 'CL1-B', 'hostGroupNumber': 6, 'hostGroupName': 'CB500_Blade4_pepalma', 'hostWwn': '2400000087805858', 'wwnNickname': 'pepalma'}]
@@ -1160,23 +1671,23 @@ class RestAPI:
 
         #No WWN found in hostgroup
         if return_response == None:
-            logger.warning('Warning: No WWN found in Hostgroup '+str(portId_hostGroupId))
+            logger.warning('Warning: No WWN found in Hostgroup %s', portId_hostGroupId)
             end = time.time()
-            logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+            logger.debug('total time used: %05.1fsec', end-start)
             return(None)
 
         #Internal Error (no hostgroup on port)
         if isinstance(return_response, (list,)):
             if isinstance(return_response[0], (int,)):
                 if return_response[0] == -1:
-                    logger.error('error message :'+str(return_response))
+                    logger.error('error message :%s', _LogPayload(return_response))
                     end = time.time()
-                    logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+                    logger.debug('total time used: %05.1fsec', end-start)
                     return(None)
                 else:
                     logger.error('Unknown error')
                     end = time.time()
-                    logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+                    logger.debug('total time used: %05.1fsec', end-start)
                     return(return_response)
 
         wwns = {}
@@ -1185,13 +1696,17 @@ class RestAPI:
         for wwn in return_response:
             i += 1
             wwns[wwn[self.__json_hostWwnId]] = wwn
+
+        #compact records instead of the dictionaries
+        if typed == True:
+            wwns = records_from(Wwn, wwns)
         
         end = time.time()
-        logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+        logger.debug('total time used: %05.1fsec', end-start)
         return(wwns)
 
     #get the wwns of all hostgroups of one port
-    def wwns_one_port_get(self, portId, timeout:int=30):
+    def wwns_one_port_get(self, portId, timeout:int=30, parallel:int=None, typed:bool=False):
         start = time.time()
         request_type='GET'
 
@@ -1200,60 +1715,109 @@ class RestAPI:
 
         #get all hostgroups of a port
         return_response = self.host_groups_one_port_get(portId=portId, timeout=timeout)
-        logger.debug('Request response: ' + str(return_response))
+        logger.debug('Request response: %s', _LogPayload(return_response))
+        if not isinstance(return_response, dict):
+            end = time.time()
+            logger.debug('total time used: %05.1fsec', end-start)
+            return(-1)
+
+        #wwns of all hostgroups, max. parallel requests at the same time
+        return_response_wwns_all = self._parallel_map(lambda hostGroup: self.wwns_get(portId_hostGroupId=hostGroup, timeout=timeout, typed=typed), return_response, parallel=parallel)
 
         wwns = {}
-        logger.info('Number of storage hostgroups of port ('+ str(portId) +'): ' + str(len(return_response)))
+        logger.info('Number of storage hostgroups of port (%s): %s', portId, len(return_response))
         i = 0
-        for hostGroup in return_response:
+        for hostGroup, return_response_wwns in zip(return_response, return_response_wwns_all):
             i += 1
-            logger.info(str(hostGroup) + ' hostgroup ' + str(i) + 'of' + str(len(return_response)))
-            logger.debug('Hostgroup raw data:'+str(return_response[hostGroup]))
-
-            return_response_wwns = self.wwns_get(portId_hostGroupId=hostGroup, timeout=timeout)
-            logger.debug('Request response: ' + str(return_response_wwns))
-            if return_response_wwns == None:
-                #ignore hostgroup -> no wwn(s) in this hostgroup
+            logger.info('%s hostgroup %sof%s', hostGroup, i, len(return_response))
+            logger.debug('Hostgroup raw data:%s', _LogPayload(return_response[hostGroup]))
+            logger.debug('Request response: %s', _LogPayload(return_response_wwns))
+            if not isinstance(return_response_wwns, dict):
+                #ignore hostgroup -> no wwn(s) in this hostgroup (or not readable)
                 pass
             else:
                 for wwn in return_response_wwns:
                     wwns[wwn] = return_response_wwns[wwn]
         
         end = time.time()
-        logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+        logger.debug('total time used: %05.1fsec', end-start)
         if len(wwns) == 0:    
             return(None)
         else:
             return(wwns)
 
     #get the wwns of all hostgroups of all ports
-    def wwns_all_ports_get(self, timeout:int=300):
+    def wwns_all_ports_get(self, timeout:int=300, parallel:int=None, typed:bool=False):
         start = time.time()
         request_type='GET'
 
         #execute general procedures
         self._general_execute()
 
-        #get all portIds
-        return_response = self.ports_get()
-        logger.debug('Request response: ' + str(return_response))
+        #get the hostgroups of all ports
+        return_response = self.host_groups_all_ports_get(timeout=timeout, parallel=parallel)
+        logger.debug('Request response: %s', _LogPayload(return_response))
+        if not isinstance(return_response, dict):
+            end = time.time()
+            logger.debug('total time used: %05.1fsec', end-start)
+            return(-1)
+
+        #wwns of all hostgroups, max. parallel requests at the same time
+        return_response_wwns_all = self._parallel_map(lambda hostGroup: self.wwns_get(portId_hostGroupId=hostGroup, timeout=timeout, typed=typed), return_response, parallel=parallel)
 
         #create dictionary out of the data
         wwns = {}
         i = 0
-        for port in return_response:               
+        for hostGroup, return_response_wwns in zip(return_response, return_response_wwns_all):
             #host group infos
-            logger.info(port)
-            return_response_wwns = self.wwns_one_port_get(portId=port, timeout=timeout)
-            logger.debug('Request response: ' + str(return_response_wwns))
-            if not return_response_wwns == None:
+            logger.info('%s', hostGroup)
+            logger.debug('Request response: %s', _LogPayload(return_response_wwns))
+            if isinstance(return_response_wwns, dict):
                 for wwn in return_response_wwns:
                     wwns[wwn] = return_response_wwns[wwn]
 
         end = time.time()
-        logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+        logger.debug('total time used: %05.1fsec', end-start)
         return(wwns)
 
+    #yield the changes of the ldevs, host groups, luns and wwns. the inventory is refreshed every interval seconds
+    def inventory_watch(self, interval:float=300, inventory:Inventory=None, initial:bool=False, page_size:int=1000, full_refresh_every:int=12, parallel:int=None, timeout:int=120):
+        '''Yield an Event(action, kind, key, old, new) for every ldev, hostgroup, lun and wwn that was added, removed or changed since the last refresh.
+        The events of the first refresh (everything is added) are only yielded if initial is True.
+        '''
+        #execute general procedures
+        self._general_execute()
+
+        if inventory == None:
+            inventory = Inventory(self, page_size=page_size, full_refresh_every=full_refresh_every, parallel=parallel, timeout=timeout)
+        first = inventory.refreshes == 0
+        while True:
+            next_refresh = time.monotonic() + interval
+            events = inventory.refresh()
+            logger.info('inventory refresh: %s changes', len(events))
+            if not first or initial == True:
+                for event in events:
+                    yield(event)
+            first = False
+            time.sleep(max(0, next_refresh - time.monotonic()))
+
+    #index of the paths between wwns, host groups, luns, ldevs and pools
+    def topology_get(self, parallel:int=None, page_size:int=None):
+        start = time.time()
+
+        #execute general procedures
+        self._general_execute()
+
+        ldevs = self.ldevs_get(page_size=page_size)
+        hostgroups = self.host_groups_all_ports_get(parallel=parallel)
+        luns = self.luns_all_ports_get(parallel=parallel)
+        wwns = self.wwns_all_ports_get(parallel=parallel)
+        topology = TopologyIndex(ldevs=ldevs, luns=luns, wwns=wwns, hostgroups=hostgroups)
+
+        end = time.time()
+        logger.debug('total time used: %05.1fsec', end-start)
+        return(topology)
+
     #get all replication configuration
     def replication_get(self, replicationType=None, timeout:int=1000):
         start = time.time()
@@ -1263,18 +1827,18 @@ class RestAPI:
         self._general_execute()
 
         if replicationType == None:
-            logger.debug('Request string: '+str(self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+self.__url_remotereplication))
+            logger.debug('Request string: %s', self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+self.__url_remotereplication)
             return_response = self._general_webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+self.__url_remotereplication, timeout=timeout)
-            logger.debug('Request response: ' + str(return_response))
+            logger.debug('Request response: %s', _LogPayload(return_response))
         else:
             if str(replicationType) in ['GAD', 'UR', 'TC']:
-                logger.debug('Request string: '+str(self.__url_base+self.__url_remotereplication+'?replicationType='+str(replicationType)))
+                logger.debug('Request string: %s', self.__url_base+self.__url_remotereplication+'?replicationType='+str(replicationType))
                 return_response = self._general_webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+self.__url_remotereplication+'?replicationType='+str(replicationType), timeout=timeout)
-                logger.debug('Request response: ' + str(return_response))
+                logger.debug('Request response: %s', _LogPayload(return_response))
             else:
-                logger.error('ERROR: the replicationType ('+str(replicationType)+') is not supported. Specify "GAD", "UR", "TC".')
+                logger.error('ERROR: the replicationType (%s) is not supported. Specify "GAD", "UR", "TC".', replicationType)
                 end = time.time()
-                logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+                logger.debug('total time used: %05.1fsec', end-start)
                 return(-1)
 
         #if it is not a list then make it to one with one element
@@ -1290,7 +1854,7 @@ class RestAPI:
             replications[replication[self.__json_remoteReplicationId]] = replication
         
         end = time.time()
-        logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+        logger.debug('total time used: %05.1fsec', end-start)
         return(replications)
         
     #get snapshotgroups or a specific snapshotgroup
@@ -1302,14 +1866,17 @@ class RestAPI:
         self._general_execute()
 
         if snapshotGroupName == None:
-            logger.debug('Request string: '+str(self.__url_base+self.__url_storages)+'/'+str(self._storage_device_id)+str(self.__url_snapshotgroups))
+            logger.debug('Request string: %s/%s%s', self.__url_base+self.__url_storages, self._storage_device_id, self.__url_snapshotgroups)
             return_response = self._general_webrequest(request_type=request_type, url_suffix=str(self.__url_base+self.__url_storages)+'/'+str(self._storage_device_id)+str(self.__url_snapshotgroups), timeout=timeout)
-            logger.debug('Request response: ' + str(return_response))
+            logger.debug('Request response: %s', _LogPayload(return_response))
         else:
-            logger.debug('Request string: '+str(self.__url_base+self.__url_storages)+'/'+str(self._storage_device_id)+self.__url_snapshotgroups+'/'+str(snapshotGroupName))
+            logger.debug('Request string: %s/%s%s/%s', self.__url_base+self.__url_storages, self._storage_device_id, self.__url_snapshotgroups, snapshotGroupName)
             return_response = self._general_webrequest(request_type=request_type, url_suffix=str(self.__url_base+self.__url_storages)+'/'+str(self._storage_device_id)+self.__url_snapshotgroups+'/'+str(snapshotGroupName), timeout=timeout)
-            logger.debug('Request response: ' + str(return_response))
+            logger.debug('Request response: %s', _LogPayload(return_response))
         
+        #no snapshot group
+        if return_response == None:
+            return_response = []
         #if it is not a list then make it to one with one element
         if not isinstance(return_response, (list,)):
             return_response = [return_response]
@@ -1323,7 +1890,7 @@ class RestAPI:
             snapshotgroups[snapshotgroup[self.__json_snapshotGroupName]] = snapshotgroup
         
         end = time.time()
-        logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+        logger.debug('total time used: %05.1fsec', end-start)
         return(snapshotgroups)
 
     #get all snapshots or the snapshots of a specific ldev
@@ -1335,18 +1902,18 @@ class RestAPI:
         self._general_execute()
 
         if ldevNumber == None:
-            logger.debug('Request string: '+str(self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+self.__url_snapshotsall))
+            logger.debug('Request string: %s', self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+self.__url_snapshotsall)
             return_response = self._general_webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+self.__url_snapshotsall, timeout=timeout)
-            logger.debug('Request response: ' + str(return_response))
+            logger.debug('Request response: %s', _LogPayload(return_response))
         else:
             if str(ldevNumber).isnumeric():
-                logger.debug('Request string: '+str(self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+'/snapshots?pvolLdevId='+str(ldevNumber)))
+                logger.debug('Request string: %s', self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+'/snapshots?pvolLdevId='+str(ldevNumber))
                 return_response = self._general_webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+'/snapshots?pvolLdevId='+str(ldevNumber), timeout=timeout)
-                logger.debug('Request response: ' + str(return_response))
+                logger.debug('Request response: %s', _LogPayload(return_response))
             else:
-                logger.error('ERROR: response: ldevNumber "'+str(ldevNumber)+'" is not a number.')
+                logger.error('ERROR: response: ldevNumber "%s" is not a number.', ldevNumber)
                 end = time.time()
-                logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+                logger.debug('total time used: %05.1fsec', end-start)
                 return(-1)
 
         #if it is not a list then make it to one with one element
@@ -1365,13 +1932,13 @@ class RestAPI:
                 snapshots[snapshot[self.__json_snapshotId]] = snapshot                
         
         end = time.time()
-        logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+        logger.debug('total time used: %05.1fsec', end-start)
         return(snapshots)
     
     #create snapshots
     #not done
     def snapshots_create(self, pvolLdevId=None, snapshotGroupName=None, snapshotPoolId=None, isClone=False, isConsistencyGroup=True,
-                        autoSplit=True):
+                        autoSplit=True, return_job:bool=False):
         
         start = time.time()
         request_type='POST'
@@ -1379,13 +1946,10 @@ class RestAPI:
         #execute general procedures
         self._general_execute()
 
-        #create session token
-        self._session_create()
-        
         if pvolLdevId == None:
             logger.error('ERROR: response: You must specify a pvolLdevId.')
             end = time.time()
-            logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+            logger.debug('total time used: %05.1fsec', end-start)
             return(-1)
         else:
             if str(pvolLdevId).isnumeric():
@@ -1394,141 +1958,304 @@ class RestAPI:
                     #snapshotgroup string can be at max 32 characters
                     #create uuid4.hex (RFC 4122) string -> 'aa77aba4d3484b358fd509a43b9b44ab' 32 chars
                     snapshotGroupName = str(uuid.uuid4().hex)
-                
-                body = '''
-                {
-                "snapshotGroupName": "snapshotGroup",
-                "snapshotPoolId": 5,
-                "pvolLdevId": 3555,
-                "isConsistencyGroup": true,
-                "autoSplit": true
-                }
-                '''
-
-                body = '''{"snapshotGroupName": str(snapshotGroupName),
-                   "snapshotPoolId": str(snapshotPoolId),
-                   "pvolLdevId": str(pvolLdevId),
-                   "isClone": isClone,
-                   "isConsistencyGroup": isConsistencyGroup,
-                   "autoSplit": autoSplit,
-                   "isDataReductionForceCopy": True
-                  }'''
-
-                logger.debug('Request string: '+str(self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+'/snapshots', body=body))
-                return_response=self._webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+'/snapshots', body=body)
-                logger.debug('Request response: ' + str(return_response))
+
+                if not str(snapshotPoolId).isnumeric():
+                    logger.error('ERROR: response: snapshotPoolId "%s" is not a valid number.', snapshotPoolId)
+                    end = time.time()
+                    logger.debug('total time used: %05.1fsec', end-start)
+                    return(-1)
+
+                return_response = self._snapshots_create_request(pvolLdevId=pvolLdevId, snapshotGroupName=snapshotGroupName, snapshotPoolId=snapshotPoolId, isClone=isClone, isConsistencyGroup=isConsistencyGroup, autoSplit=autoSplit)
             else:
-                logger.error('ERROR: response: pvolLdevId "'+str(pvolLdevId)+'" is not a valid number.')
+                logger.error('ERROR: response: pvolLdevId "%s" is not a valid number.', pvolLdevId)
                 end = time.time()
-                logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+                logger.debug('total time used: %05.1fsec', end-start)
                 return(-1)
             
         if len(return_response) == 3:
             if return_response[0] == 0:
                 #success
-                
-                #remove session token
-                self._session_delete()
-                
+                #handle of the job of the storage
+                if return_job == True:
+                    return_response[2] = Job(self, return_response[2])
+
                 end = time.time()
-                logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+                logger.debug('total time used: %05.1fsec', end-start)
                 return(return_response[2])
             else:
-                logger.warning('WARNING: response status:'+str(return_response[1])+', response reason:'+str(return_response[2]))
+                logger.warning('WARNING: response status:%s, response reason:%s', return_response[1], _LogPayload(return_response[2]))
                 end = time.time()
-                logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+                logger.debug('total time used: %05.1fsec', end-start)
                 return(None)
         else:
-            logger.error('ERROR: response:'+str(return_response))
+            logger.error('ERROR: response:%s', _LogPayload(return_response))
             end = time.time()
-            logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+            logger.debug('total time used: %05.1fsec', end-start)
             return(-1)
     
+    #create the snapshots of many pvols
+    def snapshots_create_batch(self, pvols:list, snapshotGroupName=None, snapshotPoolId=None, isClone=False, isConsistencyGroup=True,
+                               autoSplit=True, parallel:int=None, wait:bool=True, timeout:float=600):
+        '''Create a snapshot of every pvol. pvols is a list of pvolLdevIds or of (pvolLdevId, snapshotPoolId, snapshotGroupName) tuples,
+        missing values are taken from the arguments (without snapshotGroupName all snapshots are created in one new group).
+        The first snapshot of every group is created first (that creates the group), then the others in parallel.
+        With wait=True the function waits until all jobs are completed (max. timeout seconds).
+        Return one dictionary per pvol (in the order of pvols):
+        {'pvolLdevId', 'snapshotPoolId', 'snapshotGroupName', 'result': 'succeeded'|'failed'|'submitted'|'timeout'|'not_submitted',
+         'status', 'error', 'job', 'submit_time', 'time'}
+        'not_submitted': the first snapshot of the group failed or timed out, the error is the one of the first snapshot.
+        '''
+        start = time.time()
+
+        #execute general procedures
+        self._general_execute()
+
+        if snapshotGroupName == None:
+            snapshotGroupName = str(uuid.uuid4().hex)
+
+        items = []
+        for pvol in pvols:
+            if not isinstance(pvol, (list, tuple)):
+                pvol = (pvol,)
+            pvol = tuple(pvol) + (None,) * (3 - len(pvol))
+            items.append({'pvolLdevId': pvol[0],
+                          'snapshotPoolId': snapshotPoolId if pvol[1] == None else pvol[1],
+                          'snapshotGroupName': snapshotGroupName if pvol[2] == None else pvol[2],
+                          'result': None, 'status': None, 'error': None, 'job': None, 'submit_time': None, 'time': None})
+
+        for item in items:
+            if not str(item['pvolLdevId']).isnumeric() or not str(item['snapshotPoolId']).isnumeric():
+                item['result'] = 'failed'
+                item['error'] = 'pvolLdevId and snapshotPoolId must be numbers'
+        items_valid = [item for item in items if item['result'] == None]
+
+        def request(item):
+            return(self._snapshots_create_request(pvolLdevId=item['pvolLdevId'], snapshotGroupName=item['snapshotGroupName'], snapshotPoolId=item['snapshotPoolId'],
+                                                  isClone=isClone, isConsistencyGroup=isConsistencyGroup, autoSplit=autoSplit))
+
+        #the first snapshot creates the group, then the others are added
+        first = {}
+        for item in items_valid:
+            first.setdefault(item['snapshotGroupName'], item)
+        items_first = list(first.values())
+        items_others = [item for item in items_valid if not first[item['snapshotGroupName']] is item]
+        self._items_submit(items_first, request, parallel=parallel)
+        #the groups must exist before the next snapshots are added
+        self._items_jobs_wait(items_first, wait=(wait == True or len(items_others) > 0), timeout=max(0, timeout - (time.time() - start)))
+        #the others of a group that was not created are not submitted, they get the error of the first snapshot of the group
+        for item in items_others:
+            item_first = first[item['snapshotGroupName']]
+            if not item_first['result'] == 'succeeded':
+                item['result'] = 'not_submitted'
+                item['status'] = item_first['status']
+                item['error'] = item_first['error'] if not item_first['error'] == None else 'snapshot group '+str(item['snapshotGroupName'])+' was not created: '+str(item_first['result'])
+        items_others = [item for item in items_others if item['result'] == None]
+        self._items_submit(items_others, request, parallel=parallel)
+        self._items_jobs_wait(items_others, wait=wait, timeout=max(0, timeout - (time.time() - start)))
+
+        succeeded = len([item for item in items if item['result'] == 'succeeded'])
+        end = time.time()
+        logger.info('snapshots created: %s of %s in %05.1fsec.', succeeded, len(items), end-start)
+        logger.debug('total time used: %05.1fsec', end-start)
+        return(items)
+
+    #send the request of every item in parallel and keep the job the storage started
+    def _items_submit(self, items:list, request, parallel:int=None):
+        def submit(item):
+            submit_start = time.time()
+            return_response = request(item)
+            item['submit_time'] = time.time() - submit_start
+            item['status'] = return_response[1]
+            if return_response[0] == 0:
+                item['job'] = Job(self, return_response[2])
+                item['result'] = 'submitted'
+            else:
+                logger.warning('WARNING: request failed. response status:%s, response reason:%s', return_response[1], _LogPayload(return_response[2]))
+                item['result'] = 'failed'
+                item['error'] = return_response[2]
+            return(item)
+        self._parallel_map(submit, items, parallel=parallel)
+        return(items)
+
+    #wait for the jobs of the items and set their result ('succeeded', 'failed', 'timeout' or 'submitted' if not waited for)
+    def _items_jobs_wait(self, items:list, wait:bool=True, timeout:float=600):
+        jobs = [item['job'] for item in items if item['result'] == 'submitted']
+        if wait == True and len(jobs) > 0:
+            self.jobs_wait(jobs, timeout=timeout)
+        for item in items:
+            if item['job'] is None:
+                continue
+            if item['job'].done():
+                item['result'] = 'succeeded' if item['job'].succeeded() else 'failed'
+                if item['result'] == 'failed':
+                    item['error'] = item['job'].error
+            elif wait == True:
+                item['result'] = 'timeout'
+            item['time'] = item['job'].duration
+        return(items)
+
+    #run the request of every snapshot group with max. parallel requests at the same time and wait for the jobs
+    def _snapshotgroups_bulk(self, action:str, request, snapshotGroupNames:list=None, predicate=None, parallel:int=None, wait:bool=True, timeout:float=600):
+        start = time.time()
+
+        #execute general procedures
+        self._general_execute()
+
+        if snapshotGroupNames == None:
+            snapshotGroupNames = list(self.snapshotgroups_get())
+        if not predicate == None:
+            snapshotGroupNames = [snapshotGroupName for snapshotGroupName in snapshotGroupNames if predicate(snapshotGroupName)]
+
+        items = [{'snapshotGroupName': snapshotGroupName, 'result': None, 'status': None, 'error': None, 'job': None, 'submit_time': None, 'time': None}
+                 for snapshotGroupName in snapshotGroupNames]
+        self._items_submit(items, lambda item: request(item['snapshotGroupName']), parallel=parallel)
+        self._items_jobs_wait(items, wait=wait, timeout=max(0, timeout - (time.time() - start)))
+
+        end = time.time()
+        succeeded = len([item for item in items if item['result'] == 'succeeded'])
+        failed = [item['snapshotGroupName'] for item in items if item['result'] in ('failed', 'timeout')]
+        return_value = {'groups': {item['snapshotGroupName']: item for item in items},
+                        'succeeded': succeeded,
+                        'failed': failed,
+                        'time': end-start,
+                        'groups_per_second': len(items)/(end-start) if end > start else 0}
+        logger.info('snapshot groups %s: %s of %s succeeded in %05.1fsec.', action, succeeded, len(items), end-start)
+        if len(failed) > 0:
+            logger.warning('WARNING: snapshot groups %s failed: %s', action, failed)
+        logger.debug('total time used: %05.1fsec', end-start)
+        return(return_value)
+
+    #resync many snapshot groups
+    def snapshots_resync_bulk(self, snapshotGroupNames:list=None, predicate=None, autoSplit=True, parallel:int=None, wait:bool=True, timeout:float=600):
+        '''Resync the snapshot groups (all of snapshotgroups_get if snapshotGroupNames is None) for which predicate(snapshotGroupName) is True.
+        Return {'groups': {snapshotGroupName: result}, 'succeeded': number, 'failed': [snapshotGroupName], 'time': seconds, 'groups_per_second': number}
+        '''
+        return(self._snapshotgroups_bulk('resync', lambda snapshotGroupName: self._snapshots_resync_request(snapshotGroupName, autoSplit=autoSplit),
+                                         snapshotGroupNames=snapshotGroupNames, predicate=predicate, parallel=parallel, wait=wait, timeout=timeout))
+
+    #delete many snapshot groups
+    def snapshots_delete_bulk(self, snapshotGroupNames:list=None, predicate=None, parallel:int=None, wait:bool=True, timeout:float=600):
+        '''Delete the snapshot groups (all of snapshotgroups_get if snapshotGroupNames is None) for which predicate(snapshotGroupName) is True.
+        Return {'groups': {snapshotGroupName: result}, 'succeeded': number, 'failed': [snapshotGroupName], 'time': seconds, 'groups_per_second': number}
+        '''
+        return(self._snapshotgroups_bulk('delete', self._snapshots_delete_request,
+                                         snapshotGroupNames=snapshotGroupNames, predicate=predicate, parallel=parallel, wait=wait, timeout=timeout))
+
+    #send the request to create a snapshot of one pvol
+    def _snapshots_create_request(self, pvolLdevId, snapshotGroupName, snapshotPoolId, isClone=False, isConsistencyGroup=True, autoSplit=True, timeout:int=60):
+        '''
+        {
+        "snapshotGroupName": "snapshotGroup",
+        "snapshotPoolId": 5,
+        "pvolLdevId": 3555,
+        "isConsistencyGroup": true,
+        "autoSplit": true
+        }
+        '''
+        request_type='POST'
+        body = {"snapshotGroupName": str(snapshotGroupName),
+                "snapshotPoolId": int(snapshotPoolId),
+                "pvolLdevId": int(pvolLdevId),
+                "isClone": isClone,
+                "isConsistencyGroup": isConsistencyGroup,
+                "autoSplit": autoSplit,
+                "isDataReductionForceCopy": True
+               }
+
+        logger.debug('Request string: %s body: %s', self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+'/snapshots', _LogPayload(body))
+        return_response=self._session_webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+str(self._storage_device_id)+'/snapshots', body=body, timeout=timeout)
+        logger.debug('Request response: %s', _LogPayload(return_response))
+        return(return_response)
+
+    #send the request to resync a snapshot group
+    def _snapshots_resync_request(self, snapshotGroupName, autoSplit=True, timeout:int=60):
+        request_type='PUT'
+        body = {"parameters": {"autoSplit": autoSplit}}
+        logger.debug('Request string: %s body: %s', self.__url_base+self.__url_storages+'/'+self._storage_device_id+self.__url_snapshotgroups+'/'+str(snapshotGroupName)+'/actions/resync/invoke', _LogPayload(body))
+        return_response=self._session_webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+self._storage_device_id+self.__url_snapshotgroups+'/'+str(snapshotGroupName)+'/actions/resync/invoke', body=body, timeout=timeout)
+        logger.debug('Request response: %s', _LogPayload(return_response))
+        return(return_response)
+
+    #send the request to delete a snapshot group
+    def _snapshots_delete_request(self, snapshotGroupName, timeout:int=60):
+        request_type='DELETE'
+        logger.debug('Request string: %s', self.__url_base+self.__url_storages+'/'+self._storage_device_id+self.__url_snapshotgroups+'/'+str(snapshotGroupName))
+        return_response = self._session_webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+self._storage_device_id+self.__url_snapshotgroups+'/'+str(snapshotGroupName), timeout=timeout)
+        logger.debug('Request response: %s', _LogPayload(return_response))
+        return(return_response)
+
     #resync snapshots
     #not done
-    def snapshots_resync(self, snapshotGroupName=None, autoSplit=True):
+    def snapshots_resync(self, snapshotGroupName=None, autoSplit=True, return_job:bool=False):
         start = time.time()
         request_type='PUT'
 
         #execute general procedures
         self._general_execute()
 
-        #create session token
-        self._session_create()
-        
-        
-        body = json.dumps({"parameters": {"autoSplit": autoSplit}})
-        logger.debug('body: ' + str(body))
         
         if snapshotGroupName == None:
             logger.error('ERROR: response: You must specify a snapshotGroupName.')
             end = time.time()
-            logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+            logger.debug('total time used: %05.1fsec', end-start)
             return(-1)
         else:
-            logger.debug('Request string: '+str(self.__url_base+self.__url_storages+'/'+self._storage_device_id+self.__url_snapshotgroups+'/'+str(snapshotGroupName)+'/actions/resync/invoke', body=body))
-            return_response=self._webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+self._storage_device_id+self.__url_snapshotgroups+'/'+str(snapshotGroupName)+'/actions/resync/invoke', body=body)
-            logger.debug('Request response: ' + str(return_response))
+            return_response = self._snapshots_resync_request(snapshotGroupName, autoSplit=autoSplit)
             
         if len(return_response) == 3:
             if return_response[0] == 0:
                 #success
-                
-                #remove session token
-                self._session_delete()
-                
+                #handle of the job of the storage
+                if return_job == True:
+                    return_response[2] = Job(self, return_response[2])
+
                 end = time.time()
-                logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+                logger.debug('total time used: %05.1fsec', end-start)
                 return(return_response[2])
             else:
-                logger.warning('WARNING: response status:'+str(return_response[1])+', response reason:'+str(return_response[2]))
+                logger.warning('WARNING: response status:%s, response reason:%s', return_response[1], _LogPayload(return_response[2]))
                 end = time.time()
-                logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+                logger.debug('total time used: %05.1fsec', end-start)
                 return(None)
         else:
-            logger.error('ERROR: response:'+str(return_response))
+            logger.error('ERROR: response:%s', _LogPayload(return_response))
             end = time.time()
-            logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+            logger.debug('total time used: %05.1fsec', end-start)
             return(-1)
 
     #delete snapshots
     #not done
-    def snapshots_delete(self, snapshotGroupName=None):
+    def snapshots_delete(self, snapshotGroupName=None, return_job:bool=False):
         start = time.time()
         request_type='DELETE'
         
         #execute general procedures
         self._general_execute()
 
-        #create session token
-        self._session_create()
-        
         request_type='DELETE'
         if snapshotGroupName == None:
             logger.error('ERROR: response: You must specify a snapshotGroupName.')
             end = time.time()
-            logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+            logger.debug('total time used: %05.1fsec', end-start)
             return(-1)
         else:
-            logger.debug('Request string: '+str(self.__url_base+self.__url_storages+'/'+self._storage_device_id+self.__url_snapshotgroups+'/'+str(snapshotGroupName)))
-            return_response = self._webrequest(request_type=request_type, url_suffix=self.__url_base+self.__url_storages+'/'+self._storage_device_id+self.__url_snapshotgroups+'/'+str(snapshotGroupName))
-            logger.debug('Request response: ' + str(return_response))
+            return_response = self._snapshots_delete_request(snapshotGroupName)
 
         if len(return_response) == 3:
             if return_response[0] == 0:
                 #success
-                
-                #remove session token
-                self._session_delete()
-                
+                #handle of the job of the storage
+                if return_job == True:
+                    return_response[2] = Job(self, return_response[2])
+
                 return(return_response[2])
             else:
-                logger.warning('WARNING: response status:'+str(return_response[1])+', response reason:'+str(return_response[2]))
+                logger.warning('WARNING: response status:%s, response reason:%s', return_response[1], _LogPayload(return_response[2]))
                 end = time.time()
-                logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+                logger.debug('total time used: %05.1fsec', end-start)
                 return(None)
         else:
-            logger.error('ERROR: response:'+str(return_response))
+            logger.error('ERROR: response:%s', _LogPayload(return_response))
             end = time.time()
-            logger.debug('total time used: ' + str("{0:05.1f}".format(end-start)) + "sec")
+            logger.debug('total time used: %05.1fsec', end-start)
             return(-1)
\ No newline at end of file
@@ -1,2 +1,12 @@
+import logging
+
 from .Hitachi import RestAPI
 from .Hitachi import logger
+from .Hitachi import PageError
+from .asyncapi import AsyncRestAPI
+from .inventory import Inventory
+from .topology import TopologyIndex
+from .fleet import Fleet
+
+#nothing is logged unless the application configures logging (e.g. logging.basicConfig)
+logging.getLogger(__name__).addHandler(logging.NullHandler())
@@ -0,0 +1,532 @@
+"""
+asyncio version of the RestAPI class. One event loop can query many storage arrays at the same time.
+"""
+
+import asyncio
+import collections
+import json
+import time
+import uuid
+from base64 import b64encode
+
+from .Hitachi import logger
+from .Hitachi import _check_response
+from .Hitachi import _response_decode
+from .Hitachi import _LogPayload
+from .transport import TLSContext
+from .transport import IDEMPOTENT_METHODS
+
+URL_BASE = '/ConfigurationManager/v1/objects'
+URL_STORAGES = '/storages'
+URL_SESSIONS = '/sessions'
+URL_PORTS = '/ports'
+URL_REMOTEREPLICATION = '/remote-replications'
+URL_SNAPSHOTGROUPS = '/snapshot-groups'
+URL_SNAPSHOTSALL = '/snapshot-replications'
+
+
+class AsyncConnectionPool:
+    '''Bounded pool of keep-alive https connections (asyncio streams) to one host:port.
+
+    Implements the part of HTTP/1.1 the REST API needs (Content-Length and
+    chunked responses). A reused connection that turns out to be closed is
+    replaced by a new one and the request is sent again.
+    '''
+
+    def __init__(self, host:str, port:int, maxsize:int=8, idle_timeout:float=30, tls:TLSContext=None):
+        self.host = host
+        self.port = int(port)
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self._tls = tls if tls is not None else TLSContext()
+        self._idle = collections.deque()
+        #the semaphore is created in the event loop that uses the pool
+        self._slots = None
+        #statistics
+        self.connections_created = 0
+        self.connections_reused = 0
+
+    async def _connection_new(self):
+        self.connections_created += 1
+        reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self._tls.context, server_hostname=self.host)
+        try:
+            self._tls.pin_verify(writer.get_extra_info('ssl_object'), self.host, self.port)
+        except Exception:
+            writer.close()
+            raise
+        return(reader, writer)
+
+    def _connection_get(self):
+        now = time.monotonic()
+        while self._idle:
+            reader, writer, last_used = self._idle.pop()
+            if now - last_used > self.idle_timeout or reader.at_eof() or writer.is_closing():
+                writer.close()
+                continue
+            self.connections_reused += 1
+            return(reader, writer)
+        return(None)
+
+    async def _send(self, reader, writer, method:str, url:str, headers:dict, body):
+        data = b'' if body is None else (body.encode('utf-8') if isinstance(body, str) else body)
+        lines = [method+' '+url+' HTTP/1.1', 'Host: '+self.host+':'+str(self.port)]
+        for name, value in headers.items():
+            lines.append(str(name)+': '+str(value))
+        lines.append('Content-Length: '+str(len(data)))
+        writer.write(('\r\n'.join(lines)+'\r\n\r\n').encode('latin-1')+data)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError('connection closed by '+self.host+':'+str(self.port))
+        status_line = status_line.decode('latin-1').rstrip('\r\n').split(' ', 2)
+        version, status = status_line[0], int(status_line[1])
+        reason = status_line[2] if len(status_line) == 3 else ''
+        response_headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        connection_header = response_headers.get('connection', '').lower()
+        will_close = connection_header == 'close' or (version == 'HTTP/1.0' and not connection_header == 'keep-alive')
+        if response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0].strip(), 16)
+                if size == 0:
+                    #skip the trailer
+                    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            data = b''.join(chunks)
+        elif 'content-length' in response_headers:
+            data = await reader.readexactly(int(response_headers['content-length']))
+        elif status in (204, 304) or method == 'HEAD':
+            data = b''
+        else:
+            data = await reader.read()
+            will_close = True
+        return(status, reason, data, will_close)
+
+    async def request(self, method:str, url:str, headers:dict, body=None):
+        '''Send the request and return (status, reason, data) with data as bytes'''
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.maxsize)
+        async with self._slots:
+            connection = self._connection_get()
+            reused = connection is not None
+            if not reused:
+                connection = await self._connection_new()
+            reader, writer = connection
+            try:
+                try:
+                    status, reason, data, will_close = await self._send(reader, writer, method, url, headers, body)
+                except (asyncio.IncompleteReadError, ConnectionError) as e:
+                    writer.close()
+                    #the storage may have done a POST, PUT or DELETE already
+                    if not reused or method.upper() not in IDEMPOTENT_METHODS:
+                        raise
+                    logger.debug('kept alive connection to %s:%s was closed (%r). reconnect.', self.host, self.port, e)
+                    reader, writer = await self._connection_new()
+                    status, reason, data, will_close = await self._send(reader, writer, method, url, headers, body)
+            except BaseException:
+                #also if the request is cancelled (timeout), the response would be out of sync
+                writer.close()
+                raise
+            if will_close:
+                writer.close()
+            else:
+                self._idle.append((reader, writer, time.monotonic()))
+            return(status, reason, data)
+
+    def close(self):
+        '''Close all idle connections'''
+        while self._idle:
+            self._idle.pop()[1].close()
+
+
+class AsyncRestAPI:
+    '''asyncio version of the RestAPI class.
+
+    All functions are coroutines and return the same data as the ones of RestAPI.
+    One session per storage is used for all requests and the https connections
+    are kept alive in a pool.
+    '''
+
+    def __init__(self, protocol:str='https://', fqdn_ip:str='127.0.0.1', port:int=443, username:str='maintenance', password:str='raid-maintenance',
+                 max_connections:int=8, connection_idle_timeout:float=30, ca_bundle:str=None, pinned_certificate:str=None, check_hostname:bool=True,
+                 session_alive_time:int=300, session_renew_margin:float=30):
+        self._ip_fqdn = fqdn_ip
+        self._port = str(port)
+        self._username = username
+        self.__userAndPass = b64encode((username+':'+password).encode('utf-8')).decode("ascii")
+        self._protocol = protocol
+        self._storage_device_id = None
+        self._token = None
+        self._session_id = None
+        self.__session_alive_time = session_alive_time
+        self.__session_renew_margin = session_renew_margin
+        self.__session_last_used = None
+        #created in the event loop
+        self.__session_lock = None
+        self.__device_id_lock = None
+        self.__pool = AsyncConnectionPool(host=fqdn_ip, port=port, maxsize=max_connections, idle_timeout=connection_idle_timeout,
+                                          tls=TLSContext(ca_bundle=ca_bundle, pinned_certificate=pinned_certificate, check_hostname=check_hostname))
+
+    async def __aenter__(self):
+        return(self)
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    #delete the session and close all kept alive connections
+    async def close(self):
+        await self._session_delete()
+        self.__pool.close()
+        return(None)
+
+    #url of the storage that is used
+    def _url_storage(self):
+        return(URL_BASE+URL_STORAGES+'/'+str(self._storage_device_id))
+
+    #extecutes the web request
+    async def _webrequest(self, request_type:str='GET', url_suffix:str=None, body:str=None, timeout:int=60, token:str=None):
+        '''Return [0, status, json response (dict/list), '' or text] or [-1, status or error, response or exception]'''
+        start = time.time()
+
+        if url_suffix == None:
+            url_suffix = URL_BASE+URL_STORAGES
+
+        if token is None:
+            headers = {'Accept':'application/json', 'Content-Type':'application/json', 'Authorization' : 'Basic %s' % self.__userAndPass}
+        else:
+            headers = {'Accept':'application/json', 'Content-Type':'application/json', 'Authorization' : 'Session '+str(token)}
+
+        logger.debug('request type: %s URL: %s', request_type, url_suffix)
+        try:
+            response_status, response_reason, response_data = await asyncio.wait_for(self.__pool.request(method=request_type, url=url_suffix, headers=headers, body=body), timeout=timeout)
+        except asyncio.TimeoutError as st:
+            logger.error('ERROR: http(s) timeout received after %ssec.', timeout)
+            return([-1, 'ERROR: http(s) timeout received after '+str(timeout)+'sec.', st])
+        except (OSError, EOFError, ValueError) as e:
+            logger.error('ERROR: HTTPException: %s', e)
+            return([-1, 'ERROR: HTTPException', e])
+
+        logger.debug('request response status: %s', response_status)
+        response_decoded = _response_decode(response_data)
+        if response_status == 200 or response_status == 202:
+            return_response = [0, response_status, response_decoded]
+        else:
+            logger.error('Got error back. status: %s - reason: %s', response_status, response_reason)
+            return_response = [-1, response_status, response_decoded]
+
+        end = time.time()
+        logger.debug('total time used: %05.1fsec', end-start)
+        return(return_response)
+
+    #create session
+    async def _session_create(self):
+        body = json.dumps({'aliveTime': self.__session_alive_time})
+        return_response = await self._webrequest(request_type='POST', url_suffix=self._url_storage()+URL_SESSIONS, body=body)
+        return_response = _check_response(return_response=return_response, key='all')
+        if type(return_response) == dict:
+            self._token = return_response['token']
+            self._session_id = return_response['sessionId']
+            self.__session_last_used = time.monotonic()
+            return(None)
+        else:
+            logger.error('the response was not in dictionary or json format.')
+            return(-1)
+
+    #delete session
+    async def _session_delete(self):
+        if self._session_id == None:
+            return('WARNING: nothing done as no session was created')
+        token, session_id = self._token, self._session_id
+        self._token = None
+        self._session_id = None
+        return_response = await self._webrequest(request_type='DELETE', url_suffix=self._url_storage()+URL_SESSIONS+'/'+str(session_id), token=token)
+        _check_response(return_response=return_response, key='all')
+        return(None)
+
+    #get the token of the session, (re)create the session if needed
+    async def _session_token_get(self):
+        if self.__session_lock is None:
+            self.__session_lock = asyncio.Lock()
+        async with self.__session_lock:
+            if self._token is not None:
+                if time.monotonic() - self.__session_last_used < self.__session_alive_time - self.__session_renew_margin:
+                    return(self._token)
+                await self._session_delete()
+            await self._session_create()
+            return(self._token)
+
+    #webrequest that uses the session token of the storage
+    async def _session_webrequest(self, request_type:str='GET', url_suffix:str=None, body:str=None, timeout:int=60):
+        token = await self._session_token_get()
+        return_response = await self._webrequest(request_type=request_type, url_suffix=url_suffix, body=body, timeout=timeout, token=token)
+        if token is not None:
+            if return_response[0] == -1 and return_response[1] == 401:
+                logger.warning('WARNING: session token not accepted anymore. create a new session and retry.')
+                if self._token == token:
+                    self._token = None
+                    self._session_id = None
+                token = await self._session_token_get()
+                return_response = await self._webrequest(request_type=request_type, url_suffix=url_suffix, body=body, timeout=timeout, token=token)
+            self.__session_last_used = time.monotonic()
+        return(return_response)
+
+    #general webrequest that uses the session of the storage
+    async def _general_webrequest(self, request_type:str='GET', url_suffix:str=None, body:str=None, timeout:int=60, key:str='data'):
+        return_response = await self._session_webrequest(request_type=request_type, url_suffix=url_suffix, body=body, timeout=timeout)
+        return(_check_response(return_response=return_response, key=key))
+
+    #general webrequest that returns -1 if the request failed (_check_response returns None for it like for an empty response)
+    async def _checked_webrequest(self, request_type:str='GET', url_suffix:str=None, body:str=None, timeout:int=60, key:str='data'):
+        return_response = await self._session_webrequest(request_type=request_type, url_suffix=url_suffix, body=body, timeout=timeout)
+        if not return_response[0] == 0:
+            logger.error('ERROR: request %s failed. response status:%s, response reason:%s', url_suffix, return_response[1], _LogPayload(return_response[2]))
+            return(-1)
+        return(_check_response(return_response=return_response, key=key))
+
+    #execute in all functions
+    async def _general_execute(self):
+        if self.__device_id_lock is None:
+            self.__device_id_lock = asyncio.Lock()
+        #only the first of many parallel requests looks up the storage device id
+        async with self.__device_id_lock:
+            if self._storage_device_id == None:
+                await self.storage_device_id_set()
+        return(None)
+
+    #gets the storge elements
+    async def storage_systems_get(self):
+        return_response = await self._webrequest(request_type='GET', url_suffix=URL_BASE+URL_STORAGES)
+        return_response = _check_response(return_response=return_response)
+        if not isinstance(return_response, list):
+            logger.error('Response is not a list. output: %s', _LogPayload(return_response))
+            return(-1)
+        #create a dictionary out of the list
+        storages = {}
+        for storage in return_response:
+            storages[storage['serialNumber']] = storage
+        return(storages)
+
+    #get storage device id
+    async def storage_device_id_get(self, serial_number:str=None):
+        if not self._storage_device_id == None:
+            return(self._storage_device_id)
+        return_response = await self.storage_systems_get()
+        if not type(return_response) == dict:
+            return(-1)
+        if len(return_response) == 1:
+            return(list(return_response.values())[0]['storageDeviceId'])
+        if serial_number == None:
+            logger.error('The parameter "serial_number" is not specified but more than 1 storage system is returned. Specify what storge system you want to use.')
+            return(-1)
+        for key, value in return_response.items():
+            if str(key) == str(serial_number):
+                return(value['storageDeviceId'])
+        logger.error('The parameter "serial_number" is not found in the storage systems that are returned. Specify a serial number that exists.')
+        return(-1)
+
+    #set storage device id
+    async def storage_device_id_set(self, serial_number:str=None):
+        #the session belongs to the storage that was set until now
+        await self._session_delete()
+        self._storage_device_id = None
+        return_response = await self.storage_device_id_get(serial_number=serial_number)
+        if not return_response == -1:
+            self._storage_device_id = return_response
+        return(return_response)
+
+    #gets the storge details ucode, ip
+    async def storage_details_get(self):
+        await self._general_execute()
+        return_response = await self._webrequest(request_type='GET', url_suffix=self._url_storage())
+        return(_check_response(return_response=return_response, key='all'))
+
+    #get ports
+    async def ports_get(self, portId=None, logins:bool=True, timeout:int=180):
+        await self._general_execute()
+        if portId == None:
+            url_suffix = self._url_storage()+URL_PORTS
+            if logins == True:
+                url_suffix += '?detailInfoType=logins'
+            return_response = await self._general_webrequest(url_suffix=url_suffix, timeout=timeout)
+            if not isinstance(return_response, list):
+                logger.error('Response is not a list. output: %s', _LogPayload(return_response))
+                return(-1)
+        else:
+            return_response = await self._general_webrequest(url_suffix=self._url_storage()+URL_PORTS+'/'+str(portId)+'?detailInfoType=class', timeout=timeout, key='all')
+            return_response = [return_response]
+        ports = {}
+        for port in return_response:
+            ports[str(port['portId'])] = port
+        return(ports)
+
+    #get all ldevs or a specifig ldev
+    async def ldevs_get(self, ldevNumber=None, count=16384, timeout:int=1000):
+        await self._general_execute()
+        if ldevNumber == None:
+            return_response = await self._checked_webrequest(url_suffix=self._url_storage()+'/ldevs?count='+str(count), timeout=timeout)
+            #no ldevs
+            if return_response == None:
+                return_response = []
+        else:
+            if not str(ldevNumber).isnumeric():
+                logger.error('ERROR: response: ldevNumber[dec] "%s" is not a decimal ldev number', ldevNumber)
+                return(-1)
+            return_response = await self._checked_webrequest(url_suffix=self._url_storage()+'/ldevs/'+str(ldevNumber), timeout=timeout, key='all')
+        if return_response == -1 or return_response == None:
+            logger.error('ERROR: ldevs could not be read. output: %s', _LogPayload(return_response))
+            return(-1)
+        if not isinstance(return_response, list):
+            return_response = [return_response]
+        ldevs = {}
+        for ldev in return_response:
+            ldevs[ldev['ldevId']] = ldev
+        return(ldevs)
+
+    #get hostgroups of one port
+    async def host_groups_one_port_get(self, portId, timeout:int=600):
+        await self._general_execute()
+        return_response = await self._checked_webrequest(url_suffix=self._url_storage()+'/host-groups?portId='+str(portId)+'&isUndefined=false&detailInfoType=resourceGroup', timeout=timeout)
+        if return_response == -1:
+            logger.error('ERROR: host groups of port %s could not be read.', portId)
+            return(-1)
+        #no host groups on this port
+        if return_response == None:
+            return_response = []
+        hostGroups = {}
+        for hostGroup in return_response:
+            hostGroups[str(hostGroup['hostGroupId'])] = hostGroup
+        return(hostGroups)
+
+    #get luns of one hostgroup
+    async def luns_get(self, portId_hostGroupId, timeout:int=30):
+        await self._general_execute()
+        #'CL3-B,5' -> 'CL3-B' and '5'
+        port, hostgroup = portId_hostGroupId.split(',')
+        return_response = await self._checked_webrequest(url_suffix=self._url_storage()+'/luns?portId='+str(port)+'&hostGroupNumber='+str(hostgroup)+'&isBasicLunInformation=false&lunOption=ALUA', timeout=timeout)
+        if return_response == -1:
+            logger.error('ERROR: luns of host group %s could not be read.', portId_hostGroupId)
+            return(-1)
+        if not isinstance(return_response, list):
+            logger.warning('No LUN(s) found in Hostgroup: %s', portId_hostGroupId)
+            return(None)
+        luns = {}
+        for lun in return_response:
+            luns[str(lun['lunId'])] = lun
+        return(luns)
+
+    #get the wwns of one hostgroup
+    async def wwns_get(self, portId_hostGroupId, timeout:int=30):
+        await self._general_execute()
+        #'CL3-B,5' -> 'CL3-B' and '5'
+        port, hostgroup = portId_hostGroupId.split(',')
+        return_response = await self._checked_webrequest(url_suffix=self._url_storage()+'/host-wwns?portId='+str(port)+'&hostGroupNumber='+str(hostgroup), timeout=timeout)
+        if return_response == -1:
+            logger.error('ERROR: wwns of host group %s could not be read.', portId_hostGroupId)
+            return(-1)
+        if not isinstance(return_response, list):
+            logger.warning('Warning: No WWN found in Hostgroup %s', portId_hostGroupId)
+            return(None)
+        wwns = {}
+        for wwn in return_response:
+            wwns[wwn['hostWwnId']] = wwn
+        return(wwns)
+
+    #get all replication configuration
+    async def replication_get(self, replicationType=None, timeout:int=1000):
+        await self._general_execute()
+        url_suffix = self._url_storage()+URL_REMOTEREPLICATION
+        if not replicationType == None:
+            if not str(replicationType) in ['GAD', 'UR', 'TC']:
+                logger.error('ERROR: the replicationType (%s) is not supported. Specify "GAD", "UR", "TC".', replicationType)
+                return(-1)
+            url_suffix += '?replicationType='+str(replicationType)
+        return_response = await self._general_webrequest(url_suffix=url_suffix, timeout=timeout)
+        if not isinstance(return_response, list):
+            return_response = [return_response]
+        replications = {}
+        for replication in return_response:
+            replications[replication['remoteReplicationId']] = replication
+        return(replications)
+
+    #get all snapshots or the snapshots of a specific ldev
+    async def snapshots_get(self, ldevNumber=None, timeout:int=360):
+        await self._general_execute()
+        if ldevNumber == None:
+            url_suffix = self._url_storage()+URL_SNAPSHOTSALL
+        else:
+            if not str(ldevNumber).isnumeric():
+                logger.error('ERROR: response: ldevNumber "%s" is not a number.', ldevNumber)
+                return(-1)
+            url_suffix = self._url_storage()+'/snapshots?pvolLdevId='+str(ldevNumber)
+        return_response = await self._general_webrequest(url_suffix=url_suffix, timeout=timeout)
+        if not isinstance(return_response, list):
+            return_response = [return_response]
+        snapshots = {}
+        for snapshot in return_response:
+            if 'snapshotReplicationId' in snapshot:
+                snapshots[snapshot['snapshotReplicationId']] = snapshot
+            else:
+                snapshots[snapshot['snapshotId']] = snapshot
+        return(snapshots)
+
+    #response of a snapshot action: job on success, None if the storage refused it, -1 on errors
+    def _snapshots_response(self, return_response:list):
+        if len(return_response) == 3 and return_response[0] == 0:
+            return(_check_response(return_response=return_response, key='all'))
+        if len(return_response) == 3 and isinstance(return_response[1], int):
+            logger.warning('WARNING: response status:%s, response reason:%s', return_response[1], _LogPayload(return_response[2]))
+            return(None)
+        logger.error('ERROR: response:%s', _LogPayload(return_response))
+        return(-1)
+
+    #create snapshots
+    async def snapshots_create(self, pvolLdevId=None, snapshotGroupName=None, snapshotPoolId=None, isClone=False, isConsistencyGroup=True, autoSplit=True):
+        await self._general_execute()
+        if pvolLdevId == None or not str(pvolLdevId).isnumeric():
+            logger.error('ERROR: response: pvolLdevId "%s" is not a valid number.', pvolLdevId)
+            return(-1)
+        if not str(snapshotPoolId).isnumeric():
+            logger.error('ERROR: response: snapshotPoolId "%s" is not a valid number.', snapshotPoolId)
+            return(-1)
+        #snapshotgroup string can be at max 32 characters -> uuid4.hex
+        if snapshotGroupName == None:
+            snapshotGroupName = str(uuid.uuid4().hex)
+        body = json.dumps({'snapshotGroupName': str(snapshotGroupName),
+                           'snapshotPoolId': int(snapshotPoolId),
+                           'pvolLdevId': int(pvolLdevId),
+                           'isClone': isClone,
+                           'isConsistencyGroup': isConsistencyGroup,
+                           'autoSplit': autoSplit,
+                           'isDataReductionForceCopy': True})
+        return_response = await self._session_webrequest(request_type='POST', url_suffix=self._url_storage()+'/snapshots', body=body)
+        return(self._snapshots_response(return_response))
+
+    #resync snapshots
+    async def snapshots_resync(self, snapshotGroupName=None, autoSplit=True):
+        await self._general_execute()
+        if snapshotGroupName == None:
+            logger.error('ERROR: response: You must specify a snapshotGroupName.')
+            return(-1)
+        body = json.dumps({"parameters": {"autoSplit": autoSplit}})
+        return_response = await self._session_webrequest(request_type='PUT', url_suffix=self._url_storage()+URL_SNAPSHOTGROUPS+'/'+str(snapshotGroupName)+'/actions/resync/invoke', body=body)
+        return(self._snapshots_response(return_response))
+
+    #delete snapshots
+    async def snapshots_delete(self, snapshotGroupName=None):
+        await self._general_execute()
+        if snapshotGroupName == None:
+            logger.error('ERROR: response: You must specify a snapshotGroupName.')
+            return(-1)
+        return_response = await self._session_webrequest(request_type='DELETE', url_suffix=self._url_storage()+URL_SNAPSHOTGROUPS+'/'+str(snapshotGroupName))
+        return(self._snapshots_response(return_response))
@@ -0,0 +1,203 @@
+"""
+Caches used by the RestAPI class to avoid sending the same requests again.
+"""
+
+import collections
+import threading
+import time
+import json
+import os
+import tempfile
+import logging
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+#seconds a response of these resource types is kept by default
+DEFAULT_TTLS = {
+    'storages': 3600,
+    'ports': 300,
+    'host-groups': 300,
+    'resource-groups': 300,
+    'pools': 60,
+    }
+
+#a change of the key resource type can change the responses of these resource types as well
+RELATED_RESOURCES = {
+    'ldevs': ['pools', 'luns', 'resource-groups', 'snapshots', 'snapshot-groups', 'snapshot-replications'],
+    'luns': ['ldevs', 'host-groups'],
+    'host-groups': ['luns', 'host-wwns', 'ports', 'resource-groups'],
+    'host-wwns': ['host-groups'],
+    'pools': ['ldevs'],
+    'snapshots': ['snapshot-groups', 'snapshot-replications', 'ldevs', 'pools'],
+    'snapshot-groups': ['snapshots', 'snapshot-replications', 'ldevs', 'pools'],
+    'remote-replications': ['ldevs'],
+    'resource-groups': ['ldevs', 'ports', 'host-groups'],
+    }
+
+
+def resource_type(url_suffix:str):
+    '''Return the resource type of a request url. e.g. '/ConfigurationManager/v1/objects/storages/800000058068/ldevs/5' -> 'ldevs' '''
+    parts = [part for part in urlsplit(url_suffix).path.split('/') if not part == '']
+    if 'services' in parts:
+        #e.g. /ConfigurationManager/v1/800000058068/services/resource-group-service/actions/lock/invoke
+        service = parts[parts.index('services')+1] if len(parts) > parts.index('services')+1 else ''
+        return(service.replace('-service', 's'))
+    if 'storages' in parts:
+        parts = parts[parts.index('storages')+1:]
+        if len(parts) <= 1:
+            return('storages')
+        return(parts[1])
+    return(parts[-1] if parts else '')
+
+
+class TTLCache:
+    '''Thread safe LRU cache with a time to live per resource type.
+
+    Only resource types with a ttl are cached. At most maxsize entries are
+    kept, the least recently used entry is evicted first.
+    '''
+
+    def __init__(self, ttls:dict=None, maxsize:int=256):
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls is not None:
+            self.ttls.update(ttls)
+        self.maxsize = maxsize
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        #statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def cacheable(self, resource:str):
+        return(bool(self.ttls.get(resource)))
+
+    def get(self, key, default=None):
+        '''Return the value of key or default if it is not cached or expired'''
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return(default)
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return(entry[2])
+
+    def put(self, key, resource:str, value):
+        ttl = self.ttls.get(resource)
+        if not ttl:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, resource, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, resource:str):
+        '''Remove all entries of the resource type and of the related resource types'''
+        resources = set([resource] + RELATED_RESOURCES.get(resource, []))
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry[1] in resources]:
+                del self._entries[key]
+                self.invalidations += 1
+        logger.debug('cache invalidated: %s', ', '.join(sorted(resources)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return({'entries': len(self._entries), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions, 'invalidations': self.invalidations})
+
+
+class DiskCache:
+    '''JSON file with the storageDeviceId and the storage details per host, port and serial number.
+
+    The file is read once and written atomically (temporary file + rename) on
+    every change, so several processes can share it. Entries older than
+    max_age seconds are still returned but is_fresh() tells the caller to
+    refresh them.
+    '''
+
+    def __init__(self, path:str=None, max_age:float=86400):
+        if path is None:
+            path = os.path.join(os.path.expanduser('~'), '.cache', 'HitachiBlockAPI', 'storages.json')
+        self.path = os.path.expanduser(path)
+        self.max_age = max_age
+        self._entries = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(host:str, port:str, serial_number):
+        return(str(host)+':'+str(port)+':'+('' if serial_number is None else str(serial_number)))
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self.path, 'r') as fh:
+                    self._entries = json.load(fh)
+                if not isinstance(self._entries, dict):
+                    raise ValueError('no json object')
+            except FileNotFoundError:
+                self._entries = {}
+            except (OSError, ValueError) as e:
+                logger.warning('WARNING: storage cache file %s not readable (%s). start with an empty cache.', self.path, e)
+                self._entries = {}
+        return(self._entries)
+
+    def _save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.storages.', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as fh:
+                    json.dump(self._entries, fh, indent=2, sort_keys=True)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning('WARNING: storage cache file %s not writable (%s)', self.path, e)
+
+    def is_fresh(self, entry:dict):
+        return(time.time() - entry.get('updated', 0) < self.max_age)
+
+    def get(self, host:str, port:str, serial_number=None):
+        '''Return the entry {'storageDeviceId': ..., 'details': ..., 'updated': ...} or None'''
+        with self._lock:
+            entry = self._load().get(self._key(host, port, serial_number))
+            return(None if entry is None else dict(entry))
+
+    def find(self, host:str, port:str, storage_device_id:str):
+        '''Return the entry of host:port with the storageDeviceId that contains the storage details or None'''
+        prefix = str(host)+':'+str(port)+':'
+        with self._lock:
+            for key, entry in self._load().items():
+                if key.startswith(prefix) and entry.get('storageDeviceId') == storage_device_id and 'details' in entry:
+                    return(dict(entry))
+        return(None)
+
+    def put(self, host:str, port:str, serial_number=None, storage_device_id:str=None, details:dict=None):
+        with self._lock:
+            entries = self._load()
+            entry = dict(entries.get(self._key(host, port, serial_number), {}))
+            if storage_device_id is not None:
+                entry['storageDeviceId'] = storage_device_id
+            if details is not None:
+                entry['details'] = details
+            entry['updated'] = time.time()
+            entries[self._key(host, port, serial_number)] = entry
+            self._save()
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._save()
@@ -0,0 +1,203 @@
+"""
+Record the requests and responses of a storage into a cassette file and replay them later without the storage (offline profiling and tests).
+"""
+
+import base64
+import collections
+import gzip
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import logging
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+#cassette file format version
+CASSETTE_VERSION = 1
+
+#values of these keys are replaced in the recorded request and response bodies (the headers are never recorded)
+SCRUB_KEYS = ('token', 'password', 'oldPassword', 'newPassword')
+SCRUBBED = '***'
+
+#exceptions that are recorded and raised again in replay mode
+_ERRORS = {'timeout': socket.timeout, 'connection': ConnectionError}
+
+
+#replace the values of the keys to scrub. returns the (maybe new) object and if something was replaced
+def _scrub_object(element):
+    if isinstance(element, dict):
+        scrubbed = False
+        result = {}
+        for key, value in element.items():
+            if key in SCRUB_KEYS and value is not None:
+                result[key] = SCRUBBED
+                scrubbed = True
+            else:
+                result[key], changed = _scrub_object(value)
+                scrubbed = scrubbed or changed
+        return(result, scrubbed)
+    if isinstance(element, list):
+        scrubbed = False
+        result = []
+        for value in element:
+            value, changed = _scrub_object(value)
+            result.append(value)
+            scrubbed = scrubbed or changed
+        return(result, scrubbed)
+    return(element, False)
+
+
+def scrub(data):
+    '''Body (str or bytes) with the values of SCRUB_KEYS replaced. Bodies that are not json or contain none of the keys are returned unchanged'''
+    if data is None or len(data) == 0:
+        return(data)
+    text = data.decode('utf-8', 'replace') if isinstance(data, bytes) else data
+    #most responses (ldevs, luns, ...) contain none of the keys and are not parsed
+    if not any('"'+key+'"' in text for key in SCRUB_KEYS):
+        return(data)
+    try:
+        element, scrubbed = _scrub_object(json.loads(text))
+    except ValueError:
+        return(data)
+    if not scrubbed:
+        return(data)
+    text = json.dumps(element)
+    return(text.encode('utf-8') if isinstance(data, bytes) else text)
+
+
+class Cassette:
+    '''Recorded requests and responses of one or more storages.
+
+    mode 'record': request() sends the requests and keeps method, url path,
+    body, status, reason, response and duration of every request. save()
+    writes them to path (gzip compressed json lines). Headers are not
+    recorded and the values of SCRUB_KEYS (session tokens, passwords) are
+    replaced in the bodies.
+    mode 'replay': request() answers from the file without any connection.
+    Requests with the same method, path and body get the recorded responses
+    in the recorded order (the last one is repeated). The responses are
+    returned at once or after latency * the recorded duration (latency=1.0
+    replays with the recorded latencies). Requests that were not recorded
+    get a 404.
+    '''
+
+    def __init__(self, path:str, mode:str='replay', latency:float=0.0):
+        if mode not in ('record', 'replay'):
+            raise ValueError('mode must be record or replay, not '+str(mode))
+        self.path = os.path.expanduser(path)
+        self.mode = mode
+        self.latency = latency
+        self._lock = threading.Lock()
+        #recorded requests in the order they were completed
+        self._interactions = []
+        #{(method, path, body): [interaction]} and the position of the next response
+        self._responses = collections.defaultdict(list)
+        self._positions = collections.Counter()
+        #statistics
+        self.replayed = 0
+        self.misses = 0
+        if mode == 'replay':
+            self.load()
+
+    @staticmethod
+    def _key(method:str, url:str, body):
+        parts = urlsplit(url)
+        path = parts.path+('?'+parts.query if parts.query else '')
+        if isinstance(body, bytes):
+            body = body.decode('utf-8', 'replace')
+        return((str(method), path, scrub(body) or ''))
+
+    def load(self):
+        '''Read the cassette file (replay mode)'''
+        with self._lock:
+            self._interactions = []
+            self._responses = collections.defaultdict(list)
+            self._positions = collections.Counter()
+            with gzip.open(self.path, 'rt', encoding='utf-8') as fh:
+                header = json.loads(fh.readline() or '{}')
+                if not header.get('cassette') == CASSETTE_VERSION:
+                    raise ValueError(self.path+' is not a cassette file of version '+str(CASSETTE_VERSION))
+                for line in fh:
+                    interaction = json.loads(line)
+                    self._interactions.append(interaction)
+                    self._responses[(interaction['method'], interaction['path'], interaction['body'])].append(interaction)
+            logger.debug('cassette %s loaded: %d requests', self.path, len(self._interactions))
+        return(len(self._interactions))
+
+    def save(self):
+        '''Write the recorded requests to the cassette file (atomically, temporary file + rename)'''
+        if not self.mode == 'record':
+            return(None)
+        with self._lock:
+            interactions = list(self._interactions)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.cassette.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt', encoding='utf-8') as fh:
+                fh.write(json.dumps({'cassette': CASSETTE_VERSION, 'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()), 'requests': len(interactions)})+'\n')
+                for interaction in interactions:
+                    fh.write(json.dumps(interaction, separators=(',', ':'))+'\n')
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        logger.debug('cassette %s saved: %d requests', self.path, len(interactions))
+        return(None)
+
+    def request(self, send, method:str, url:str, headers:dict, body, timeout:float):
+        '''(status, reason, data) of the request. send(method=, url=, headers=, body=, timeout=) sends it (record mode only)'''
+        method, path, request_body = self._key(method, url, body)
+        if self.mode == 'replay':
+            return(self._replay(method, path, request_body))
+
+        start = time.monotonic()
+        interaction = {'method': method, 'path': path, 'body': request_body}
+        try:
+            status, reason, data = send(method=method, url=url, headers=headers, body=body, timeout=timeout)
+        except (socket.timeout, OSError) as e:
+            interaction.update(seconds=time.monotonic()-start, error='timeout' if isinstance(e, socket.timeout) else 'connection', message=str(e))
+            with self._lock:
+                self._interactions.append(interaction)
+            raise
+        interaction.update(seconds=time.monotonic()-start, status=status, reason=reason)
+        #the client gets the response as it is, only the recorded one is scrubbed
+        recorded = scrub(data)
+        try:
+            interaction['data'] = recorded.decode('utf-8')
+        except UnicodeDecodeError:
+            interaction['data'] = base64.b64encode(recorded).decode('ascii')
+            interaction['encoding'] = 'base64'
+        with self._lock:
+            self._interactions.append(interaction)
+        return(status, reason, data)
+
+    def _replay(self, method:str, path:str, body:str):
+        with self._lock:
+            responses = self._responses.get((method, path, body))
+            if not responses:
+                self.misses += 1
+                interaction = None
+            else:
+                position = self._positions[(method, path, body)]
+                interaction = responses[min(position, len(responses) - 1)]
+                self._positions[(method, path, body)] = position + 1
+                self.replayed += 1
+        if interaction is None:
+            logger.warning('WARNING: %s %s is not recorded in the cassette %s', method, path, self.path)
+            return(404, 'Not Found', json.dumps({'errorSource': path, 'message': 'The request is not recorded in the cassette.'}).encode('utf-8'))
+        if self.latency:
+            time.sleep(interaction.get('seconds', 0) * self.latency)
+        if 'error' in interaction:
+            raise _ERRORS.get(interaction['error'], ConnectionError)(interaction.get('message', ''))
+        data = interaction.get('data', '')
+        data = base64.b64decode(data) if interaction.get('encoding') == 'base64' else data.encode('utf-8')
+        return(interaction['status'], interaction.get('reason', ''), data)
+
+    def stats(self):
+        with self._lock:
+            return({'mode': self.mode, 'path': self.path, 'requests': len(self._interactions), 'replayed': self.replayed, 'misses': self.misses})
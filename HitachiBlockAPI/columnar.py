@@ -0,0 +1,223 @@
+"""
+Columns (NumPy arrays if NumPy is installed, otherwise array module arrays) of ldevs, pools and other storage elements.
+"""
+
+import array
+import math
+import logging
+
+#numpy is optional
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+logger = logging.getLogger(__name__)
+
+#value of a missing number in an integer column (ids and capacities are never negative)
+MISSING_INT = -1
+
+#columns of ldevs_columns_get
+LDEV_FIELDS = ('ldevId', 'blockCapacity', 'numOfUsedBlock', 'poolId', 'resourceGroupId', 'dataReductionStatus',
+               'emulationType', 'status')
+
+
+#integer, float or string column out of the values of all elements
+def _column_type(values:list):
+    column_type = None
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, (bool, int)):
+            if column_type is None:
+                column_type = 'int'
+        elif isinstance(value, float):
+            if column_type in (None, 'int'):
+                column_type = 'float'
+        elif isinstance(value, str):
+            return('str')
+        else:
+            #lists and dictionaries are not put in columns
+            return(None)
+    return(column_type or 'int')
+
+
+def _array(type_code:str, values):
+    if numpy is not None:
+        return(numpy.array(values, dtype=numpy.int64 if type_code == 'q' else numpy.float64))
+    return(array.array(type_code, values))
+
+
+#the column with 0 instead of the missing values (MISSING_INT or nan), to be summed up
+def _summable(column):
+    if numpy is not None:
+        if column.dtype.kind == 'f':
+            return(numpy.where(numpy.isnan(column), 0.0, column))
+        return(numpy.where(column == MISSING_INT, 0, column))
+    if column.typecode == 'd':
+        return([0.0 if math.isnan(value) else value for value in column])
+    return([0 if value == MISSING_INT else value for value in column])
+
+
+class StringColumn:
+    '''Dictionary encoded string column. codes[i] is the index of the value of row i in categories (-1 if missing)'''
+
+    def __init__(self, values:list):
+        self.categories = []
+        index = {}
+        codes = []
+        for value in values:
+            if value is None:
+                codes.append(-1)
+                continue
+            code = index.get(value)
+            if code is None:
+                code = len(self.categories)
+                index[value] = code
+                self.categories.append(value)
+            codes.append(code)
+        self.codes = _array('q', codes)
+
+    def __len__(self):
+        return(len(self.codes))
+
+    def __getitem__(self, row:int):
+        code = int(self.codes[row])
+        return(None if code < 0 else self.categories[code])
+
+    def tolist(self):
+        return([None if code < 0 else self.categories[code] for code in self.codes])
+
+    #rows where the value is equal to value (boolean array with NumPy, list of bool otherwise)
+    def equals(self, value):
+        code = self.categories.index(value) if value in self.categories else -2
+        if numpy is not None:
+            return(self.codes == code)
+        return([element == code for element in self.codes])
+
+
+class Columns:
+    '''Columns of the same length. columns[name] is a NumPy/array module array or a StringColumn'''
+
+    def __init__(self, columns:dict):
+        self.columns = columns
+        lengths = set(len(column) for column in columns.values())
+        if len(lengths) > 1:
+            raise ValueError('the columns do not have the same length: '+str(lengths))
+        self._length = lengths.pop() if lengths else 0
+
+    @classmethod
+    def from_elements(cls, elements, fields:tuple=None):
+        '''Columns out of the values of a dictionary ({id: element}) or list of elements (dicts or records).
+        Without fields all fields with numbers or strings are used.'''
+        if isinstance(elements, dict):
+            elements = list(elements.values())
+        if fields is None:
+            fields = []
+            for element in elements:
+                for key in element.keys():
+                    if key not in fields:
+                        fields.append(key)
+        columns = {}
+        for field in fields:
+            values = [element.get(field) for element in elements]
+            column_type = _column_type(values)
+            if column_type == 'int':
+                columns[field] = _array('q', [MISSING_INT if value is None else int(value) for value in values])
+            elif column_type == 'float':
+                columns[field] = _array('d', [math.nan if value is None else float(value) for value in values])
+            elif column_type == 'str':
+                columns[field] = StringColumn([None if value is None else str(value) for value in values])
+        return(cls(columns))
+
+    def __len__(self):
+        return(self._length)
+
+    def __getitem__(self, name:str):
+        return(self.columns[name])
+
+    def __contains__(self, name:str):
+        return(name in self.columns)
+
+    def keys(self):
+        return(self.columns.keys())
+
+    #sum of the column without the missing values (only of the rows where where is True, e.g. StringColumn.equals)
+    def sum(self, name:str, where=None):
+        column = _summable(self.columns[name])
+        if numpy is not None:
+            if where is not None:
+                column = column[numpy.asarray(where, dtype=bool)]
+            return(column.sum().item())
+        if where is not None:
+            column = [value for value, selected in zip(column, where) if selected]
+        return(sum(column))
+
+    def groupby_sum(self, by:str, names:list):
+        '''{value of by: {'count': rows, name: sum of the column, ...}}. Missing values are not summed up, a missing value of by is the key None (string) or MISSING_INT'''
+        group = self.columns[by]
+        if isinstance(group, StringColumn):
+            categories = group.categories
+            codes = group.codes
+        else:
+            categories = None
+            codes = group
+        if numpy is not None:
+            keys, inverse = numpy.unique(numpy.asarray(codes), return_inverse=True)
+            inverse = inverse.reshape(-1)
+            sums = {'count': numpy.bincount(inverse, minlength=len(keys))}
+            for name in names:
+                column = _summable(self.columns[name])
+                totals = numpy.zeros(len(keys), dtype=column.dtype)
+                numpy.add.at(totals, inverse, column)
+                sums[name] = totals
+            keys = keys.tolist()
+            sums = {name: totals.tolist() for name, totals in sums.items()}
+        else:
+            positions = {}
+            keys = []
+            columns = {name: _summable(self.columns[name]) for name in names}
+            sums = {name: [] for name in ['count'] + list(names)}
+            for row, key in enumerate(codes):
+                position = positions.get(key)
+                if position is None:
+                    position = len(keys)
+                    positions[key] = position
+                    keys.append(key)
+                    for totals in sums.values():
+                        totals.append(0)
+                sums['count'][position] += 1
+                for name in names:
+                    sums[name][position] += columns[name][row]
+        result = {}
+        for position, key in enumerate(keys):
+            if categories is not None:
+                key = None if key < 0 else categories[key]
+            result[key] = {name: totals[position] for name, totals in sums.items()}
+        return(result)
+
+
+def ldev_columns(ldevs:dict, fields:tuple=LDEV_FIELDS):
+    '''Columns of the ldevs of ldevs_get (dictionaries or records)'''
+    return(Columns.from_elements(ldevs, fields=fields))
+
+
+def ldev_hostgroup_columns(ldevs:dict, fields:tuple=('ldevId', 'blockCapacity', 'numOfUsedBlock', 'poolId')):
+    '''One row per ldev and host group the ldev is mapped to (out of the ldev 'ports') with the column hostGroupId'''
+    rows = []
+    for ldev in ldevs.values():
+        hostgroups = []
+        for port in ldev.get('ports') or []:
+            hostgroup = str(port['portId'])+','+str(port['hostGroupNumber'])
+            if hostgroup not in hostgroups:
+                hostgroups.append(hostgroup)
+        for hostgroup in hostgroups:
+            row = {field: ldev.get(field) for field in fields}
+            row['hostGroupId'] = hostgroup
+            rows.append(row)
+    return(Columns.from_elements(rows, fields=tuple(fields)+('hostGroupId',)))
+
+
+def pool_columns(pools:dict, fields:tuple=None):
+    '''Columns of the pools of pools_get'''
+    return(Columns.from_elements(pools, fields=fields))
@@ -0,0 +1,170 @@
+"""
+Client for many storage arrays of one or more Configuration Manager endpoints that runs the same query on all arrays in parallel.
+"""
+
+import collections
+import concurrent.futures
+import time
+import logging
+
+from .Hitachi import RestAPI
+
+logger = logging.getLogger(__name__)
+
+#result of one array. error is None or the text of the exception, seconds is the time the array needed
+FleetResult = collections.namedtuple('FleetResult', ['serial_number', 'result', 'error', 'seconds'])
+
+
+class Fleet:
+    '''Runs RestAPI functions on all (or selected) storage arrays of one or more Configuration Manager endpoints.
+
+    endpoints is one dictionary or a list of dictionaries with the RestAPI
+    arguments of an endpoint (fqdn_ip, port, username, password, ...),
+    options are used for every endpoint (e.g. cache=True). discover() reads
+    the arrays of every endpoint with storage_systems_get and creates one
+    RestAPI per array (own session and storageDeviceId, so the arrays can
+    be queried at the same time).
+
+    run('pools_get') or simply pools_get() returns {serialNumber: FleetResult}.
+    An exception or a -1 (error) of one array is stored in its result and does
+    not stop the other arrays.
+    '''
+
+    def __init__(self, endpoints, serial_numbers:list=None, parallel:int=8, **options):
+        if isinstance(endpoints, dict):
+            endpoints = [endpoints]
+        self.endpoints = [dict(options, **endpoint) for endpoint in endpoints]
+        self.serial_numbers = None if serial_numbers is None else [str(serial_number) for serial_number in serial_numbers]
+        self.parallel = parallel
+        #{serialNumber: storage of storage_systems_get} and {serialNumber: RestAPI}
+        self.storages = {}
+        self.apis = {}
+        #statistics of the last run
+        self.last_run = {}
+
+    def __enter__(self):
+        return(self)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    #close the sessions and connections of all arrays
+    def close(self):
+        for api in self.apis.values():
+            try:
+                api.close()
+            except Exception as e:
+                logger.warning('WARNING: close failed: %s', e)
+        self.apis = {}
+        self.storages = {}
+        return(None)
+
+    def discover(self):
+        '''Read the arrays of all endpoints and return {serialNumber: storage}. Endpoints that fail are logged and skipped'''
+        start = time.time()
+
+        def storages_get(endpoint):
+            api = RestAPI(**endpoint)
+            try:
+                return(api, api.storage_systems_get(), None)
+            except (Exception, SystemExit) as e:
+                api.close()
+                return(api, None, e)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(self.parallel, len(self.endpoints)))) as executor:
+            responses = list(executor.map(storages_get, self.endpoints))
+
+        for endpoint, (endpoint_api, storages, error) in zip(self.endpoints, responses):
+            #the api of the endpoint is only used to read the arrays
+            endpoint_api.close()
+            if error is not None or not isinstance(storages, dict):
+                logger.error('ERROR: storage systems of %s:%s could not be read: %s', endpoint.get('fqdn_ip'), endpoint.get('port'), error if error is not None else storages)
+                continue
+            for serial_number, storage in storages.items():
+                serial_number = str(serial_number)
+                if self.serial_numbers is not None and serial_number not in self.serial_numbers:
+                    continue
+                if serial_number in self.storages:
+                    logger.warning('WARNING: storage %s is registered at more than one endpoint. %s:%s is not used for it.', serial_number, endpoint.get('fqdn_ip'), endpoint.get('port'))
+                    continue
+                api = RestAPI(**endpoint)
+                #the storageDeviceId is known, no storage_device_id_set request needed
+                api._storage_device_id = storage['storageDeviceId']
+                self.storages[serial_number] = storage
+                self.apis[serial_number] = api
+
+        if self.serial_numbers is not None:
+            for serial_number in self.serial_numbers:
+                if serial_number not in self.storages:
+                    logger.warning('WARNING: storage %s is not registered at any endpoint.', serial_number)
+
+        end = time.time()
+        logger.debug('storages discovered: %d in %.1fsec', len(self.storages), end-start)
+        return(self.storages)
+
+    def run(self, function:str, *args, serial_numbers:list=None, parallel:int=None, timeout:float=None, **kwargs):
+        '''Run the RestAPI function with the arguments on the arrays (all or serial_numbers) in parallel.
+        Return {serialNumber: FleetResult(serial_number, result, error, seconds)} in the order of the arrays.
+        Arrays that are not done after timeout seconds get the error 'timeout'.
+        '''
+        start = time.time()
+        if function.startswith('_') or not callable(getattr(RestAPI, function, None)):
+            raise AttributeError('RestAPI has no function '+str(function))
+        if len(self.apis) == 0:
+            self.discover()
+        if serial_numbers is None:
+            serial_numbers = list(self.apis)
+        serial_numbers = [str(serial_number) for serial_number in serial_numbers]
+        if parallel is None:
+            parallel = self.parallel
+
+        def call(serial_number):
+            call_start = time.time()
+            api = self.apis.get(serial_number)
+            if api is None:
+                return(FleetResult(serial_number, None, 'storage not found', 0.0))
+            try:
+                result = getattr(api, function)(*args, **kwargs)
+                error = 'request failed' if isinstance(result, int) and not isinstance(result, bool) and result == -1 else None
+            #storage_device_id_get calls sys.exit if the storage is not found
+            except (Exception, SystemExit) as e:
+                logger.error('ERROR: %s of storage %s failed: %s', function, serial_number, e)
+                result = None
+                error = str(e) or type(e).__name__
+            return(FleetResult(serial_number, result, error, time.time()-call_start))
+
+        results = {}
+        if len(serial_numbers) > 0:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(parallel, len(serial_numbers))))
+            futures = {executor.submit(call, serial_number): serial_number for serial_number in serial_numbers}
+            done, not_done = concurrent.futures.wait(futures, timeout=timeout)
+            #do not wait for the arrays that are too slow
+            executor.shutdown(wait=False)
+            for future, serial_number in futures.items():
+                if future in done:
+                    results[serial_number] = future.result()
+                else:
+                    logger.error('ERROR: %s of storage %s not done within %ssec.', function, serial_number, timeout)
+                    results[serial_number] = FleetResult(serial_number, None, 'timeout', time.time()-start)
+            results = {serial_number: results[serial_number] for serial_number in serial_numbers}
+
+        end = time.time()
+        failed = [serial_number for serial_number, result in results.items() if result.error is not None]
+        self.last_run = {'function': function, 'storages': len(results), 'failed': failed, 'seconds': end-start,
+                         'slowest': max(results.values(), key=lambda result: result.seconds).serial_number if results else None}
+        logger.debug('%s on %d storages in %.1fsec, failed: %s', function, len(results), end-start, failed)
+        return(results)
+
+    #results without the failed arrays {serialNumber: result}
+    @staticmethod
+    def results(results:dict):
+        return({serial_number: result.result for serial_number, result in results.items() if result.error is None})
+
+    #fleet.pools_get(...) is fleet.run('pools_get', ...)
+    def __getattr__(self, name):
+        if name.endswith('_get') and not name.startswith('_') and callable(getattr(RestAPI, name, None)):
+            def function(*args, **kwargs):
+                return(self.run(name, *args, **kwargs))
+            function.__name__ = name
+            return(function)
+        raise AttributeError(name)
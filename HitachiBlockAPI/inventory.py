@@ -0,0 +1,182 @@
+"""
+Last known inventory (ldevs, host groups, luns, wwns) of a storage that is refreshed incrementally.
+"""
+
+import collections
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+#action: 'added', 'removed' or 'changed'. kind: 'ldev', 'hostgroup', 'lun' or 'wwn'. old/new: None or the dictionary of the storage
+Event = collections.namedtuple('Event', ['action', 'kind', 'key', 'old', 'new'])
+
+
+#events of the differences between two dictionaries of the same kind
+def _diff(kind:str, old:dict, new:dict):
+    events = []
+    for key, value in new.items():
+        previous = old.get(key)
+        if previous is None:
+            events.append(Event('added', kind, key, None, value))
+        elif not previous == value:
+            events.append(Event('changed', kind, key, previous, value))
+    for key in old:
+        if key not in new:
+            events.append(Event('removed', kind, key, old[key], None))
+    return(events)
+
+
+#'CL1-A', 5 -> 'CL1-A,5'
+def _hostgroup_id(element:dict):
+    return(str(element['portId'])+','+str(element['hostGroupNumber']))
+
+
+class Inventory:
+    '''Ldevs, host groups, luns and wwns of the storage that is set in api.
+
+    refresh() reads all ldevs (page by page) and all host groups (one request)
+    and only requests the luns of the host groups whose lun to ldev mapping
+    changed (taken from the 'ports' of the ldevs) and the wwns of added or
+    changed host groups. Every full_refresh_every refreshes the luns and wwns
+    of all host groups are read again (e.g. to see a wwn that was added to an
+    unchanged host group).
+    '''
+
+    def __init__(self, api, page_size:int=1000, full_refresh_every:int=12, parallel:int=None, timeout:int=120):
+        self.api = api
+        self.page_size = page_size
+        self.full_refresh_every = full_refresh_every
+        self.parallel = parallel
+        self.timeout = timeout
+        self.ldevs = {}
+        self.hostgroups = {}
+        #{hostGroupId: {lunId: lun}} and {hostGroupId: {hostWwnId: wwn}}
+        self._hostgroup_luns = {}
+        self._hostgroup_wwns = {}
+        #{hostGroupId: frozenset((lun, ldevId))} of the last ldevs
+        self._lun_signatures = {}
+        #host groups whose luns or wwns could not be read, they are requested again by the next refresh
+        self._luns_pending = set()
+        self._wwns_pending = set()
+        self.refreshes = 0
+        #statistics of the last refresh
+        self.last_refresh = {}
+
+    @property
+    def luns(self):
+        luns = {}
+        for hostgroup_luns in self._hostgroup_luns.values():
+            luns.update(hostgroup_luns)
+        return(luns)
+
+    @property
+    def wwns(self):
+        wwns = {}
+        for hostgroup_wwns in self._hostgroup_wwns.values():
+            wwns.update(hostgroup_wwns)
+        return(wwns)
+
+    #lun to ldev mapping per host group out of the 'ports' of the ldevs. None if the ldevs have no 'ports'
+    @staticmethod
+    def _lun_signatures_get(ldevs:dict):
+        signatures = collections.defaultdict(set)
+        has_ports = False
+        for ldev_id, ldev in ldevs.items():
+            ports = ldev.get('ports')
+            if ports is None:
+                continue
+            has_ports = True
+            for port in ports:
+                signatures[_hostgroup_id(port)].add((port.get('lun'), ldev_id))
+        if not has_ports and len(ldevs) > 0:
+            return(None)
+        return({hostgroup: frozenset(signature) for hostgroup, signature in signatures.items()})
+
+    #request the luns or wwns of the host groups in parallel. {hostGroupId: {id: element}} and the host groups that could not be read
+    def _hostgroups_request(self, function, hostgroups:list):
+        responses = self.api._parallel_map(lambda hostgroup: function(hostgroup, timeout=self.timeout), hostgroups, parallel=self.parallel)
+        elements = {}
+        failed = set()
+        for hostgroup, response in zip(hostgroups, responses):
+            if isinstance(response, dict):
+                elements[hostgroup] = response
+            elif response == None:
+                #host group without luns/wwns
+                elements[hostgroup] = {}
+            else:
+                #the last known luns/wwns of the host group are kept
+                failed.add(hostgroup)
+        if len(failed) > 0:
+            logger.warning('WARNING: %s of %d host groups could not be read. keep the last known ones: %s', getattr(function, '__name__', function), len(failed), sorted(failed))
+        return(elements, failed)
+
+    def refresh(self):
+        '''Read the changes of the storage and return them as list of Event'''
+        start = time.time()
+        full = self.refreshes % self.full_refresh_every == 0 if self.full_refresh_every else self.refreshes == 0
+        events = []
+
+        ldevs = self.api.ldevs_get(page_size=self.page_size, timeout=self.timeout)
+        if not isinstance(ldevs, dict) or (len(ldevs) == 0 and len(self.ldevs) > 0):
+            logger.warning('WARNING: ldevs could not be read. keep the last known ldevs.')
+            ldevs = self.ldevs
+        events += _diff('ldev', self.ldevs, ldevs)
+
+        hostgroups = self.api.host_groups_all_ports_get(timeout=self.timeout, parallel=self.parallel)
+        if not isinstance(hostgroups, dict):
+            logger.warning('WARNING: host groups could not be read. keep the last known host groups.')
+            hostgroups = self.hostgroups
+        hostgroup_events = _diff('hostgroup', self.hostgroups, hostgroups)
+        events += hostgroup_events
+
+        lun_signatures = self._lun_signatures_get(ldevs)
+        if lun_signatures is None:
+            #the storage does not return the 'ports' of the ldevs
+            full = True
+            lun_signatures = {}
+
+        if full:
+            luns_request = list(hostgroups)
+            wwns_request = list(hostgroups)
+        else:
+            changed = set(event.key for event in hostgroup_events if not event.action == 'removed')
+            for hostgroup in set(lun_signatures) | set(self._lun_signatures):
+                if not lun_signatures.get(hostgroup) == self._lun_signatures.get(hostgroup):
+                    changed.add(hostgroup)
+            luns_request = [hostgroup for hostgroup in hostgroups if hostgroup in changed or hostgroup in self._luns_pending]
+            wwns_changed = set(event.key for event in hostgroup_events if not event.action == 'removed')
+            wwns_request = [hostgroup for hostgroup in hostgroups if hostgroup in wwns_changed or hostgroup in self._wwns_pending]
+
+        luns, self._luns_pending = self._hostgroups_request(self.api.luns_get, luns_request)
+        wwns, self._wwns_pending = self._hostgroups_request(self.api.wwns_get, wwns_request)
+        #host groups that do not exist anymore
+        for hostgroup in list(self._hostgroup_luns):
+            if hostgroup not in hostgroups:
+                luns[hostgroup] = {}
+        for hostgroup in list(self._hostgroup_wwns):
+            if hostgroup not in hostgroups:
+                wwns[hostgroup] = {}
+
+        for hostgroup, hostgroup_luns in luns.items():
+            events += _diff('lun', self._hostgroup_luns.get(hostgroup, {}), hostgroup_luns)
+            if len(hostgroup_luns) == 0:
+                self._hostgroup_luns.pop(hostgroup, None)
+            else:
+                self._hostgroup_luns[hostgroup] = hostgroup_luns
+        for hostgroup, hostgroup_wwns in wwns.items():
+            events += _diff('wwn', self._hostgroup_wwns.get(hostgroup, {}), hostgroup_wwns)
+            if len(hostgroup_wwns) == 0:
+                self._hostgroup_wwns.pop(hostgroup, None)
+            else:
+                self._hostgroup_wwns[hostgroup] = hostgroup_wwns
+
+        self.ldevs = ldevs
+        self.hostgroups = hostgroups
+        self._lun_signatures = lun_signatures
+        self.refreshes += 1
+
+        end = time.time()
+        self.last_refresh = {'full': full, 'luns_requests': len(luns_request), 'wwns_requests': len(wwns_request), 'events': len(events), 'seconds': end-start}
+        logger.debug('inventory refreshed: %s', self.last_refresh)
+        return(events)
@@ -0,0 +1,113 @@
+"""
+Handles of the asynchronous jobs of the storage and a waiter that polls many jobs in one loop.
+"""
+
+import random
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+#status of a job that is finished (state is then 'Succeeded' or 'Failed')
+JOB_STATUS_COMPLETED = 'Completed'
+JOB_STATE_SUCCEEDED = 'Succeeded'
+
+#more pending jobs than this are polled with one request of the job list
+JOBS_LIST_THRESHOLD = 8
+
+
+class Job:
+    '''Handle of a job that the storage started for a POST, PUT or DELETE request (202 Accepted).
+
+    job is the last known job dictionary (jobId, status, state, affectedResources, error, ...).
+    wait() polls the storage until the job is completed.
+    '''
+
+    def __init__(self, api, job:dict):
+        self.api = api
+        self.job = job if isinstance(job, dict) else {}
+        self.jobId = self.job.get('jobId')
+        self.submitted = time.time()
+        self.completed = time.time() if self.done() else None
+
+    @property
+    def status(self):
+        return(self.job.get('status'))
+
+    @property
+    def state(self):
+        return(self.job.get('state'))
+
+    @property
+    def affected_resources(self):
+        return(self.job.get('affectedResources', []))
+
+    @property
+    def error(self):
+        return(self.job.get('error'))
+
+    #seconds from the submit until the job was completed (or until now)
+    @property
+    def duration(self):
+        return((self.completed or time.time()) - self.submitted)
+
+    def done(self):
+        return(self.status == JOB_STATUS_COMPLETED or self.jobId is None)
+
+    def succeeded(self):
+        return(self.status == JOB_STATUS_COMPLETED and self.state == JOB_STATE_SUCCEEDED)
+
+    def update(self, job:dict):
+        if isinstance(job, dict):
+            self.job = job
+            if self.completed is None and self.done():
+                self.completed = time.time()
+
+    def wait(self, timeout:float=600, **kwargs):
+        '''Wait until the job is completed (or timeout seconds). Return True if it succeeded'''
+        jobs_wait(self.api, [self], timeout=timeout, **kwargs)
+        return(self.succeeded())
+
+    def result(self, timeout:float=600):
+        '''Wait for the job and return its job dictionary'''
+        self.wait(timeout=timeout)
+        return(self.job)
+
+    def __repr__(self):
+        return('Job('+str(self.jobId)+', status='+str(self.status)+', state='+str(self.state)+')')
+
+
+def jobs_wait(api, jobs:list, timeout:float=600, interval:float=0.5, max_interval:float=10, backoff:float=2, jitter:float=0.2):
+    '''Poll all jobs in one loop until they are completed or timeout seconds passed.
+
+    The interval between the polls grows by backoff up to max_interval and is
+    changed randomly by +/- jitter (part of the interval) so that many waiters
+    do not poll at the same time. Jobs are requested one by one (in parallel)
+    or, if many are pending, with one request of the job list.
+    Return the list of jobs that are completed.
+    '''
+    deadline = time.monotonic() + timeout
+    pending = [job for job in jobs if not job.done()]
+    while pending:
+        now = time.monotonic()
+        if now >= deadline:
+            logger.warning('WARNING: %d job(s) not completed within %ssec.', len(pending), timeout)
+            break
+        delay = min(interval, max_interval) * (1 + random.uniform(-jitter, jitter))
+        time.sleep(max(0, min(delay, deadline - now)))
+        interval = interval * backoff
+
+        found = {}
+        if len(pending) > JOBS_LIST_THRESHOLD:
+            response = api._jobs_get()
+            if isinstance(response, list):
+                for job in response:
+                    found[job.get('jobId')] = job
+        missing = [job for job in pending if job.jobId not in found]
+        for job, response in zip(missing, api._parallel_map(lambda job: api._jobs_by_id_get(jobId=job.jobId), missing)):
+            found[job.jobId] = response
+        for job in pending:
+            job.update(found.get(job.jobId))
+        pending = [job for job in pending if not job.done()]
+        logger.debug('jobs pending: %d', len(pending))
+    return([job for job in jobs if job.done()])
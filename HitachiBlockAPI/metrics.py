@@ -0,0 +1,179 @@
+"""
+Request metrics (counts, bytes, status codes, latency histograms) per endpoint template and their export as Prometheus text.
+"""
+
+import bisect
+import collections
+import threading
+from urllib.parse import urlsplit
+
+#upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+def endpoint_template(url_suffix:str):
+    '''Endpoint of a request url without ids and query. e.g.
+    '/ConfigurationManager/v1/objects/storages/800000058068/ldevs/5?count=10' -> '/ldevs/{id}'
+    '/ConfigurationManager/v1/objects/storages/800000058068/snapshot-groups/g1/actions/resync/invoke' -> '/snapshot-groups/{id}/actions/resync/invoke'
+    '''
+    if url_suffix is None:
+        return('/storages')
+    parts = [part for part in urlsplit(url_suffix).path.split('/') if not part == '']
+    if 'services' in parts:
+        #e.g. /ConfigurationManager/v1/services/resource-group-service/actions/lock/invoke
+        return('/'+'/'.join(parts[parts.index('services'):]))
+    if 'objects' in parts:
+        parts = parts[parts.index('objects')+1:]
+    #the storage is a label, not an endpoint
+    if len(parts) > 2 and parts[0] == 'storages':
+        parts = parts[2:]
+    template = []
+    position = 0
+    while position < len(parts):
+        template.append(parts[position])
+        if parts[position] == 'actions':
+            template += parts[position+1:]
+            break
+        if position + 1 < len(parts):
+            template.append('{id}')
+        position += 2
+    return('/'+'/'.join(template))
+
+
+class _Endpoint:
+    '''Counters of one method and endpoint template'''
+    __slots__ = ('statuses', 'bytes_sent', 'bytes_received', 'seconds_total', 'seconds_max', 'buckets', 'retries', 'cache_hits', 'cache_misses')
+
+    def __init__(self, buckets:int):
+        self.statuses = collections.Counter()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.seconds_total = 0.0
+        self.seconds_max = 0.0
+        #requests per bucket (not cumulative), the last one is +Inf
+        self.buckets = [0] * (buckets + 1)
+        self.retries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+class Metrics:
+    '''Thread safe request metrics of a RestAPI instance.
+
+    Every request is counted per method and endpoint template (see
+    endpoint_template) with its status (HTTP status code, 'error', 'timeout'
+    or 'circuit_open'), bytes and latency. Retries, cache hits/misses and
+    session creations are counted as well. get() returns a dictionary,
+    prometheus() the Prometheus text exposition format.
+    '''
+
+    def __init__(self, buckets:tuple=DEFAULT_BUCKETS):
+        self.bucket_bounds = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
+            self.session_creations = 0
+
+    #counters of method and endpoint template, created if needed (call with the lock)
+    def _endpoint(self, method:str, url_suffix:str):
+        key = (method, endpoint_template(url_suffix))
+        endpoint = self._endpoints.get(key)
+        if endpoint is None:
+            endpoint = _Endpoint(len(self.bucket_bounds))
+            self._endpoints[key] = endpoint
+        return(endpoint)
+
+    def request(self, method:str, url_suffix:str, status, seconds:float, bytes_sent:int=0, bytes_received:int=0):
+        '''Count one request that was sent (or not sent, status 'circuit_open')'''
+        with self._lock:
+            endpoint = self._endpoint(method, url_suffix)
+            endpoint.statuses[str(status)] += 1
+            endpoint.bytes_sent += bytes_sent
+            endpoint.bytes_received += bytes_received
+            endpoint.seconds_total += seconds
+            endpoint.seconds_max = max(endpoint.seconds_max, seconds)
+            endpoint.buckets[bisect.bisect_left(self.bucket_bounds, seconds)] += 1
+
+    def retry(self, method:str, url_suffix:str):
+        with self._lock:
+            self._endpoint(method, url_suffix).retries += 1
+
+    def cache(self, url_suffix:str, hit:bool):
+        with self._lock:
+            endpoint = self._endpoint('GET', url_suffix)
+            if hit:
+                endpoint.cache_hits += 1
+            else:
+                endpoint.cache_misses += 1
+
+    def session_created(self):
+        with self._lock:
+            self.session_creations += 1
+
+    def get(self):
+        '''{'endpoints': {'GET /ldevs': {'requests', 'statuses', 'bytes_sent', 'bytes_received', 'seconds_total', 'seconds_max',
+        'seconds_avg', 'buckets': {upper bound: cumulative requests}, 'retries', 'cache_hits', 'cache_misses'}}, 'requests', 'session_creations'}'''
+        with self._lock:
+            endpoints = {}
+            total = 0
+            for (method, template), endpoint in sorted(self._endpoints.items()):
+                requests = sum(endpoint.statuses.values())
+                total += requests
+                cumulative = 0
+                buckets = {}
+                for bound, count in zip(self.bucket_bounds + ('+Inf',), endpoint.buckets):
+                    cumulative += count
+                    buckets[bound] = cumulative
+                endpoints[method+' '+template] = {'requests': requests,
+                                                  'statuses': dict(endpoint.statuses),
+                                                  'bytes_sent': endpoint.bytes_sent,
+                                                  'bytes_received': endpoint.bytes_received,
+                                                  'seconds_total': endpoint.seconds_total,
+                                                  'seconds_max': endpoint.seconds_max,
+                                                  'seconds_avg': endpoint.seconds_total / requests if requests else 0.0,
+                                                  'buckets': buckets,
+                                                  'retries': endpoint.retries,
+                                                  'cache_hits': endpoint.cache_hits,
+                                                  'cache_misses': endpoint.cache_misses}
+            return({'endpoints': endpoints, 'requests': total, 'session_creations': self.session_creations})
+
+    def prometheus(self, prefix:str='hitachi_rest', labels:dict=None):
+        '''Metrics in the Prometheus text exposition format. labels are added to every sample (e.g. {'storage': '58068'})'''
+        def label_text(**names):
+            names = dict(labels or {}, **names)
+            return('{'+','.join(str(name)+'="'+str(value).replace('\\', '\\\\').replace('"', '\\"')+'"' for name, value in names.items())+'}')
+
+        snapshot = self.get()
+        lines = []
+
+        def family(name:str, metric_type:str, description:str):
+            lines.append('# HELP '+prefix+'_'+name+' '+description)
+            lines.append('# TYPE '+prefix+'_'+name+' '+metric_type)
+
+        family('requests_total', 'counter', 'Requests per method, endpoint and status.')
+        for key, endpoint in snapshot['endpoints'].items():
+            method, template = key.split(' ', 1)
+            for status, count in sorted(endpoint['statuses'].items()):
+                lines.append(prefix+'_requests_total'+label_text(method=method, endpoint=template, status=status)+' '+str(count))
+        for name, field, description in (('request_bytes_total', 'bytes_sent', 'Bytes of the request bodies.'),
+                                         ('response_bytes_total', 'bytes_received', 'Bytes of the response bodies.'),
+                                         ('retries_total', 'retries', 'Requests that were sent again.'),
+                                         ('cache_hits_total', 'cache_hits', 'Responses taken from the cache.'),
+                                         ('cache_misses_total', 'cache_misses', 'Cacheable requests that were not in the cache.')):
+            family(name, 'counter', description)
+            for key, endpoint in snapshot['endpoints'].items():
+                method, template = key.split(' ', 1)
+                lines.append(prefix+'_'+name+label_text(method=method, endpoint=template)+' '+str(endpoint[field]))
+        family('request_duration_seconds', 'histogram', 'Latency of the requests.')
+        for key, endpoint in snapshot['endpoints'].items():
+            method, template = key.split(' ', 1)
+            for bound, count in endpoint['buckets'].items():
+                lines.append(prefix+'_request_duration_seconds_bucket'+label_text(method=method, endpoint=template, le=bound)+' '+str(count))
+            lines.append(prefix+'_request_duration_seconds_sum'+label_text(method=method, endpoint=template)+' '+repr(float(endpoint['seconds_total'])))
+            lines.append(prefix+'_request_duration_seconds_count'+label_text(method=method, endpoint=template)+' '+str(endpoint['requests']))
+        family('session_creations_total', 'counter', 'Sessions that were created.')
+        lines.append(prefix+'_session_creations_total'+(label_text() if labels else '')+' '+str(snapshot['session_creations']))
+        return('\n'.join(lines)+'\n')
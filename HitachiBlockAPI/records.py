@@ -0,0 +1,140 @@
+"""
+Compact records (__slots__) for the ldevs, luns, wwns and host groups of a storage.
+"""
+
+import sys
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _Missing:
+    '''Marks a field that is not in the response of the storage'''
+
+    def __repr__(self):
+        return('_MISSING')
+
+    #unpickled as the same object
+    def __reduce__(self):
+        return('_MISSING')
+
+
+_MISSING = _Missing()
+
+
+#intern the strings (keys and values) of a json value. only the immutable strings are shared between records,
+#nested lists and dictionaries are new objects of every record (a change of one record does not change others)
+def _compact(value):
+    if isinstance(value, str):
+        return(sys.intern(value))
+    if isinstance(value, dict):
+        return({sys.intern(key): _compact(element) for key, element in value.items()})
+    if isinstance(value, list):
+        return([_compact(element) for element in value])
+    return(value)
+
+
+class Record:
+    '''Base of the records. The fields are attributes (e.g. ldev.ldevId) and
+    the record can be read like the dictionary of the storage (ldev['ldevId'],
+    ldev.get('poolId')). Keys that are not a field are kept in _extra.
+    raw returns the dictionary as it was returned by the storage.
+    '''
+    __slots__ = ('_extra',)
+    _fields = ()
+    #{field: record class} of fields that are lists of dictionaries
+    _nested = {}
+
+    @classmethod
+    def from_dict(cls, data:dict):
+        record = cls.__new__(cls)
+        for field in cls._fields:
+            if field not in data:
+                value = _MISSING
+            elif field in cls._nested and isinstance(data[field], list):
+                value = [cls._nested[field].from_dict(element) if isinstance(element, dict) else _compact(element) for element in data[field]]
+            else:
+                value = _compact(data[field])
+            setattr(record, field, value)
+        extra = tuple((sys.intern(key), _compact(value)) for key, value in data.items() if key not in cls._field_set)
+        record._extra = extra if extra else None
+        return(record)
+
+    @property
+    def raw(self):
+        raw = {}
+        for field in self._fields:
+            value = getattr(self, field)
+            if value is _MISSING:
+                continue
+            if field in self._nested and isinstance(value, list):
+                value = [element.raw if isinstance(element, Record) else element for element in value]
+            raw[field] = value
+        if self._extra is not None:
+            raw.update(self._extra)
+        return(raw)
+
+    def __getitem__(self, key):
+        if key in self._field_set:
+            value = getattr(self, key)
+            if value is not _MISSING:
+                return(value)
+        elif self._extra is not None:
+            for extra_key, value in self._extra:
+                if extra_key == key:
+                    return(value)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return(self[key])
+        except KeyError:
+            return(default)
+
+    def __contains__(self, key):
+        return(not self.get(key, _MISSING) is _MISSING)
+
+    def keys(self):
+        return(self.raw.keys())
+
+    def items(self):
+        return(self.raw.items())
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            return(type(self) == type(other) and self.raw == other.raw)
+        if isinstance(other, dict):
+            return(self.raw == other)
+        return(NotImplemented)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return(type(self).__name__+'('+repr(self.raw)+')')
+
+
+def _record_class(name:str, fields:tuple, doc:str, nested:dict=None):
+    return(type(name, (Record,), {'__slots__': fields, '_fields': fields, '_field_set': frozenset(fields), '_nested': nested or {}, '__doc__': doc}))
+
+
+LdevPort = _record_class('LdevPort', ('portId', 'hostGroupNumber', 'hostGroupName', 'lun'), 'element of Ldev.ports')
+
+Ldev = _record_class('Ldev', ('ldevId', 'clprId', 'emulationType', 'byteFormatCapacity', 'blockCapacity', 'numOfUsedBlock',
+                              'poolId', 'resourceGroupId', 'label', 'status', 'dataReductionStatus', 'dataReductionMode',
+                              'attributes', 'numOfPorts', 'ports', 'mpBladeId', 'ssid', 'isFullAllocationEnabled', 'isAluaEnabled'),
+                     'ldev of ldevs_get(typed=True)', nested={'ports': LdevPort})
+Lun = _record_class('Lun', ('lunId', 'portId', 'hostGroupNumber', 'hostMode', 'lun', 'ldevId', 'isCommandDevice',
+                            'luHostReserve', 'hostModeOptions', 'isAluaEnabled', 'asymmetricAccessState'),
+                    'lun of luns_get(typed=True)')
+Wwn = _record_class('Wwn', ('hostWwnId', 'portId', 'hostGroupNumber', 'hostGroupName', 'hostWwn', 'wwnNickname'),
+                    'wwn of wwns_get(typed=True)')
+HostGroup = _record_class('HostGroup', ('hostGroupId', 'portId', 'hostGroupNumber', 'hostGroupName', 'hostMode',
+                                        'hostModeOptions', 'resourceGroupId', 'isDefined'),
+                          'host group of host_groups_one_port_get(typed=True)')
+
+
+def records_from(record_class, elements:dict):
+    '''{key: dict} -> {key: record}, None and other types are returned unchanged'''
+    if not isinstance(elements, dict):
+        return(elements)
+    return({key: record_class.from_dict(value) if isinstance(value, dict) else value for key, value in elements.items()})
@@ -0,0 +1,619 @@
+"""
+Local https stand-in for the Configuration Manager REST API with synthetic storage inventories (offline tests and load tests).
+
+Start it from the command line (python -m HitachiBlockAPI.simulator --port 23451 --ldevs 16384)
+or in a script:
+
+    with Simulator(storages=[SyntheticStorage(ldevs=16384)], latency=0.01) as simulator:
+        storage = RestAPI(fqdn_ip='127.0.0.1', port=simulator.port, username='user', password='password')
+        storage.ldevs_get()
+"""
+
+import argparse
+import atexit
+import base64
+import bisect
+import collections
+import datetime
+import http.server
+import ipaddress
+import json
+import os
+import random
+import shutil
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+import logging
+from urllib.parse import urlsplit, parse_qs
+
+#cryptography is optional, without it the certificate of the simulator is created with the openssl command
+try:
+    from cryptography import x509
+    from cryptography.x509.oid import NameOID
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+except ImportError:
+    x509 = None
+
+from .metrics import endpoint_template
+
+logger = logging.getLogger(__name__)
+
+#days the certificate of the simulator is valid
+CERTIFICATE_DAYS = 30
+
+#(certificate, key) files that certificate_get created for this process
+_certificate = None
+_certificate_lock = threading.Lock()
+
+URL_BASE = '/ConfigurationManager/v1'
+
+#jobs that are kept (the newest first)
+JOBS_MAX = 1000
+
+
+#write a new self signed certificate and key of localhost/127.0.0.1 into directory, return (certificate file, key file)
+def certificate_create(directory:str):
+    certificate_file = os.path.join(directory, 'simulator.crt')
+    key_file = os.path.join(directory, 'simulator.key')
+    if x509 is not None:
+        key = ec.generate_private_key(ec.SECP256R1(), default_backend())
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'localhost')])
+        now = datetime.datetime.now(datetime.timezone.utc)
+        certificate = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+                       .serial_number(x509.random_serial_number())
+                       .not_valid_before(now - datetime.timedelta(days=1)).not_valid_after(now + datetime.timedelta(days=CERTIFICATE_DAYS))
+                       .add_extension(x509.SubjectAlternativeName([x509.DNSName('localhost'), x509.IPAddress(ipaddress.ip_address('127.0.0.1'))]), critical=False)
+                       .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+                       .sign(key, hashes.SHA256(), default_backend()))
+        with open(key_file, 'wb') as fh:
+            fh.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()))
+        with open(certificate_file, 'wb') as fh:
+            fh.write(certificate.public_bytes(serialization.Encoding.PEM))
+    elif shutil.which('openssl') is not None:
+        subprocess.run(['openssl', 'req', '-x509', '-newkey', 'ec', '-pkeyopt', 'ec_paramgen_curve:prime256v1', '-nodes',
+                        '-keyout', key_file, '-out', certificate_file, '-days', str(CERTIFICATE_DAYS), '-subj', '/CN=localhost',
+                        '-addext', 'subjectAltName=DNS:localhost,IP:127.0.0.1'], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    else:
+        raise RuntimeError('the certificate of the simulator needs the cryptography package or the openssl command')
+    return(certificate_file, key_file)
+
+
+def certificate_get():
+    '''(certificate file, key file) of the simulators of this process. The self signed certificate of localhost/127.0.0.1 is
+    created in a temporary directory that is removed when the process ends. Use the certificate file as ca_bundle of RestAPI.'''
+    global _certificate
+    with _certificate_lock:
+        if _certificate is None:
+            directory = tempfile.mkdtemp(prefix='HitachiBlockAPI-simulator-')
+            atexit.register(shutil.rmtree, directory, True)
+            _certificate = certificate_create(directory)
+            logger.debug('simulator certificate created: %s', _certificate[0])
+        return(_certificate)
+
+
+class SyntheticStorage:
+    '''Generated inventory of one storage array.
+
+    ports * hostgroups_per_port host groups with luns_per_hostgroup luns and
+    wwns_per_hostgroup wwns each. The luns are mapped to the ldevs round
+    robin, the ldevs are spread over the pools. The same seed generates the
+    same inventory.
+    '''
+
+    def __init__(self, serial_number:int=58068, storage_device_id:str=None, model:str='VSP G1000', ports:int=8, hostgroups_per_port:int=16,
+                 luns_per_hostgroup:int=16, wwns_per_hostgroup:int=2, ldevs:int=16384, pools:int=4, snapshot_groups:int=0,
+                 remote_replications:int=0, seed:int=0):
+        self.serial_number = serial_number
+        self.storage_device_id = storage_device_id if storage_device_id is not None else '800000'+'{0:06d}'.format(serial_number)
+        self.model = model
+        generator = random.Random(seed)
+
+        self.ldevs = {}
+        for ldev_id in range(ldevs):
+            block_capacity = 2097152 * generator.choice((1, 2, 4, 8, 16, 50, 100))
+            self.ldevs[ldev_id] = {'ldevId': ldev_id, 'clprId': 0, 'emulationType': 'OPEN-V-CVS',
+                                   'byteFormatCapacity': str(block_capacity // 2097152)+'.00 G', 'blockCapacity': block_capacity,
+                                   'numOfUsedBlock': int(block_capacity * generator.random()), 'poolId': ldev_id % pools if pools else None,
+                                   'resourceGroupId': 0, 'label': 'VOL_'+str(ldev_id), 'status': 'NML',
+                                   'dataReductionStatus': 'ENABLED' if ldev_id % 3 == 0 else 'DISABLED', 'dataReductionMode': 'compression_deduplication' if ldev_id % 3 == 0 else 'disabled',
+                                   'attributes': ['CVS', 'HDP'], 'numOfPorts': 0, 'ports': [],
+                                   'mpBladeId': ldev_id % 4, 'ssid': '{0:04X}'.format(0x0004 + ldev_id // 256), 'isFullAllocationEnabled': False, 'isAluaEnabled': False}
+        self._ldev_ids = list(self.ldevs)
+
+        self.ports = {}
+        self.hostgroups = {}
+        self.luns = {}
+        self.wwns = {}
+        #{portId: [hostGroupId]} and {(portId, hostGroupNumber): [lunId]}, [hostWwnId]
+        self._port_hostgroups = collections.defaultdict(list)
+        self._hostgroup_luns = collections.defaultdict(list)
+        self._hostgroup_wwns = collections.defaultdict(list)
+        lun_number = 0
+        for port in range(ports):
+            port_id = 'CL'+str(1 + port // 8 % 8)+'-'+'ABCDEFGH'[port % 8]
+            if port >= 64:
+                port_id += str(port // 64)
+            self.ports[port_id] = {'portId': port_id, 'portType': 'FIBRE', 'portAttributes': ['TAR'], 'portSpeed': 'AUT', 'loopId': 'EF',
+                                   'fabricMode': True, 'portConnection': 'PtoP', 'lunSecuritySetting': True,
+                                   'wwn': '50060e80'+'{0:04x}'.format(serial_number % 65536)+'{0:04x}'.format(port)}
+            for hostgroup_number in range(hostgroups_per_port):
+                hostgroup_id = port_id+','+str(hostgroup_number)
+                hostgroup_name = 'HG_'+port_id.replace('-', '')+'_'+str(hostgroup_number)
+                self.hostgroups[hostgroup_id] = {'hostGroupId': hostgroup_id, 'portId': port_id, 'hostGroupNumber': hostgroup_number,
+                                                 'hostGroupName': hostgroup_name, 'hostMode': 'LINUX/IRIX', 'hostModeOptions': [2, 22, 25, 68],
+                                                 'resourceGroupId': 0, 'isDefined': True}
+                self._port_hostgroups[port_id].append(hostgroup_id)
+                for lun in range(luns_per_hostgroup if ldevs else 0):
+                    ldev_id = self._ldev_ids[lun_number % ldevs]
+                    lun_number += 1
+                    lun_id = hostgroup_id+','+str(lun)
+                    self.luns[lun_id] = {'lunId': lun_id, 'portId': port_id, 'hostGroupNumber': hostgroup_number, 'hostMode': 'LINUX/IRIX',
+                                         'lun': lun, 'ldevId': ldev_id, 'isCommandDevice': False, 'luHostReserve': {'openSystem': False, 'persistent': False,
+                                         'pgrKey': False, 'mainframe': False, 'acaReserve': False}, 'hostModeOptions': [2, 22, 25, 68],
+                                         'isAluaEnabled': False, 'asymmetricAccessState': 'Active/Optimized'}
+                    self._hostgroup_luns[(port_id, hostgroup_number)].append(lun_id)
+                    ldev = self.ldevs[ldev_id]
+                    ldev['ports'].append({'portId': port_id, 'hostGroupNumber': hostgroup_number, 'hostGroupName': hostgroup_name, 'lun': lun})
+                    ldev['numOfPorts'] = len(ldev['ports'])
+                for wwn in range(wwns_per_hostgroup):
+                    host_wwn = '10000090fa'+'{0:02x}{1:02x}{2:02x}'.format(port % 256, hostgroup_number % 256, wwn % 256)
+                    wwn_id = hostgroup_id+','+host_wwn
+                    self.wwns[wwn_id] = {'hostWwnId': wwn_id, 'portId': port_id, 'hostGroupNumber': hostgroup_number, 'hostGroupName': hostgroup_name,
+                                         'hostWwn': host_wwn, 'wwnNickname': 'host'+str(hostgroup_number)+'_hba'+str(wwn)}
+                    self._hostgroup_wwns[(port_id, hostgroup_number)].append(wwn_id)
+        #the ldevs without path do not have the 'ports' key
+        for ldev in self.ldevs.values():
+            if len(ldev['ports']) == 0:
+                del ldev['ports']
+
+        self.pools = {}
+        for pool_id in range(pools):
+            self.pools[pool_id] = {'poolId': pool_id, 'poolName': 'POOL_'+str(pool_id), 'poolType': 'HDP', 'poolStatus': 'POLN',
+                                   'warningThreshold': 70, 'depletionThreshold': 80}
+        self.pools_update()
+
+        #{snapshotGroupName: {pvolLdevId: snapshot}}
+        self.snapshot_groups = collections.OrderedDict()
+        for group in range(snapshot_groups):
+            for pvol in range(min(4, ldevs)):
+                self.snapshot_add('SG_'+str(group), pvol_ldev_id=self._ldev_ids[(group * 4 + pvol) % ldevs], pool_id=0)
+
+        self.remote_replications = {}
+        for replication in range(min(remote_replications, ldevs)):
+            replication_type = ('GAD', 'UR', 'TC')[replication % 3]
+            ldev_id = self._ldev_ids[replication]
+            replication_id = str(self.serial_number)+','+str(ldev_id)+','+str(self.serial_number+1)+','+str(ldev_id)+','+replication_type
+            self.remote_replications[replication_id] = {'remoteReplicationId': replication_id, 'copyGroupName': 'CG_'+replication_type,
+                                                        'copyPairName': 'P_'+str(ldev_id), 'replicationType': replication_type,
+                                                        'remoteSerialNumber': str(self.serial_number+1), 'pvolLdevId': ldev_id, 'svolLdevId': ldev_id,
+                                                        'pvolStatus': 'PAIR', 'svolStatus': 'PAIR', 'consistencyGroupId': replication % 3}
+
+    #capacities of the pools out of the ldevs (MB)
+    def pools_update(self):
+        totals = collections.Counter()
+        used = collections.Counter()
+        numbers = collections.Counter()
+        for ldev in self.ldevs.values():
+            totals[ldev['poolId']] += ldev['blockCapacity']
+            used[ldev['poolId']] += ldev['numOfUsedBlock']
+            numbers[ldev['poolId']] += 1
+        for pool_id, pool in self.pools.items():
+            total = totals[pool_id] // 2048
+            pool['totalPoolCapacity'] = total
+            pool['availableVolumeCapacity'] = total - used[pool_id] // 2048
+            pool['usedCapacityRate'] = int(100 * (used[pool_id] // 2048) / total) if total else 0
+            pool['numOfLdevs'] = numbers[pool_id]
+
+    #the wwns of the host groups of the port are logged in
+    def port_logins(self, port_id:str):
+        logins = []
+        for hostgroup_id in self._port_hostgroups.get(port_id, []):
+            hostgroup = self.hostgroups[hostgroup_id]
+            for wwn_id in self._hostgroup_wwns.get((port_id, hostgroup['hostGroupNumber']), []):
+                logins.append({'hostGroupId': hostgroup_id, 'isLoggedIn': True, 'loginWwn': self.wwns[wwn_id]['hostWwn']})
+        return(logins)
+
+    def storage(self):
+        '''element of the storages list'''
+        return({'storageDeviceId': self.storage_device_id, 'model': self.model, 'serialNumber': self.serial_number,
+                'svpIp': '127.0.0.1', 'isSecure': True})
+
+    #ldevs with ldevId >= head_ldev_id (max. count)
+    def ldevs_page(self, head_ldev_id:int, count:int):
+        position = bisect.bisect_left(self._ldev_ids, head_ldev_id)
+        return([self.ldevs[ldev_id] for ldev_id in self._ldev_ids[position:position+count]])
+
+    #add a snapshot of the pvol to the group. None if the pvol does not exist
+    def snapshot_add(self, snapshot_group_name:str, pvol_ldev_id:int, pool_id:int, is_clone:bool=False, is_consistency_group:bool=True, auto_split:bool=True):
+        if pvol_ldev_id not in self.ldevs:
+            return(None)
+        group = self.snapshot_groups.setdefault(snapshot_group_name, collections.OrderedDict())
+        mu_number = sum(1 for snapshots in self.snapshot_groups.values() if pvol_ldev_id in snapshots)
+        snapshot_id = str(pvol_ldev_id)+','+str(mu_number)
+        group[pvol_ldev_id] = {'snapshotGroupName': snapshot_group_name, 'primaryOrSecondary': 'P-VOL', 'status': 'PSUS' if auto_split else 'PAIR',
+                               'pvolLdevId': pvol_ldev_id, 'muNumber': mu_number, 'snapshotPoolId': pool_id, 'isConsistencyGroup': is_consistency_group,
+                               'isClone': is_clone, 'snapshotReplicationId': snapshot_id, 'snapshotId': snapshot_id}
+        return(group[pvol_ldev_id])
+
+
+class Simulator:
+    '''https server that answers the requests of RestAPI out of SyntheticStorage inventories.
+
+    It implements storages, sessions, jobs, ports, pools, resource-groups,
+    ldevs, host-groups, luns, host-wwns, remote-replications, snapshot-groups,
+    snapshots and snapshot-replications (GET and the snapshot POST/PUT/DELETE
+    requests as jobs that are completed after job_time seconds).
+    Every request waits latency seconds and error_rate of the requests are
+    answered with error_status (e.g. 503 of a busy SVP). Without username
+    and password every user is accepted. Without certificate and key the
+    self signed certificate of certificate_get() is used (.certificate can
+    be used as ca_bundle of RestAPI).
+    '''
+
+    def __init__(self, storages:list=None, host:str='127.0.0.1', port:int=0, username:str=None, password:str=None, latency:float=0.0,
+                 error_rate:float=0.0, error_status:int=503, job_time:float=0.0, certificate:str=None, key:str=None, seed:int=None):
+        self.storages = collections.OrderedDict()
+        for storage in (storages if storages is not None else [SyntheticStorage()]):
+            self.storages[storage.storage_device_id] = storage
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.job_time = job_time
+        if certificate is None:
+            certificate, key = certificate_get()
+        self.certificate = certificate
+        self.key = key
+        self._random = random.Random(seed)
+        #{token: {'sessionId', 'storageDeviceId', 'aliveTime', 'lastUsed'}}
+        self.sessions = {}
+        self._session_number = 0
+        self.jobs = collections.OrderedDict()
+        self._job_number = 0
+        self._lock = threading.RLock()
+        self._server = None
+        self._thread = None
+        #statistics
+        self.requests = 0
+        self.requests_by_endpoint = collections.Counter()
+        self.connections = 0
+        self.errors_injected = 0
+
+    def __enter__(self):
+        return(self.start())
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def url(self):
+        return('https://'+str(self.host)+':'+str(self.port))
+
+    def start(self):
+        '''Start the server in a background thread (port 0: a free port is chosen, see .port)'''
+        simulator = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            #headers and body are written separately, without this every response waits for the delayed ack
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with simulator._lock:
+                    simulator.connections += 1
+
+            def log_message(self, format, *args):
+                logger.debug('%s - %s', self.address_string(), format % args)
+
+            def handle_request(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                status, response = simulator.handle(self.command, self.path, self.headers.get('Authorization', ''), body)
+                data = b'' if response is None else json.dumps(response).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = handle_request
+
+        self._server = http.server.ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(self.certificate, self.key)
+        self._server.socket = context.wrap_socket(self._server.socket, server_side=True)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='HitachiBlockAPI-simulator', daemon=True)
+        self._thread.start()
+        logger.info('simulator listening on %s with %d storage(s)', self.url, len(self.storages))
+        return(self)
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        return(None)
+
+    def handle(self, method:str, path:str, authorization:str, body:bytes):
+        '''Return (status, json response) of a request'''
+        with self._lock:
+            self.requests += 1
+            self.requests_by_endpoint[method+' '+endpoint_template(path)] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.error_rate and self._random.random() < self.error_rate:
+            with self._lock:
+                self.errors_injected += 1
+            return(self.error_status, {'errorSource': path, 'message': 'The server is busy (simulated error).', 'messageId': 'KART00003-E'})
+        try:
+            with self._lock:
+                return(self._route(method, path, authorization, body))
+        except Exception as e:
+            logger.exception('simulator error: %s %s', method, path)
+            return(500, {'errorSource': path, 'message': str(e)})
+
+    #check the user and password or the session token. None if the request is authorized
+    def _unauthorized(self, authorization:str, storage_device_id:str):
+        if authorization.startswith('Session '):
+            session = self.sessions.get(authorization[8:])
+            now = time.monotonic()
+            if session is not None and now - session['lastUsed'] > session['aliveTime']:
+                #the session timed out
+                del self.sessions[authorization[8:]]
+                session = None
+            if session is None or not session['storageDeviceId'] == storage_device_id:
+                return((401, {'message': 'The session is not valid.', 'messageId': 'KART40047-E'}))
+            session['lastUsed'] = now
+            return(None)
+        if authorization.startswith('Basic '):
+            if self.username is None and self.password is None:
+                return(None)
+            try:
+                username, password = base64.b64decode(authorization[6:]).decode('utf-8').split(':', 1)
+            except ValueError:
+                username, password = None, None
+            if username == self.username and password == self.password:
+                return(None)
+        return((401, {'message': 'Authentication failed.', 'messageId': 'KART40046-E'}))
+
+    def _job_new(self, storage:SyntheticStorage, method:str, path:str, body:bytes, affected_resources:list=None, error:dict=None):
+        self._job_number += 1
+        job_id = self._job_number
+        job = {'jobId': job_id, 'self': URL_BASE+'/objects/storages/'+storage.storage_device_id+'/jobs/'+str(job_id),
+               'userId': self.username or 'user', 'status': 'Initializing', 'state': 'Queued', 'createdTime': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+               'updatedTime': None, 'completedTime': None,
+               'request': {'requestUrl': path, 'requestMethod': method, 'requestBody': body.decode('utf-8', 'replace')},
+               'affectedResources': affected_resources or []}
+        if error is not None:
+            job['error'] = error
+        self.jobs[job_id] = (time.monotonic(), job)
+        while len(self.jobs) > JOBS_MAX:
+            self.jobs.popitem(last=False)
+        return(self._job_update(job_id))
+
+    #the job is completed job_time seconds after it was created
+    def _job_update(self, job_id:int):
+        created, job = self.jobs[job_id]
+        if not job['status'] == 'Completed':
+            if time.monotonic() - created >= self.job_time:
+                job['status'] = 'Completed'
+                job['state'] = 'Failed' if 'error' in job else 'Succeeded'
+                job['completedTime'] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+            else:
+                job['status'] = 'Running'
+                job['state'] = 'Started'
+            job['updatedTime'] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        return(dict(job))
+
+    def _route(self, method:str, path:str, authorization:str, body:bytes):
+        url = urlsplit(path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        parts = [part for part in url.path.split('/') if not part == '']
+        if parts[:2] != ['ConfigurationManager', 'v1']:
+            return(404, {'message': 'unknown url'})
+        parts = parts[2:]
+
+        #resource group lock / unlock: /ConfigurationManager/v1/{storageDeviceId}/services/resource-group-service/actions/{lock|unlock}/invoke
+        if len(parts) >= 2 and parts[1] == 'services':
+            storage = self.storages.get(parts[0])
+            if storage is None:
+                return(404, {'message': 'storage not found'})
+            unauthorized = self._unauthorized(authorization, storage.storage_device_id)
+            if unauthorized is not None:
+                return(unauthorized)
+            return(202, self._job_new(storage, method, path, body))
+
+        if not parts[:1] == ['objects'] or len(parts) < 2 or not parts[1] == 'storages':
+            return(404, {'message': 'unknown url'})
+        parts = parts[2:]
+
+        #the list of the storages needs no authentication
+        if len(parts) == 0:
+            return(200, {'data': [storage.storage() for storage in self.storages.values()]})
+
+        storage = self.storages.get(parts[0])
+        if storage is None:
+            return(404, {'message': 'storage '+parts[0]+' not found', 'messageId': 'KART30000-E'})
+        resource = parts[1] if len(parts) > 1 else None
+        rest = parts[2:]
+
+        #sessions are created with user and password
+        if resource == 'sessions' and method == 'POST':
+            unauthorized = self._unauthorized(authorization if authorization.startswith('Basic ') else '', storage.storage_device_id)
+            if unauthorized is not None:
+                return(unauthorized)
+            try:
+                alive_time = json.loads(body.decode('utf-8') or '{}').get('aliveTime', 300)
+            except ValueError:
+                alive_time = 300
+            self._session_number += 1
+            token = str(uuid.uuid4())
+            self.sessions[token] = {'sessionId': self._session_number, 'storageDeviceId': storage.storage_device_id, 'aliveTime': alive_time, 'lastUsed': time.monotonic()}
+            return(200, {'token': token, 'sessionId': self._session_number})
+
+        unauthorized = self._unauthorized(authorization, storage.storage_device_id)
+        if unauthorized is not None:
+            return(unauthorized)
+
+        if resource is None:
+            return(200, storage.storage())
+        if resource == 'storage-summaries':
+            return(200, {'numOfLdevs': len(storage.ldevs), 'numOfPools': len(storage.pools), 'numOfPorts': len(storage.ports),
+                         'numOfHostGroups': len(storage.hostgroups), 'usedCapacity': sum(pool['totalPoolCapacity'] - pool['availableVolumeCapacity'] for pool in storage.pools.values()),
+                         'totalCapacity': sum(pool['totalPoolCapacity'] for pool in storage.pools.values())})
+        if resource == 'sessions':
+            sessions = [{'sessionId': session['sessionId'], 'userId': self.username or 'user', 'ipAddress': '127.0.0.1'}
+                        for session in self.sessions.values() if session['storageDeviceId'] == storage.storage_device_id]
+            if method == 'DELETE' and rest:
+                for token, session in list(self.sessions.items()):
+                    if str(session['sessionId']) == rest[0]:
+                        del self.sessions[token]
+                        return(200, None)
+                return(404, {'message': 'session '+rest[0]+' not found'})
+            return(200, {'data': sessions})
+        if resource == 'jobs':
+            if rest:
+                if not rest[0].isdigit() or int(rest[0]) not in self.jobs:
+                    return(404, {'message': 'job '+rest[0]+' not found', 'messageId': 'KART30000-E'})
+                return(200, self._job_update(int(rest[0])))
+            return(200, {'data': [self._job_update(job_id) for job_id in reversed(self.jobs)]})
+        if resource == 'ports':
+            if rest:
+                port = storage.ports.get(rest[0])
+                return((200, port) if port is not None else (404, {'message': 'port '+rest[0]+' not found'}))
+            ports = list(storage.ports.values())
+            if query.get('detailInfoType') == 'logins':
+                ports = [dict(port, logins=storage.port_logins(port['portId'])) for port in ports]
+            return(200, {'data': ports})
+        if resource == 'pools':
+            if rest:
+                pool = storage.pools.get(int(rest[0])) if rest[0].isdigit() else None
+                return((200, pool) if pool is not None else (404, {'message': 'pool '+rest[0]+' not found'}))
+            return(200, {'data': list(storage.pools.values())})
+        if resource == 'resource-groups':
+            return(200, {'data': [{'resourceGroupId': 0, 'resourceGroupName': 'meta_resource', 'lockStatus': 'Unlocked', 'virtualStorageId': 0,
+                                   'ldevIds': list(storage.ldevs), 'parityGroupIds': [], 'externalParityGroupIds': [],
+                                   'portIds': list(storage.ports), 'hostGroupIds': list(storage.hostgroups)}]})
+        if resource == 'ldevs':
+            if rest:
+                ldev = storage.ldevs.get(int(rest[0])) if rest[0].isdigit() else None
+                return((200, ldev) if ldev is not None else (404, {'message': 'ldev '+rest[0]+' not found'}))
+            return(200, {'data': storage.ldevs_page(int(query.get('headLdevId', 0)), int(query.get('count', 100)))})
+        if resource == 'host-groups':
+            if 'portId' in query:
+                return(200, {'data': [storage.hostgroups[hostgroup_id] for hostgroup_id in storage._port_hostgroups.get(query['portId'], [])]})
+            return(200, {'data': list(storage.hostgroups.values())})
+        if resource in ('luns', 'host-wwns'):
+            elements, index = (storage.luns, storage._hostgroup_luns) if resource == 'luns' else (storage.wwns, storage._hostgroup_wwns)
+            if 'portId' not in query or 'hostGroupNumber' not in query:
+                return(400, {'message': 'portId and hostGroupNumber must be specified', 'messageId': 'KART40039-E'})
+            return(200, {'data': [elements[element_id] for element_id in index.get((query['portId'], int(query['hostGroupNumber'])), [])]})
+        if resource == 'remote-replications':
+            replications = list(storage.remote_replications.values())
+            if 'replicationType' in query:
+                replications = [replication for replication in replications if replication['replicationType'] == query['replicationType']]
+            return(200, {'data': replications})
+        if resource in ('snapshot-groups', 'snapshots', 'snapshot-replications'):
+            return(self._snapshots_route(storage, method, path, resource, rest, query, body))
+        return(404, {'message': 'unknown resource '+str(resource)})
+
+    def _snapshots_route(self, storage:SyntheticStorage, method:str, path:str, resource:str, rest:list, query:dict, body:bytes):
+        if resource == 'snapshot-groups':
+            if not rest:
+                return(200, {'data': [{'snapshotGroupName': name, 'snapshotGroupId': name} for name in storage.snapshot_groups]})
+            group = storage.snapshot_groups.get(rest[0])
+            if group is None:
+                return(404, {'message': 'snapshot group '+rest[0]+' not found', 'messageId': 'KART30000-E'})
+            if method == 'GET':
+                return(200, {'snapshotGroupName': rest[0], 'snapshotGroupId': rest[0], 'snapshots': list(group.values())})
+            if method == 'DELETE':
+                del storage.snapshot_groups[rest[0]]
+                return(202, self._job_new(storage, method, path, body, affected_resources=[URL_BASE+'/objects/storages/'+storage.storage_device_id+'/snapshot-groups/'+rest[0]]))
+            if method in ('PUT', 'POST') and rest[1:] == ['actions', 'resync', 'invoke']:
+                try:
+                    auto_split = json.loads(body.decode('utf-8') or '{}').get('parameters', {}).get('autoSplit', True)
+                except ValueError:
+                    auto_split = True
+                for snapshot in group.values():
+                    snapshot['status'] = 'PSUS' if auto_split else 'PAIR'
+                return(202, self._job_new(storage, method, path, body, affected_resources=[URL_BASE+'/objects/storages/'+storage.storage_device_id+'/snapshot-groups/'+rest[0]]))
+            return(400, {'message': 'unsupported request'})
+        if method == 'POST' and resource == 'snapshots' and not rest:
+            try:
+                parameters = json.loads(body.decode('utf-8') or '{}')
+                parameters = parameters.get('params', parameters)
+            except ValueError:
+                return(400, {'message': 'body is not json'})
+            snapshot = None
+            if str(parameters.get('snapshotPoolId')) in [str(pool_id) for pool_id in storage.pools]:
+                snapshot = storage.snapshot_add(str(parameters.get('snapshotGroupName')), pvol_ldev_id=parameters.get('pvolLdevId'), pool_id=parameters.get('snapshotPoolId'),
+                                                is_clone=parameters.get('isClone', False), is_consistency_group=parameters.get('isConsistencyGroup', True),
+                                                auto_split=parameters.get('autoSplit', True))
+            if snapshot is None:
+                return(202, self._job_new(storage, method, path, body, error={'errorSource': path, 'message': 'The pvol or the pool does not exist.', 'messageId': 'KART30000-E'}))
+            return(202, self._job_new(storage, method, path, body, affected_resources=[URL_BASE+'/objects/storages/'+storage.storage_device_id+'/snapshots/'+snapshot['snapshotId']]))
+        if method == 'GET':
+            snapshots = [snapshot for group in storage.snapshot_groups.values() for snapshot in group.values()]
+            if 'pvolLdevId' in query:
+                snapshots = [snapshot for snapshot in snapshots if str(snapshot['pvolLdevId']) == query['pvolLdevId']]
+            return(200, {'data': snapshots})
+        return(400, {'message': 'unsupported request'})
+
+
+def main(arguments:list=None):
+    parser = argparse.ArgumentParser(description='Local https stand-in for the Configuration Manager REST API with synthetic storages.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=23451)
+    parser.add_argument('--username', default=None, help='accept only this user (default: every user)')
+    parser.add_argument('--password', default=None)
+    parser.add_argument('--storages', type=int, default=1, help='number of storages (serial numbers 58068, 58069, ...)')
+    parser.add_argument('--ports', type=int, default=8)
+    parser.add_argument('--hostgroups', type=int, default=16, help='host groups per port')
+    parser.add_argument('--luns', type=int, default=16, help='luns per host group')
+    parser.add_argument('--wwns', type=int, default=2, help='wwns per host group')
+    parser.add_argument('--ldevs', type=int, default=16384)
+    parser.add_argument('--pools', type=int, default=4)
+    parser.add_argument('--snapshot-groups', type=int, default=0)
+    parser.add_argument('--remote-replications', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds every request waits')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='part of the requests that get --error-status')
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--job-time', type=float, default=0.0, help='seconds until a job is completed')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--certificate', default=None, help='PEM certificate file (default: a new self signed one)')
+    parser.add_argument('--key', default=None, help='PEM key file of --certificate')
+    arguments = parser.parse_args(arguments)
+
+    storages = [SyntheticStorage(serial_number=58068+number, ports=arguments.ports, hostgroups_per_port=arguments.hostgroups,
+                                 luns_per_hostgroup=arguments.luns, wwns_per_hostgroup=arguments.wwns, ldevs=arguments.ldevs, pools=arguments.pools,
+                                 snapshot_groups=arguments.snapshot_groups, remote_replications=arguments.remote_replications, seed=arguments.seed+number)
+                for number in range(arguments.storages)]
+    simulator = Simulator(storages=storages, host=arguments.host, port=arguments.port, username=arguments.username, password=arguments.password,
+                          latency=arguments.latency, error_rate=arguments.error_rate, error_status=arguments.error_status, job_time=arguments.job_time,
+                          certificate=arguments.certificate, key=arguments.key, seed=arguments.seed)
+    simulator.start()
+    print('simulator listening on '+simulator.url+' ('+', '.join(str(storage.serial_number)+': '+storage.storage_device_id for storage in storages)+'). Ctrl+C to stop.')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.stop()
+    return(0)
+
+
+if __name__ == '__main__':
+    main()
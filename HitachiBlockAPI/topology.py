@@ -0,0 +1,222 @@
+"""
+Index of the paths between wwns, host groups, luns, ldevs and pools of a storage.
+"""
+
+import collections
+import logging
+
+from .inventory import _hostgroup_id
+
+logger = logging.getLogger(__name__)
+
+_EMPTY = {}.keys()
+
+
+#'50:06:0E:80:07:E2:D4:00' -> '50060e8007e2d400'
+def _wwn_normalize(wwn):
+    return(str(wwn).replace(':', '').lower())
+
+
+#remove one reference of value out of mapping[key]
+def _counter_decrement(mapping:dict, key, value):
+    counter = mapping.get(key)
+    if counter is None:
+        return
+    counter[value] -= 1
+    if counter[value] <= 0:
+        del counter[value]
+    if len(counter) == 0:
+        del mapping[key]
+
+
+#remove value out of the set (dict) mapping[key]
+def _set_discard(mapping:dict, key, value):
+    elements = mapping.get(key)
+    if elements is None:
+        return
+    elements.pop(value, None)
+    if len(elements) == 0:
+        del mapping[key]
+
+
+class TopologyIndex:
+    '''Lookups in both directions between ldevs, luns, host groups, wwns and pools.
+
+    Build it out of the results of ldevs_get, luns_all_ports_get,
+    wwns_all_ports_get and host_groups_all_ports_get (or of an Inventory) and
+    keep it up to date with the *_add/*_remove functions or apply(events).
+    All *_get lookups are dictionary lookups and return read only key views
+    (empty if nothing is found).
+    '''
+
+    def __init__(self, ldevs:dict=None, luns:dict=None, wwns:dict=None, hostgroups:dict=None):
+        self.ldevs = {}
+        self.luns = {}
+        self.wwns = {}
+        self.hostgroups = {}
+        #dicts with None values are used as ordered sets ({hostWwn: hostWwnId} per host group)
+        self._ldev_luns = collections.defaultdict(dict)
+        self._hostgroup_luns = collections.defaultdict(dict)
+        self._hostgroup_wwns = collections.defaultdict(dict)
+        self._wwn_hostgroups = collections.defaultdict(dict)
+        self._pool_ldevs = collections.defaultdict(dict)
+        #number of paths (host group with lun and wwn) between an ldev and a wwn
+        self._ldev_wwns = collections.defaultdict(collections.Counter)
+        self._wwn_ldevs = collections.defaultdict(collections.Counter)
+
+        for hostgroup in (hostgroups or {}).values():
+            self.hostgroup_add(hostgroup)
+        for ldev in (ldevs or {}).values():
+            self.ldev_add(ldev)
+        for lun in (luns or {}).values():
+            self.lun_add(lun)
+        for wwn in (wwns or {}).values():
+            self.wwn_add(wwn)
+
+    @classmethod
+    def from_inventory(cls, inventory):
+        '''Index of the last known state of an Inventory'''
+        return(cls(ldevs=inventory.ldevs, luns=inventory.luns, wwns=inventory.wwns, hostgroups=inventory.hostgroups))
+
+    #add or replace an ldev
+    def ldev_add(self, ldev:dict):
+        ldev_id = ldev['ldevId']
+        if ldev_id in self.ldevs:
+            self.ldev_remove(ldev_id, keep_paths=True)
+        self.ldevs[ldev_id] = ldev
+        if ldev.get('poolId') is not None:
+            self._pool_ldevs[ldev['poolId']][ldev_id] = None
+
+    #remove an ldev, its luns stay until they are removed (keep_paths is used to replace an ldev)
+    def ldev_remove(self, ldev_id, keep_paths:bool=True):
+        ldev = self.ldevs.pop(ldev_id, None)
+        if ldev is not None and ldev.get('poolId') is not None:
+            _set_discard(self._pool_ldevs, ldev['poolId'], ldev_id)
+        if keep_paths == False:
+            for lun_id in list(self._ldev_luns.get(ldev_id, _EMPTY)):
+                self.lun_remove(lun_id)
+
+    #add or replace a host group
+    def hostgroup_add(self, hostgroup:dict):
+        self.hostgroups[str(hostgroup['hostGroupId'])] = hostgroup
+
+    #remove a host group with its luns and wwns
+    def hostgroup_remove(self, hostgroup_id:str):
+        self.hostgroups.pop(hostgroup_id, None)
+        for lun_id in list(self._hostgroup_luns.get(hostgroup_id, _EMPTY)):
+            self.lun_remove(lun_id)
+        for wwn_id in list(self._hostgroup_wwns.get(hostgroup_id, {}).values()):
+            self.wwn_remove(wwn_id)
+
+    #add or replace a lun (path from a host group to an ldev)
+    def lun_add(self, lun:dict):
+        lun_id = str(lun['lunId'])
+        if lun_id in self.luns:
+            self.lun_remove(lun_id)
+        self.luns[lun_id] = lun
+        hostgroup_id = _hostgroup_id(lun)
+        ldev_id = lun['ldevId']
+        self._ldev_luns[ldev_id][lun_id] = None
+        self._hostgroup_luns[hostgroup_id][lun_id] = None
+        for wwn in self._hostgroup_wwns.get(hostgroup_id, _EMPTY):
+            self._ldev_wwns[ldev_id][wwn] += 1
+            self._wwn_ldevs[wwn][ldev_id] += 1
+
+    def lun_remove(self, lun_id:str):
+        lun = self.luns.pop(lun_id, None)
+        if lun is None:
+            return
+        hostgroup_id = _hostgroup_id(lun)
+        ldev_id = lun['ldevId']
+        _set_discard(self._ldev_luns, ldev_id, lun_id)
+        _set_discard(self._hostgroup_luns, hostgroup_id, lun_id)
+        for wwn in self._hostgroup_wwns.get(hostgroup_id, _EMPTY):
+            _counter_decrement(self._ldev_wwns, ldev_id, wwn)
+            _counter_decrement(self._wwn_ldevs, wwn, ldev_id)
+
+    #add or replace a wwn of a host group
+    def wwn_add(self, wwn:dict):
+        wwn_id = str(wwn['hostWwnId'])
+        if wwn_id in self.wwns:
+            self.wwn_remove(wwn_id)
+        self.wwns[wwn_id] = wwn
+        hostgroup_id = _hostgroup_id(wwn)
+        host_wwn = _wwn_normalize(wwn['hostWwn'])
+        self._hostgroup_wwns[hostgroup_id][host_wwn] = wwn_id
+        self._wwn_hostgroups[host_wwn][hostgroup_id] = None
+        for lun_id in self._hostgroup_luns.get(hostgroup_id, _EMPTY):
+            ldev_id = self.luns[lun_id]['ldevId']
+            self._ldev_wwns[ldev_id][host_wwn] += 1
+            self._wwn_ldevs[host_wwn][ldev_id] += 1
+
+    def wwn_remove(self, wwn_id:str):
+        wwn = self.wwns.pop(wwn_id, None)
+        if wwn is None:
+            return
+        hostgroup_id = _hostgroup_id(wwn)
+        host_wwn = _wwn_normalize(wwn['hostWwn'])
+        _set_discard(self._hostgroup_wwns, hostgroup_id, host_wwn)
+        _set_discard(self._wwn_hostgroups, host_wwn, hostgroup_id)
+        for lun_id in self._hostgroup_luns.get(hostgroup_id, _EMPTY):
+            ldev_id = self.luns[lun_id]['ldevId']
+            _counter_decrement(self._ldev_wwns, ldev_id, host_wwn)
+            _counter_decrement(self._wwn_ldevs, host_wwn, ldev_id)
+
+    def apply(self, events):
+        '''Update the index with the events of Inventory.refresh() or RestAPI.inventory_watch()'''
+        for event in events:
+            if event.action == 'removed':
+                if event.kind == 'ldev':
+                    self.ldev_remove(event.key)
+                elif event.kind == 'hostgroup':
+                    self.hostgroup_remove(event.key)
+                elif event.kind == 'lun':
+                    self.lun_remove(event.key)
+                elif event.kind == 'wwn':
+                    self.wwn_remove(event.key)
+            else:
+                if event.kind == 'ldev':
+                    self.ldev_add(event.new)
+                elif event.kind == 'hostgroup':
+                    self.hostgroup_add(event.new)
+                elif event.kind == 'lun':
+                    self.lun_add(event.new)
+                elif event.kind == 'wwn':
+                    self.wwn_add(event.new)
+        return(None)
+
+    #lunIds of the paths to an ldev, the lun details are in self.luns
+    def ldev_luns_get(self, ldev_id):
+        return(self._ldev_luns.get(ldev_id, {}).keys())
+
+    #the paths (lun dictionaries with portId, hostGroupNumber, lun) to an ldev
+    def ldev_paths_get(self, ldev_id):
+        return([self.luns[lun_id] for lun_id in self._ldev_luns.get(ldev_id, _EMPTY)])
+
+    #host groups the ldev is mapped to
+    def ldev_hostgroups_get(self, ldev_id):
+        return(dict.fromkeys(_hostgroup_id(self.luns[lun_id]) for lun_id in self._ldev_luns.get(ldev_id, _EMPTY)).keys())
+
+    #wwns (hosts) that see an ldev
+    def ldev_wwns_get(self, ldev_id):
+        return(self._ldev_wwns.get(ldev_id, collections.Counter()).keys())
+
+    #ldevs a wwn (host) sees
+    def wwn_ldevs_get(self, wwn:str):
+        return(self._wwn_ldevs.get(_wwn_normalize(wwn), collections.Counter()).keys())
+
+    #host groups a wwn is registered in
+    def wwn_hostgroups_get(self, wwn:str):
+        return(self._wwn_hostgroups.get(_wwn_normalize(wwn), {}).keys())
+
+    #wwns registered in a host group
+    def hostgroup_wwns_get(self, hostgroup_id:str):
+        return(self._hostgroup_wwns.get(hostgroup_id, {}).keys())
+
+    #lunIds of a host group
+    def hostgroup_luns_get(self, hostgroup_id:str):
+        return(self._hostgroup_luns.get(hostgroup_id, {}).keys())
+
+    #ldevs of a pool
+    def pool_ldevs_get(self, pool_id):
+        return(self._pool_ldevs.get(pool_id, {}).keys())
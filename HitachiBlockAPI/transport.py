@@ -0,0 +1,434 @@
+"""
+Transport helpers used by the RestAPI class to talk to the storage REST API.
+"""
+
+import http.client
+import socket
+import ssl
+import select
+import threading
+import time
+import collections
+import hashlib
+import os
+import random
+import logging
+
+logger = logging.getLogger(__name__)
+
+#errors that show that a kept alive connection was closed by the other side in the meantime
+STALE_CONNECTION_ERRORS = (http.client.BadStatusLine, http.client.CannotSendRequest, http.client.ResponseNotReady,
+                           ConnectionResetError, ConnectionAbortedError, BrokenPipeError)
+
+#requests that can be sent again after the response was lost (a POST, PUT or DELETE may already have been done by the storage)
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+#status codes of a busy or restarting SVP / Configuration Manager. GET requests that get them are sent again
+RETRY_STATUSES = (http.client.BAD_GATEWAY, http.client.SERVICE_UNAVAILABLE, http.client.GATEWAY_TIMEOUT)
+
+
+class RetryPolicy:
+    '''When and how often a request is sent again.
+
+    Only idempotent methods (GET) are retried, after a connection error or a
+    status of statuses. A socket timeout is not retried, the request already
+    waited the whole timeout. The delay before retry n is
+    backoff * 2**(n-1) (max. max_backoff) changed randomly by +/- jitter.
+    '''
+
+    def __init__(self, retries:int=3, backoff:float=0.5, max_backoff:float=8, jitter:float=0.2, statuses:tuple=RETRY_STATUSES, methods:tuple=('GET',)):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.statuses = statuses
+        self.methods = methods
+
+    def retryable(self, method:str, attempt:int, status=None):
+        '''True if the request of method that failed (status None: connection error) with attempt retries so far is sent again'''
+        if attempt >= self.retries or method not in self.methods:
+            return(False)
+        return(status is None or status in self.statuses)
+
+    def delay(self, attempt:int):
+        '''seconds to wait before retry number attempt (1, 2, ...)'''
+        delay = min(self.backoff * 2 ** (attempt - 1), self.max_backoff)
+        return(delay * (1 + random.uniform(-self.jitter, self.jitter)))
+
+
+class CircuitOpenError(Exception):
+    '''The circuit breaker of a host:port is open, the request was not sent'''
+
+
+class CircuitBreaker:
+    '''Fails fast while a host:port is unhealthy.
+
+    After failure_threshold failures in a row (connection errors, timeouts,
+    statuses of RETRY_STATUSES) the circuit opens and requests fail at once
+    with CircuitOpenError for reset_timeout seconds. Then one request is let
+    through (half open): if it succeeds the circuit closes, if it fails the
+    circuit opens again.
+    '''
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold:int=5, reset_timeout:float=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+        #statistics
+        self.opened = 0
+        self.rejected = 0
+
+    def allow(self):
+        '''True if a request can be sent now'''
+        if self.failure_threshold is None or self.failure_threshold <= 0:
+            return(True)
+        with self._lock:
+            if self.state == self.CLOSED:
+                return(True)
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial = False
+            if self.state == self.HALF_OPEN and not self._trial:
+                #one trial request at a time
+                self._trial = True
+                return(True)
+            self.rejected += 1
+            return(False)
+
+    def retry_after(self):
+        '''seconds until the next trial request is let through (0 if the circuit is not open)'''
+        with self._lock:
+            if not self.state == self.OPEN:
+                return(0)
+            return(max(0, self.reset_timeout - (time.monotonic() - self._opened_at)))
+
+    #the request that allow() let through was not sent
+    def cancel(self):
+        with self._lock:
+            self._trial = False
+
+    def success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                self.opened += 1
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                return(True)
+            return(False)
+
+
+class Governor:
+    '''Limits the requests to one array (host:port) of all threads and RestAPI instances of the process.
+
+    At most max_in_flight requests are sent at the same time and at most rate
+    requests per second are started (token bucket with burst requests).
+    None means no limit. Waiting requests are served in the order they
+    arrived (FIFO). stats() returns the current and past wait times.
+    '''
+
+    def __init__(self, max_in_flight:int=None, rate:float=None, burst:float=None):
+        self.max_in_flight = max_in_flight
+        self.rate = rate
+        self.burst = burst if burst is not None else (max(1.0, rate) if rate else None)
+        self._tokens = self.burst
+        self._refilled = time.monotonic()
+        self._in_flight = 0
+        #[enqueue time] per waiting request, the first one is served next
+        self._queue = collections.deque()
+        self._condition = threading.Condition()
+        #statistics
+        self.requests = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_last = 0.0
+
+    def _refill(self, now:float):
+        if self.rate:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def acquire(self, timeout:float=None):
+        '''Wait until the request can be sent. Return False if that did not happen within timeout seconds'''
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        ticket = [start]
+        with self._condition:
+            self._queue.append(ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    delay = None
+                    if self._queue[0] is ticket and (self.max_in_flight is None or self._in_flight < self.max_in_flight):
+                        self._refill(now)
+                        if not self.rate or self._tokens >= 1:
+                            break
+                        #time until the next token
+                        delay = (1 - self._tokens) / self.rate
+                    if deadline is not None:
+                        if now >= deadline:
+                            self.timeouts += 1
+                            return(False)
+                        delay = deadline - now if delay is None else min(delay, deadline - now)
+                    self._condition.wait(delay)
+                if self.rate:
+                    self._tokens -= 1
+                self._in_flight += 1
+                wait = time.monotonic() - start
+                self.requests += 1
+                self.wait_total += wait
+                self.wait_max = max(self.wait_max, wait)
+                self.wait_last = wait
+                return(True)
+            finally:
+                self._queue.remove(ticket)
+                #the next request in the queue may go now
+                self._condition.notify_all()
+
+    def release(self):
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def stats(self):
+        with self._condition:
+            now = time.monotonic()
+            return({'max_in_flight': self.max_in_flight,
+                    'rate': self.rate,
+                    'in_flight': self._in_flight,
+                    'waiting': len(self._queue),
+                    #seconds the first request in the queue waits until now
+                    'wait_current': now - self._queue[0][0] if self._queue else 0.0,
+                    'wait_last': self.wait_last,
+                    'wait_max': self.wait_max,
+                    'wait_avg': self.wait_total / self.requests if self.requests else 0.0,
+                    'requests': self.requests,
+                    'timeouts': self.timeouts})
+
+
+#one governor per host:port for the whole process
+_governors = {}
+_governors_lock = threading.Lock()
+
+
+def governor_get(host:str, port, max_in_flight:int=None, rate:float=None, burst:float=None):
+    '''The governor of host:port that all RestAPI instances of the process share.
+    The limits of the first call are used, later calls with other limits are logged.'''
+    key = (str(host), str(port))
+    with _governors_lock:
+        governor = _governors.get(key)
+        if governor is None:
+            governor = Governor(max_in_flight=max_in_flight, rate=rate, burst=burst)
+            _governors[key] = governor
+        elif not (governor.max_in_flight == max_in_flight and governor.rate == rate):
+            logger.debug('governor of %s:%s already exists with max_in_flight=%s, rate=%s. it is used.', host, port, governor.max_in_flight, governor.rate)
+    return(governor)
+
+
+class TLSContext:
+    '''TLS settings shared by all connections of a RestAPI instance.
+
+    Without ca_bundle the server certificate is not verified (as the storage
+    SVP/GUM certificates are mostly self signed). pinned_certificate is either
+    the path of the PEM encoded server certificate or its sha256 fingerprint
+    (hex, ':' separators allowed) and is checked after every handshake.
+    The last TLS session of every host:port is kept and resumed by new connections.
+    '''
+
+    def __init__(self, ca_bundle:str=None, pinned_certificate:str=None, check_hostname:bool=True):
+        if ca_bundle is None:
+            self.context = ssl._create_unverified_context()
+        else:
+            self.context = ssl.create_default_context(cafile=ca_bundle)
+            self.context.check_hostname = check_hostname
+        self.pinned_fingerprint = None
+        if pinned_certificate is not None:
+            self.pinned_fingerprint = self._fingerprint_load(pinned_certificate)
+        self._sessions = {}
+        self._lock = threading.Lock()
+        #statistics
+        self.handshakes = 0
+        self.sessions_resumed = 0
+
+    @staticmethod
+    def _fingerprint_load(pinned_certificate:str):
+        if os.path.isfile(pinned_certificate):
+            with open(pinned_certificate, 'r') as fh:
+                der = ssl.PEM_cert_to_DER_cert(fh.read())
+            return(hashlib.sha256(der).hexdigest())
+        return(pinned_certificate.replace(':', '').lower())
+
+    def session_get(self, host:str, port:int):
+        with self._lock:
+            return(self._sessions.get((host, port)))
+
+    def session_put(self, host:str, port:int, session):
+        if session is not None:
+            with self._lock:
+                self._sessions[(host, port)] = session
+
+    def wrap_socket(self, sock, host:str, port:int):
+        '''TLS handshake on a connected socket, resumes the last session of host:port'''
+        #a session the server does not accept anymore ends in a full handshake
+        tls_sock = self.context.wrap_socket(sock, server_hostname=host, session=self.session_get(host, port))
+        with self._lock:
+            self.handshakes += 1
+            if tls_sock.session_reused:
+                self.sessions_resumed += 1
+        try:
+            self.pin_verify(tls_sock, host, port)
+        except ssl.SSLError:
+            tls_sock.close()
+            raise
+        self.session_put(host, port, tls_sock.session)
+        return(tls_sock)
+
+    def pin_verify(self, ssl_object, host:str, port:int):
+        '''Raise ssl.SSLError if the peer certificate does not match the pinned certificate'''
+        if self.pinned_fingerprint is not None:
+            fingerprint = hashlib.sha256(ssl_object.getpeercert(binary_form=True)).hexdigest()
+            if not fingerprint == self.pinned_fingerprint:
+                raise ssl.SSLError('certificate of '+str(host)+':'+str(port)+' does not match the pinned certificate (sha256 '+fingerprint+')')
+
+
+class TLSConnection(http.client.HTTPSConnection):
+    '''HTTPSConnection that does the handshake through a shared TLSContext'''
+
+    def __init__(self, host:str, port:int, tls:TLSContext, timeout:float):
+        super().__init__(host, port, timeout=timeout, context=tls.context)
+        self._tls = tls
+
+    def connect(self):
+        http.client.HTTPConnection.connect(self)
+        self.sock = self._tls.wrap_socket(self.sock, self.host, self.port)
+
+
+class ConnectionPool:
+    '''Bounded pool of keep-alive https connections to one host:port.
+
+    At most maxsize connections are in use at the same time. Idle connections
+    are reused (last used first) and closed after idle_timeout seconds.
+    '''
+
+    def __init__(self, host:str, port:int, maxsize:int=8, idle_timeout:float=30, tls:TLSContext=None, breaker:CircuitBreaker=None, governor:Governor=None):
+        self.host = host
+        self.port = int(port)
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self._tls = tls if tls is not None else TLSContext()
+        #health of the host:port, see CircuitBreaker
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        #optional limit of the requests of the process to the host:port, see Governor
+        self.governor = governor
+        self._idle = collections.deque()
+        self._slots = threading.BoundedSemaphore(maxsize)
+        self._lock = threading.Lock()
+        #statistics
+        self.connections_created = 0
+        self.connections_reused = 0
+
+    def _connection_new(self, timeout:float):
+        with self._lock:
+            self.connections_created += 1
+        return(TLSConnection(self.host, self.port, tls=self._tls, timeout=timeout))
+
+    #a connection that is readable while idle got closed (EOF) or is out of sync
+    def _is_broken(self, connection):
+        if connection.sock is None:
+            return(True)
+        try:
+            readable, _, _ = select.select([connection.sock], [], [], 0)
+        except (OSError, ValueError):
+            return(True)
+        return(len(readable) > 0)
+
+    def _connection_get(self, timeout:float):
+        now = time.monotonic()
+        with self._lock:
+            while self._idle:
+                connection, last_used = self._idle.pop()
+                if now - last_used > self.idle_timeout or self._is_broken(connection):
+                    connection.close()
+                    continue
+                self.connections_reused += 1
+                connection.timeout = timeout
+                connection.sock.settimeout(timeout)
+                return(connection, True)
+        return(self._connection_new(timeout), False)
+
+    def _connection_put(self, connection):
+        now = time.monotonic()
+        with self._lock:
+            #evict connections that were idle for too long
+            while self._idle and now - self._idle[0][1] > self.idle_timeout:
+                self._idle.popleft()[0].close()
+            self._idle.append((connection, now))
+
+    def _send(self, connection, method:str, url:str, headers:dict, body):
+        if body is None:
+            connection.request(method=method, url=url, headers=headers)
+        else:
+            connection.request(method=method, url=url, headers=headers, body=body)
+
+    def request(self, method:str, url:str, headers:dict, body=None, timeout:float=60):
+        '''Send the request and return (status, reason, data) with data as bytes.
+
+        A reused connection that turns out to be closed is replaced by a new one
+        and the request is sent again: always if it could not be written, after
+        a lost response only if the method is idempotent (IDEMPOTENT_METHODS).
+        socket.timeout and http.client.HTTPException are raised to the caller.
+        '''
+        if not self._slots.acquire(timeout=timeout):
+            raise socket.timeout('no free connection to '+self.host+':'+str(self.port)+' within '+str(timeout)+'sec.')
+        try:
+            connection, reused = self._connection_get(timeout)
+            try:
+                sent = False
+                try:
+                    self._send(connection, method, url, headers, body)
+                    sent = True
+                    response = connection.getresponse()
+                except STALE_CONNECTION_ERRORS as e:
+                    connection.close()
+                    #the storage may have done the request, only a request without side effects is sent again
+                    if not reused or (sent and method.upper() not in IDEMPOTENT_METHODS):
+                        raise
+                    logger.debug('kept alive connection to %s:%s was closed (%r). reconnect.', self.host, self.port, e)
+                    connection = self._connection_new(timeout)
+                    self._send(connection, method, url, headers, body)
+                    response = connection.getresponse()
+                data = response.read()
+            except BaseException:
+                connection.close()
+                raise
+            #TLS 1.3 session tickets arrive after the handshake
+            self._tls.session_put(self.host, self.port, connection.sock.session if connection.sock is not None else None)
+            if response.will_close:
+                connection.close()
+            else:
+                self._connection_put(connection)
+            return(response.status, response.reason, data)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        '''Close all idle connections'''
+        with self._lock:
+            while self._idle:
+                self._idle.pop()[0].close()
@@ -0,0 +1,192 @@
+"""
+Benchmark of the crawl functions against the local simulator (no storage needed).
+
+Every function is measured at every inventory size: wall time (best of --repeat runs),
+requests, bytes sent/received (request metrics of RestAPI) and peak memory (tracemalloc,
+in a separate run as tracing slows the function down). The traced run uses a simulator in
+a subprocess, so only the allocations of the client are measured. The results are written as JSON.
+
+    python benchmark.py --sizes small,medium --repeat 3 --output benchmark.json
+    python benchmark.py --sizes medium --compare benchmark.json --threshold 0.2
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import logging
+
+from HitachiBlockAPI import RestAPI
+from HitachiBlockAPI.simulator import Simulator, SyntheticStorage, certificate_get
+
+logger = logging.getLogger(__name__)
+
+#SyntheticStorage arguments of the inventory sizes
+SIZES = {
+    'small': {'ports': 4, 'hostgroups_per_port': 4, 'luns_per_hostgroup': 8, 'wwns_per_hostgroup': 2, 'ldevs': 1024,
+              'pools': 2, 'snapshot_groups': 8, 'remote_replications': 64},
+    'medium': {'ports': 8, 'hostgroups_per_port': 16, 'luns_per_hostgroup': 16, 'wwns_per_hostgroup': 2, 'ldevs': 16384,
+               'pools': 4, 'snapshot_groups': 64, 'remote_replications': 1024},
+    'large': {'ports': 32, 'hostgroups_per_port': 32, 'luns_per_hostgroup': 16, 'wwns_per_hostgroup': 4, 'ldevs': 16384,
+              'pools': 8, 'snapshot_groups': 256, 'remote_replications': 4096},
+}
+
+#functions that are measured
+FUNCTIONS = ('ldevs_get', 'host_groups_all_ports_get', 'luns_all_ports_get', 'wwns_all_ports_get', 'replication_get', 'snapshots_get')
+
+#measured values compared with --compare (a higher value is worse)
+COMPARED = ('wall_seconds', 'requests', 'bytes_received', 'peak_memory_bytes')
+
+#smaller differences of the wall time are noise, not a regression
+WALL_SECONDS_NOISE = 0.005
+
+
+#one measurement of the function: (seconds, result, metrics, peak memory or None)
+def _run(storage:RestAPI, function:str, trace:bool=False):
+    storage.metrics_reset()
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = getattr(storage, function)()
+    seconds = time.perf_counter() - start
+    peak = None
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return(seconds, result, storage.metrics_get(), peak)
+
+
+#start the simulator with the inventory in a subprocess, return (process, port)
+def _simulator_process(inventory:dict, seed:int=0, latency:float=0.0):
+    certificate, key = certificate_get()
+    arguments = [sys.executable, '-u', '-m', 'HitachiBlockAPI.simulator', '--port', '0', '--seed', str(seed), '--latency', str(latency),
+                 '--certificate', certificate, '--key', key,
+                 '--ports', str(inventory['ports']), '--hostgroups', str(inventory['hostgroups_per_port']), '--luns', str(inventory['luns_per_hostgroup']),
+                 '--wwns', str(inventory['wwns_per_hostgroup']), '--ldevs', str(inventory['ldevs']), '--pools', str(inventory['pools']),
+                 '--snapshot-groups', str(inventory['snapshot_groups']), '--remote-replications', str(inventory['remote_replications'])]
+    process = subprocess.Popen(arguments, stdout=subprocess.PIPE, universal_newlines=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    #'simulator listening on https://127.0.0.1:port (...)'
+    line = process.stdout.readline()
+    if not line.startswith('simulator listening on '):
+        process.kill()
+        raise RuntimeError('simulator did not start: '+line)
+    return(process, int(line.split()[3].rsplit(':', 1)[1]))
+
+
+def benchmark(sizes:list=None, functions:list=None, repeat:int=3, latency:float=0.0, seed:int=0):
+    '''Measure the functions at the inventory sizes and return the report (dictionary)'''
+    if sizes is None:
+        sizes = ['small', 'medium']
+    if functions is None:
+        functions = list(FUNCTIONS)
+    results = []
+    for size in sizes:
+        inventory = SIZES[size]
+        storage_inventory = SyntheticStorage(serial_number=58068, seed=seed, **inventory)
+        process, process_port = _simulator_process(inventory, seed=seed, latency=latency)
+        try:
+            with Simulator(storages=[storage_inventory], latency=latency, seed=seed) as simulator:
+                storage = RestAPI(fqdn_ip='127.0.0.1', port=simulator.port, username='benchmark', password='benchmark', ca_bundle=simulator.certificate)
+                #the allocations of the simulator in this process would be traced as well
+                traced_storage = RestAPI(fqdn_ip='127.0.0.1', port=process_port, username='benchmark', password='benchmark', ca_bundle=simulator.certificate)
+                for api in (storage, traced_storage):
+                    api.storage_device_id_set(serial_number=58068)
+                    #the session is created before the measurements
+                    api.storage_details_get()
+                for function in functions:
+                    #the fastest run is reported, requests and bytes of the last run
+                    runs = [_run(storage, function) for _ in range(max(1, repeat))]
+                    seconds = min(run[0] for run in runs)
+                    result, metrics = runs[-1][1], runs[-1][2]
+                    peak = _run(traced_storage, function, trace=True)[3]
+                    bytes_sent = sum(endpoint['bytes_sent'] for endpoint in metrics['endpoints'].values())
+                    bytes_received = sum(endpoint['bytes_received'] for endpoint in metrics['endpoints'].values())
+                    results.append({'size': size, 'function': function,
+                                    'items': len(result) if hasattr(result, '__len__') else None,
+                                    'wall_seconds': seconds,
+                                    'wall_seconds_runs': [run[0] for run in runs],
+                                    'requests': metrics['requests'],
+                                    'bytes_sent': bytes_sent,
+                                    'bytes_received': bytes_received,
+                                    'peak_memory_bytes': peak})
+                    logger.info('%s %s: %d items in %.3fsec, %d requests, %d bytes received, peak %d bytes',
+                                size, function, results[-1]['items'] or 0, seconds, metrics['requests'], bytes_received, peak)
+                storage.close()
+                traced_storage.close()
+        finally:
+            process.terminate()
+            process.wait()
+    return({'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'latency': latency,
+            'sizes': {size: SIZES[size] for size in sizes},
+            'results': results})
+
+
+def compare(report:dict, baseline:dict, threshold:float=0.2):
+    '''Results that are more than threshold (0.2 = 20%) worse than the baseline: [(size, function, value, baseline, current)]'''
+    baseline_results = {(result['size'], result['function']): result for result in baseline.get('results', [])}
+    regressions = []
+    for result in report['results']:
+        base = baseline_results.get((result['size'], result['function']))
+        if base is None:
+            continue
+        for value in COMPARED:
+            if not base.get(value) or result.get(value) is None:
+                continue
+            if value == 'wall_seconds' and result[value] - base[value] < WALL_SECONDS_NOISE:
+                continue
+            if result[value] > base[value] * (1 + threshold):
+                regressions.append((result['size'], result['function'], value, base[value], result[value]))
+    return(regressions)
+
+
+def main(arguments:list=None):
+    parser = argparse.ArgumentParser(description='Benchmark of the crawl functions against the local simulator.')
+    parser.add_argument('--sizes', default='small,medium', help='comma separated: '+', '.join(SIZES))
+    parser.add_argument('--functions', default=','.join(FUNCTIONS), help='comma separated RestAPI functions')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per function, the fastest is reported')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds every simulated request waits')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='JSON file (default: stdout)')
+    parser.add_argument('--compare', default=None, help='JSON file of an earlier run, exit code 1 if a value regressed')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed regression (0.2 = 20%%)')
+    arguments = parser.parse_args(arguments)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    #the request logging of RestAPI would be measured as well
+    logging.getLogger('HitachiBlockAPI').setLevel(logging.WARNING)
+
+    sizes = [size.strip() for size in arguments.sizes.split(',') if not size.strip() == '']
+    unknown = [size for size in sizes if size not in SIZES]
+    if len(unknown) > 0:
+        parser.error('unknown size(s): '+', '.join(unknown))
+    functions = [function.strip() for function in arguments.functions.split(',') if not function.strip() == '']
+
+    report = benchmark(sizes=sizes, functions=functions, repeat=arguments.repeat, latency=arguments.latency, seed=arguments.seed)
+    if arguments.output is None:
+        print(json.dumps(report, indent=2))
+    else:
+        with open(arguments.output, 'w') as fh:
+            json.dump(report, fh, indent=2)
+
+    if arguments.compare is not None:
+        with open(arguments.compare, 'r') as fh:
+            baseline = json.load(fh)
+        regressions = compare(report, baseline, threshold=arguments.threshold)
+        for size, function, value, base, current in regressions:
+            logger.warning('regression %s %s %s: %s -> %s', size, function, value, base, current)
+        if len(regressions) > 0:
+            return(1)
+    return(0)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
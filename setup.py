@@ -10,7 +10,10 @@ deps = []
 # optional depencies for "maintainer"
 optional_deps = {
         "full": ['wheel', 'setuptools', 'pytest', 'pytest-html', 'keyring', 'twine'],
-        "minimal": []
+        "minimal": [],
+        "fast": ['orjson'],
+        "columnar": ['numpy'],
+        "simulator": ['cryptography']
         }
 
 setuptools.setup(
@@ -7,6 +7,7 @@ def hitachi():
     return RestAPI()
 '''
 
+import gzip
 import json
 from HitachiBlockAPI.Hitachi import RestAPI
 #import the logger of the Hitachi.py Module
@@ -67,6 +68,19 @@ def test_storage_details_get():
     #must be json compatible
     assert type(result) == dict
 
+@pytest.mark.storage_cache_file
+def test_storage_cache_file(tmp_path):
+    storage_cache_file = str(tmp_path / 'storages.json')
+    storage_cache = RestAPI(fqdn_ip=keyring.get_password('HitachiBlockAPI', 'OpsCenterIp'), port=keyring.get_password('HitachiBlockAPI', 'OpsCenterPort'), username='hup', password=keyring.get_password('HitachiBlockAPI', 'hup'), storage_cache_file=storage_cache_file)
+    storage_device_id = storage_cache.storage_device_id_set(serial_number=serial_number)
+    details = storage_cache.storage_details_get()
+    storage_cache.close()
+    #the next instance reads the storageDeviceId and the details of the file
+    storage_cache = RestAPI(fqdn_ip=keyring.get_password('HitachiBlockAPI', 'OpsCenterIp'), port=keyring.get_password('HitachiBlockAPI', 'OpsCenterPort'), username='hup', password=keyring.get_password('HitachiBlockAPI', 'hup'), storage_cache_file=storage_cache_file)
+    assert storage_cache.storage_device_id_set(serial_number=serial_number) == storage_device_id
+    assert storage_cache.storage_details_get() == details
+    storage_cache.close()
+
 @pytest.mark.storage_summaries_get
 def test_storage_summaries_get():
     result = storage.storage_device_id_set(serial_number=serial_number)
@@ -101,6 +115,21 @@ def test_jobs_all():
             #must be of type dict
             assert type(result) == dict
 
+@pytest.mark.jobs_wait
+def test_jobs_wait():
+    from HitachiBlockAPI.jobs import Job
+    result = storage.storage_device_id_set(serial_number=serial_number)
+    #must be of type str
+    assert type(result) == str
+    assert len(result) == 12
+    result = storage._jobs_last_get()
+    if not result == None:
+        #the job is requested directly
+        assert storage._jobs_by_id_get(jobId=result['jobId']) == storage._jobs_by_id_get(jobId=str(result['jobId']))
+        #a completed job does not need a request
+        jobs = [Job(storage, storage._jobs_by_id_get(jobId=result['jobId']))]
+        assert len(storage.jobs_wait(jobs, timeout=60)) == 1
+
 @pytest.mark.session_all
 def test_session_all():
     def test_session_get():
@@ -152,6 +181,35 @@ def test_pools_get():
     #must be of type dict
     assert type(result) == dict
 
+@pytest.mark.pools_get_cache
+def test_pools_get_cache():
+    storage_cache = RestAPI(fqdn_ip=keyring.get_password('HitachiBlockAPI', 'OpsCenterIp'), port=keyring.get_password('HitachiBlockAPI', 'OpsCenterPort'), username='hup', password=keyring.get_password('HitachiBlockAPI', 'hup'), cache=True)
+    result = storage_cache.storage_device_id_set(serial_number=serial_number)
+    #must be of type str
+    assert type(result) == str
+    assert len(result) == 12
+    result = storage_cache.pools_get()
+    #the second request is answered by the cache
+    assert storage_cache.pools_get() == result
+    assert storage_cache.cache_stats()['hits'] == 1
+    storage_cache.close()
+
+@pytest.mark.metrics_get
+def test_metrics_get():
+    storage_metrics = RestAPI(fqdn_ip=keyring.get_password('HitachiBlockAPI', 'OpsCenterIp'), port=keyring.get_password('HitachiBlockAPI', 'OpsCenterPort'), username='hup', password=keyring.get_password('HitachiBlockAPI', 'hup'))
+    result = storage_metrics.storage_device_id_set(serial_number=serial_number)
+    #must be of type str
+    assert type(result) == str
+    assert len(result) == 12
+    storage_metrics.pools_get()
+    result = storage_metrics.metrics_get()
+    #must be of type dict
+    assert type(result) == dict
+    assert result['endpoints']['GET /pools']['statuses']['200'] == 1
+    assert result['session_creations'] == 1
+    assert 'hitachi_rest_requests_total{method="GET",endpoint="/pools",status="200"} 1' in storage_metrics.metrics_prometheus()
+    storage_metrics.close()
+
 @pytest.mark.ports_get
 def test_ports_get():
     result = storage.storage_device_id_set(serial_number=serial_number)
@@ -192,6 +250,49 @@ def test_ldevs_get():
     #must be of type dict
     assert type(result) == dict
 
+@pytest.mark.ldevs_iter
+def test_ldevs_iter():
+    result = storage.storage_device_id_set(serial_number=serial_number)
+    #must be of type list
+    assert type(result) == str
+    assert len(result) == 12
+    result = list(storage.ldevs_iter(page_size=100, count=250))
+    #must be a list of dict
+    assert len(result) <= 250
+    assert all(type(ldev) == dict for ldev in result)
+    #same ldevs as with one request
+    assert {ldev['ldevId']: ldev for ldev in result} == storage.ldevs_get(count=250)
+
+@pytest.mark.ldevs_get_typed
+def test_ldevs_get_typed():
+    result = storage.storage_device_id_set(serial_number=serial_number)
+    #must be of type str
+    assert type(result) == str
+    assert len(result) == 12
+    result = storage.ldevs_get(count=250, typed=True)
+    #same ldevs as the dictionaries
+    ldevs = storage.ldevs_get(count=250)
+    assert result.keys() == ldevs.keys()
+    for ldevId in ldevs:
+        assert result[ldevId].raw == ldevs[ldevId]
+        assert result[ldevId].ldevId == ldevs[ldevId]['ldevId']
+
+@pytest.mark.ldevs_columns_get
+def test_ldevs_columns_get():
+    result = storage.storage_device_id_set(serial_number=serial_number)
+    #must be of type str
+    assert type(result) == str
+    assert len(result) == 12
+    ldevs = storage.ldevs_get()
+    result = storage.ldevs_columns_get()
+    assert len(result) == len(ldevs)
+    #same capacity per pool as with the dictionaries
+    #(missing values are not summed up)
+    for poolId, sums in result.groupby_sum('poolId', ['blockCapacity', 'numOfUsedBlock']).items():
+        assert sums['blockCapacity'] == sum(ldev.get('blockCapacity', 0) for ldev in ldevs.values() if ldev.get('poolId', -1) == poolId)
+        assert sums['numOfUsedBlock'] == sum(ldev.get('numOfUsedBlock', 0) for ldev in ldevs.values() if ldev.get('poolId', -1) == poolId)
+    assert result.sum('numOfUsedBlock') == sum(ldev.get('numOfUsedBlock', 0) for ldev in ldevs.values())
+
 @pytest.mark.host_groups_one_port_get
 def test_host_groups_one_port_get():
     result = storage.storage_device_id_set(serial_number=serial_number)
@@ -212,6 +313,18 @@ def test_host_groups_all_ports_get():
     #must be of type dict
     assert type(result) == dict
 
+@pytest.mark.host_groups_all_ports_get_bulk
+def test_host_groups_all_ports_get_bulk():
+    result = storage.storage_device_id_set(serial_number=serial_number)
+    #must be of type list
+    assert type(result) == str
+    assert len(result) == 12
+    result = storage.host_groups_all_ports_get(bulk=True)
+    #must be of type dict
+    assert type(result) == dict
+    #must be the same as port by port
+    assert result == storage.host_groups_all_ports_get(bulk=False)
+
 @pytest.mark.luns_get_portId_hostGroupId
 def test_luns_get_portId_hostGroupId():
     result = storage.storage_device_id_set(serial_number=serial_number)
@@ -242,6 +355,18 @@ def test_luns_all_ports_get():
     #must be of type dict
     assert type(result) == dict
 
+@pytest.mark.luns_all_ports_get_parallel
+def test_luns_all_ports_get_parallel():
+    result = storage.storage_device_id_set(serial_number=serial_number)
+    #must be of type list
+    assert type(result) == str
+    assert len(result) == 12
+    result = storage.luns_all_ports_get(parallel=6)
+    #must be of type dict
+    assert type(result) == dict
+    #must be the same as one request after the other
+    assert list(result.items()) == list(storage.luns_all_ports_get(parallel=1).items())
+
 @pytest.mark.wwns_get_portId_hostGroupId
 def test_wwns_get_portId_hostGroupId():
     result = storage.storage_device_id_set(serial_number=serial_number)
@@ -272,6 +397,413 @@ def test_wwns_all_ports_get():
     #must be of type dict
     assert type(result) == dict
 
+@pytest.mark.inventory_refresh
+def test_inventory_refresh():
+    from HitachiBlockAPI import Inventory
+    result = storage.storage_device_id_set(serial_number=serial_number)
+    #must be of type str
+    assert type(result) == str
+    assert len(result) == 12
+    inventory = Inventory(storage)
+    result = inventory.refresh()
+    #everything is added with the first refresh
+    assert all(event.action == 'added' for event in result)
+    assert len(inventory.luns) == len(storage.luns_all_ports_get())
+    #nothing changed in the meantime
+    result = inventory.refresh()
+    assert type(result) == list
+
+@pytest.mark.topology_get
+def test_topology_get():
+    result = storage.storage_device_id_set(serial_number=serial_number)
+    #must be of type str
+    assert type(result) == str
+    assert len(result) == 12
+    topology = storage.topology_get()
+    #every lun is a path to its ldev
+    for lunId, lun in topology.luns.items():
+        assert lunId in topology.ldev_luns_get(lun['ldevId'])
+    #every wwn of a host group with luns sees the ldevs of the luns
+    for wwn in topology.wwns.values():
+        for lunId in topology.hostgroup_luns_get(str(wwn['portId'])+','+str(wwn['hostGroupNumber'])):
+            assert topology.luns[lunId]['ldevId'] in topology.wwn_ldevs_get(wwn['hostWwn'])
+
+@pytest.mark.fleet_pools_get
+def test_fleet_pools_get():
+    from HitachiBlockAPI import Fleet
+    result = storage.storage_device_id_set(serial_number=serial_number)
+    #must be of type str
+    assert type(result) == str
+    assert len(result) == 12
+    fleet = Fleet({'fqdn_ip': keyring.get_password('HitachiBlockAPI', 'OpsCenterIp'), 'port': keyring.get_password('HitachiBlockAPI', 'OpsCenterPort'), 'username': 'hup', 'password': keyring.get_password('HitachiBlockAPI', 'hup')},
+                  serial_numbers=[serial_number])
+    result = fleet.discover()
+    #must be of type dict
+    assert type(result) == dict
+    assert str(serial_number) in result
+    result = fleet.pools_get()
+    assert result[str(serial_number)].error == None
+    assert result[str(serial_number)].result == storage.pools_get()
+    fleet.close()
+
+@pytest.mark.cassette_ldevs_get
+def test_cassette_ldevs_get(tmp_path):
+    cassette_file = str(tmp_path / 'storage.jsonl.gz')
+    recording = RestAPI(fqdn_ip=keyring.get_password('HitachiBlockAPI', 'OpsCenterIp'), port=keyring.get_password('HitachiBlockAPI', 'OpsCenterPort'), username='hup', password=keyring.get_password('HitachiBlockAPI', 'hup'),
+                        cassette_file=cassette_file, cassette_mode='record')
+    result = recording.storage_device_id_set(serial_number=serial_number)
+    #must be of type str
+    assert type(result) == str
+    assert len(result) == 12
+    ldevs = recording.ldevs_get()
+    token = recording._token
+    recording.close()
+    #the password and the session token are not recorded (the file is gzip compressed)
+    with gzip.open(cassette_file, 'rt', encoding='utf-8') as fh:
+        recorded = fh.read()
+    assert keyring.get_password('HitachiBlockAPI', 'hup') not in recorded
+    assert token is not None
+    assert token not in recorded
+    assert '\\"token\\": \\"***\\"' in recorded
+    replaying = RestAPI(fqdn_ip='127.0.0.1', port=1, username='hup', password='replay', cassette_file=cassette_file)
+    result = replaying.storage_device_id_set(serial_number=serial_number)
+    assert type(result) == str
+    assert len(result) == 12
+    result = replaying.ldevs_get()
+    #must be of type dict
+    assert type(result) == dict
+    assert result == ldevs
+    assert replaying.cassette_stats()['misses'] == 0
+    replaying.close()
+
+@pytest.mark.simulator_ldevs_get
+def test_simulator_ldevs_get():
+    from HitachiBlockAPI.simulator import Simulator, SyntheticStorage
+    with Simulator(storages=[SyntheticStorage(serial_number=58068, ldevs=16384)]) as simulator:
+        simulator_storage = RestAPI(fqdn_ip='127.0.0.1', port=simulator.port, username='user', password='password')
+        result = simulator_storage.storage_device_id_set(serial_number=58068)
+        #must be of type str
+        assert type(result) == str
+        assert len(result) == 12
+        result = simulator_storage.ldevs_get()
+        #must be of type dict
+        assert type(result) == dict
+        assert len(result) == 16384
+        result = simulator_storage.luns_all_ports_get()
+        assert type(result) == dict
+        assert len(result) == 8*16*16
+        simulator_storage.close()
+
+@pytest.mark.simulator_ldevs_iter
+def test_simulator_ldevs_iter():
+    from HitachiBlockAPI.simulator import Simulator, SyntheticStorage
+    #the number of ldevs is a multiple of page_size, the last page is empty
+    with Simulator(storages=[SyntheticStorage(serial_number=58068, ldevs=2000)]) as simulator:
+        simulator_storage = RestAPI(fqdn_ip='127.0.0.1', port=simulator.port, username='user', password='password')
+        result = simulator_storage.storage_device_id_set(serial_number=58068)
+        #must be of type str
+        assert type(result) == str
+        assert len(result) == 12
+        result = list(simulator_storage.ldevs_iter(page_size=1000))
+        #must be a list of dict
+        assert len(result) == 2000
+        assert all(type(ldev) == dict for ldev in result)
+        result = simulator_storage.ldevs_get(page_size=1000)
+        #must be of type dict
+        assert type(result) == dict
+        assert len(result) == 2000
+        assert result == simulator_storage.ldevs_get()
+        simulator_storage.close()
+
+@pytest.mark.simulator_inventory_refresh
+def test_simulator_inventory_refresh():
+    from HitachiBlockAPI import Inventory
+    from HitachiBlockAPI.simulator import Simulator, SyntheticStorage
+    #the number of ldevs is a multiple of the page size of the inventory
+    simulator_inventory = SyntheticStorage(serial_number=58068, ports=2, hostgroups_per_port=4, luns_per_hostgroup=4, ldevs=2000)
+    with Simulator(storages=[simulator_inventory]) as simulator:
+        simulator_storage = RestAPI(fqdn_ip='127.0.0.1', port=simulator.port, username='user', password='password')
+        result = simulator_storage.storage_device_id_set(serial_number=58068)
+        #must be of type str
+        assert type(result) == str
+        assert len(result) == 12
+        inventory = Inventory(simulator_storage, page_size=1000)
+        result = inventory.refresh()
+        #everything is added with the first refresh
+        assert all(event.action == 'added' for event in result)
+        assert len([event for event in result if event.kind == 'ldev']) == 2000
+        assert len(inventory.ldevs) == 2000
+        assert len(inventory.hostgroups) == 2*4
+        assert inventory.luns == simulator_storage.luns_all_ports_get()
+        #one ldev changed in the meantime
+        simulator_inventory.ldevs[1999]['label'] = 'CHANGED'
+        result = inventory.refresh()
+        assert [(event.action, event.kind, event.key) for event in result] == [('changed', 'ldev', 1999)]
+        assert inventory.ldevs[1999]['label'] == 'CHANGED'
+        simulator_storage.close()
+
+@pytest.mark.simulator_async_get
+def test_simulator_async_get():
+    import asyncio
+    from HitachiBlockAPI import AsyncRestAPI
+    from HitachiBlockAPI.simulator import Simulator, SyntheticStorage
+    async def crawl(port:int, simulator):
+        async with AsyncRestAPI(fqdn_ip='127.0.0.1', port=port, username='user', password='password') as simulator_storage:
+            result = await simulator_storage.storage_device_id_set(serial_number=58068)
+            #must be of type str
+            assert type(result) == str
+            assert len(result) == 12
+            result = await simulator_storage.ldevs_get()
+            #must be of type dict
+            assert type(result) == dict
+            assert len(result) == 256
+            result = await simulator_storage.ldevs_get(ldevNumber=5)
+            assert list(result) == [5]
+            hostgroups = await simulator_storage.host_groups_one_port_get('CL1-A')
+            assert type(hostgroups) == dict
+            assert len(hostgroups) == 4
+            luns = await asyncio.gather(*[simulator_storage.luns_get(hostgroup) for hostgroup in hostgroups])
+            assert all(type(result) == dict and len(result) == 8 for result in luns)
+            #errors return -1 like RestAPI
+            result = await simulator_storage.ldevs_get(ldevNumber=99999)
+            assert result == -1
+            simulator.error_rate = 1.0
+            result = await simulator_storage.host_groups_one_port_get('CL1-A')
+            assert result == -1
+            result = await simulator_storage.luns_get('CL1-A,0')
+            assert result == -1
+            simulator.error_rate = 0.0
+    with Simulator(storages=[SyntheticStorage(serial_number=58068, ports=2, hostgroups_per_port=4, luns_per_hostgroup=8, ldevs=256)]) as simulator:
+        asyncio.run(crawl(simulator.port, simulator))
+
+@pytest.mark.simulator_snapshots_create_batch
+def test_simulator_snapshots_create_batch():
+    from HitachiBlockAPI.simulator import Simulator, SyntheticStorage
+    simulator_inventory = SyntheticStorage(serial_number=58068, ldevs=256, pools=2)
+    #the jobs are completed 0.2 seconds after they were created
+    with Simulator(storages=[simulator_inventory], job_time=0.2) as simulator:
+        simulator_storage = RestAPI(fqdn_ip='127.0.0.1', port=simulator.port, username='user', password='password')
+        result = simulator_storage.storage_device_id_set(serial_number=58068)
+        #must be of type str
+        assert type(result) == str
+        assert len(result) == 12
+        pvols = [(0, 0, 'G1'), (1, 0, 'G1'), (2, 1, 'G1'), (3, 0, 'G2'), (4, 0, 'G2'),
+                 #invalid pool id (not a number)
+                 (5, 'x', 'G1'),
+                 #the first snapshot of the group fails (the pvol does not exist)
+                 (999999, 0, 'G3'), (6, 0, 'G3'), (7, 0, 'G3'),
+                 #the first snapshot of the group fails (the pool does not exist)
+                 (8, 99, 'G4'), (9, 0, 'G4')]
+        result = simulator_storage.snapshots_create_batch(pvols, parallel=4, timeout=60)
+        #must be a list of dict in the order of pvols
+        assert type(result) == list
+        assert [(item['pvolLdevId'], item['snapshotGroupName']) for item in result] == [(pvol[0], pvol[2]) for pvol in pvols]
+        results = {item['pvolLdevId']: item for item in result}
+        for pvolLdevId in (0, 1, 2, 3, 4):
+            assert results[pvolLdevId]['result'] == 'succeeded'
+            assert results[pvolLdevId]['time'] != None
+        assert results[5]['result'] == 'failed'
+        assert results[5]['job'] == None
+        for first, others in ((999999, (6, 7)), (8, (9,))):
+            assert results[first]['result'] == 'failed'
+            assert results[first]['error'] != None
+            for pvolLdevId in others:
+                assert results[pvolLdevId]['result'] == 'not_submitted'
+                assert results[pvolLdevId]['error'] == results[first]['error']
+                assert results[pvolLdevId]['job'] == None
+        #only the groups whose first snapshot succeeded exist
+        assert {name: sorted(group) for name, group in simulator_inventory.snapshot_groups.items()} == {'G1': [0, 1, 2], 'G2': [3, 4]}
+        simulator_storage.close()
+
+@pytest.mark.simulator_snapshots_bulk
+def test_simulator_snapshots_bulk():
+    from HitachiBlockAPI.simulator import Simulator, SyntheticStorage
+    simulator_inventory = SyntheticStorage(serial_number=58068, ldevs=256, snapshot_groups=6)
+    with Simulator(storages=[simulator_inventory], job_time=0.1) as simulator:
+        simulator_storage = RestAPI(fqdn_ip='127.0.0.1', port=simulator.port, username='user', password='password')
+        result = simulator_storage.storage_device_id_set(serial_number=58068)
+        #must be of type str
+        assert type(result) == str
+        assert len(result) == 12
+        #the predicate selects the groups of snapshotgroups_get
+        result = simulator_storage.snapshots_resync_bulk(predicate=lambda snapshotGroupName: snapshotGroupName in ('SG_1', 'SG_3'), autoSplit=False)
+        assert set(result['groups']) == {'SG_1', 'SG_3'}
+        assert result['succeeded'] == 2
+        assert result['failed'] == []
+        assert all(snapshot['status'] == 'PAIR' for snapshot in simulator_inventory.snapshot_groups['SG_1'].values())
+        assert all(snapshot['status'] == 'PSUS' for snapshot in simulator_inventory.snapshot_groups['SG_0'].values())
+        #a group that does not exist fails, the others are done
+        result = simulator_storage.snapshots_resync_bulk(snapshotGroupNames=['SG_0', 'SG_MISSING'])
+        assert result['succeeded'] == 1
+        assert result['failed'] == ['SG_MISSING']
+        assert result['groups']['SG_0']['result'] == 'succeeded'
+        assert result['groups']['SG_MISSING']['result'] == 'failed'
+        assert result['groups']['SG_MISSING']['status'] == 404
+        result = simulator_storage.snapshots_delete_bulk(predicate=lambda snapshotGroupName: snapshotGroupName in ('SG_4', 'SG_5'))
+        assert set(result['groups']) == {'SG_4', 'SG_5'}
+        assert result['succeeded'] == 2
+        assert result['failed'] == []
+        assert list(simulator_storage.snapshotgroups_get()) == ['SG_0', 'SG_1', 'SG_2', 'SG_3']
+        result = simulator_storage.snapshots_delete_bulk(snapshotGroupNames=['SG_MISSING', 'SG_2'])
+        assert result['succeeded'] == 1
+        assert result['failed'] == ['SG_MISSING']
+        assert list(simulator_storage.snapshotgroups_get()) == ['SG_0', 'SG_1', 'SG_3']
+        simulator_storage.close()
+
+@pytest.mark.simulator_retry
+def test_simulator_retry():
+    from HitachiBlockAPI.simulator import Simulator, SyntheticStorage
+    with Simulator(storages=[SyntheticStorage(serial_number=58068, ldevs=64, pools=2)]) as simulator:
+        #no circuit breaker, only the retries are tested
+        simulator_storage = RestAPI(fqdn_ip='127.0.0.1', port=simulator.port, username='user', password='password',
+                                    retries=2, retry_backoff=0.01, retry_max_backoff=0.05, circuit_failure_threshold=0)
+        result = simulator_storage.storage_device_id_set(serial_number=58068)
+        #must be of type str
+        assert type(result) == str
+        assert len(result) == 12
+        assert type(simulator_storage.pools_get()) == dict
+        simulator_storage.metrics_reset()
+        #every request gets a 503
+        simulator.error_rate = 1.0
+        requests = simulator.requests
+        result = simulator_storage.pools_get()
+        assert result == -1
+        #a GET is sent again (retries times)
+        assert simulator.requests - requests == 3
+        metrics = simulator_storage.metrics_get()['endpoints']['GET /pools']
+        assert metrics['statuses'] == {'503': 3}
+        assert metrics['retries'] == 2
+        #a POST is not sent again
+        requests = simulator.requests
+        result = simulator_storage.snapshots_create(pvolLdevId=0, snapshotPoolId=0)
+        assert result == None
+        assert simulator.requests - requests == 1
+        assert simulator_storage.metrics_get()['endpoints']['POST /snapshots']['retries'] == 0
+        simulator.error_rate = 0.0
+        assert type(simulator_storage.pools_get()) == dict
+        simulator_storage.close()
+
+@pytest.mark.simulator_circuit_breaker
+def test_simulator_circuit_breaker():
+    import time
+    from HitachiBlockAPI.simulator import Simulator, SyntheticStorage
+    with Simulator(storages=[SyntheticStorage(serial_number=58068, ldevs=64, pools=2)]) as simulator:
+        #no retries, every failed request counts once
+        simulator_storage = RestAPI(fqdn_ip='127.0.0.1', port=simulator.port, username='user', password='password',
+                                    retries=0, circuit_failure_threshold=3, circuit_reset_timeout=0.5)
+        result = simulator_storage.storage_device_id_set(serial_number=58068)
+        #must be of type str
+        assert type(result) == str
+        assert len(result) == 12
+        assert type(simulator_storage.pools_get()) == dict
+        simulator_storage.metrics_reset()
+        simulator.error_rate = 1.0
+        #the circuit opens after 3 failures in a row
+        for _ in range(3):
+            assert simulator_storage.pools_get() == -1
+        requests = simulator.requests
+        assert simulator_storage.pools_get() == -1
+        #not sent
+        assert simulator.requests == requests
+        assert simulator_storage.metrics_get()['endpoints']['GET /pools']['statuses'] == {'503': 3, 'circuit_open': 1}
+        #after the cool-down one trial request is sent, it fails and the circuit opens again
+        time.sleep(0.6)
+        assert simulator_storage.pools_get() == -1
+        assert simulator.requests == requests + 1
+        assert simulator_storage.pools_get() == -1
+        assert simulator.requests == requests + 1
+        #the trial request succeeds and the circuit closes
+        simulator.error_rate = 0.0
+        time.sleep(0.6)
+        assert type(simulator_storage.pools_get()) == dict
+        assert type(simulator_storage.pools_get()) == dict
+        assert simulator.requests == requests + 3
+        simulator_storage.close()
+
+@pytest.mark.simulator_governor
+def test_simulator_governor():
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from HitachiBlockAPI.simulator import Simulator, SyntheticStorage
+    with Simulator(storages=[SyntheticStorage(serial_number=58068, ports=2, hostgroups_per_port=8, ldevs=256)], latency=0.05) as simulator:
+        #requests the simulator handles at the same time
+        lock = threading.Lock()
+        in_flight = [0, 0]
+        handle = simulator.handle
+        def handle_counted(*arguments):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight[1], in_flight[0])
+            try:
+                return(handle(*arguments))
+            finally:
+                with lock:
+                    in_flight[0] -= 1
+        simulator.handle = handle_counted
+        #two instances share the governor of the host:port
+        simulator_storages = [RestAPI(fqdn_ip='127.0.0.1', port=simulator.port, username='user', password='password', max_requests_in_flight=2) for _ in range(2)]
+        for simulator_storage in simulator_storages:
+            result = simulator_storage.storage_device_id_set(serial_number=58068)
+            #must be of type str
+            assert type(result) == str
+            assert len(result) == 12
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda number: simulator_storages[number % 2].luns_get('CL1-A,'+str(number % 8)), range(16)))
+        assert all(type(result) == dict for result in results)
+        #never more than 2 requests at the same time
+        assert in_flight[1] == 2
+        result = simulator_storages[0].governor_stats()
+        assert list(result) == ['127.0.0.1:'+str(simulator.port)]
+        result = result['127.0.0.1:'+str(simulator.port)]
+        assert result['max_in_flight'] == 2
+        assert result['in_flight'] == 0
+        assert result['requests'] >= 16
+        assert result['wait_max'] > 0
+        assert simulator_storages[1].governor_stats() == simulator_storages[0].governor_stats()
+        for simulator_storage in simulator_storages:
+            simulator_storage.close()
+
+    with Simulator(storages=[SyntheticStorage(serial_number=58068, ports=2, hostgroups_per_port=8, ldevs=256)]) as simulator:
+        #20 requests per second, the first 20 at once
+        simulator_storage = RestAPI(fqdn_ip='127.0.0.1', port=simulator.port, username='user', password='password', max_requests_per_second=20)
+        result = simulator_storage.storage_device_id_set(serial_number=58068)
+        assert type(result) == str
+        assert len(result) == 12
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda number: simulator_storage.luns_get('CL1-A,'+str(number % 8)), range(40)))
+        assert all(type(result) == dict for result in results)
+        #the requests after the burst (the storages request and the session creation took 2 tokens) wait for their tokens
+        assert time.monotonic() - start >= (2 + 40 - 20) / 20 * 0.9
+        result = simulator_storage.governor_stats()['127.0.0.1:'+str(simulator.port)]
+        assert result['rate'] == 20
+        assert result['timeouts'] == 0
+        simulator_storage.close()
+
+@pytest.mark.simulator_luns_get_typed
+def test_simulator_luns_get_typed():
+    from HitachiBlockAPI.simulator import Simulator, SyntheticStorage
+    with Simulator(storages=[SyntheticStorage(serial_number=58068, ports=2, hostgroups_per_port=2, luns_per_hostgroup=8, ldevs=256)]) as simulator:
+        simulator_storage = RestAPI(fqdn_ip='127.0.0.1', port=simulator.port, username='user', password='password')
+        result = simulator_storage.storage_device_id_set(serial_number=58068)
+        #must be of type str
+        assert type(result) == str
+        assert len(result) == 12
+        luns = simulator_storage.luns_get('CL1-A,0')
+        result = simulator_storage.luns_get('CL1-A,0', typed=True)
+        #same luns as the dictionaries
+        assert result.keys() == luns.keys()
+        for lunId in luns:
+            assert result[lunId].raw == luns[lunId]
+        #the nested values of one record are not the ones of the other records
+        first, second = list(result.values())[:2]
+        assert first.luHostReserve == second.luHostReserve
+        first.luHostReserve['openSystem'] = not first.luHostReserve['openSystem']
+        assert not first.luHostReserve == second.luHostReserve
+        assert simulator_storage.luns_get('CL1-A,0', typed=True)[second.lunId].luHostReserve == second.luHostReserve
+        simulator_storage.close()
+
 @pytest.mark.replication_get_gad
 def test_replication_get_gad():
     result = storage.storage_device_id_set(serial_number=serial_number)